@@ -0,0 +1,200 @@
+"""
+Kabul Kontrolü (Admission Control)
+Pahalı route'lar (reportlab PDF, matplotlib grafikleri, toplu işler) için
+sınıf başına eşzamanlılık sınırı ve sınırlı bekleme kuyruğu. Sınır dolduğunda
+istek kısa süre kuyrukta bekler; kuyruk da doluysa veya bekleme süresi
+aşılırsa hemen 503 + Retry-After döner. Böylece ucuz ve gecikmeye duyarlı
+/analyze trafiği için worker'lar boş kalır.
+
+Sınırlar tüm worker süreçleri için ortaktır: her yuva ADMISSION_DIR altında
+bir dosya kilididir (flock); süreç ölürse kilidi işletim sistemi bırakır.
+Python 3.9 Uyumlu
+"""
+
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Tuple
+import fcntl
+import math
+import os
+import threading
+import time
+
+from flask import jsonify, make_response
+
+from metrics import ADMISSION_REJECTIONS, QUEUE_DEPTH
+
+
+ADMISSION_ENABLED = os.getenv('ADMISSION_ENABLED', '1') == '1'
+ADMISSION_DIR = os.getenv('ADMISSION_DIR', 'data/admission')
+
+# Sınıf → (eşzamanlı istek, kuyruk uzunluğu, en uzun bekleme sn)
+# Ortam değişkeniyle değiştirilebilir: ADMISSION_HEAVY=2,2,3
+DEFAULT_CLASSES: Dict[str, Tuple[int, int, float]] = {
+    'heavy': (2, 2, 3.0),   # /download-report, /membership-plots (CPU yoğun)
+    'bulk': (2, 4, 5.0)     # /analyze/batch, /import, /export (uzun süren akışlar)
+}
+
+# Kuyruktaki istek yuva boşalmış mı diye bu aralıkla bakar (saniye)
+POLL_INTERVAL = 0.05
+
+
+class _Slot:
+    """Tek yuva: süreç içi kilit (thread'ler) + dosya kilidi (süreçler)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._thread_lock = threading.Lock()
+        self._fd: Optional[int] = None
+
+    def try_acquire(self) -> bool:
+        if not self._thread_lock.acquire(blocking=False):
+            return False
+        try:
+            if self._fd is None:
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            self._thread_lock.release()
+            return False
+
+    def release(self):
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._thread_lock.release()
+
+
+def _try_any(slots: List[_Slot]) -> Optional[_Slot]:
+    for slot in slots:
+        if slot.try_acquire():
+            return slot
+    return None
+
+
+class AdmissionClass:
+    """
+    Bir route sınıfının yuvaları ve bekleme kuyruğu
+
+    Args:
+        name: str - sınıf adı (metrik etiketi, dosya adları)
+        concurrency: int - aynı anda çalışabilecek istek (tüm worker'larda)
+        queue: int - yuva bekleyebilecek istek sayısı
+        max_wait: float - kuyrukta en fazla bekleme (saniye)
+    """
+
+    def __init__(self, name: str, concurrency: int, queue: int, max_wait: float, directory: str = ADMISSION_DIR):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue = queue
+        self.max_wait = max_wait
+        os.makedirs(directory, exist_ok=True)
+        self._slots = [_Slot(os.path.join(directory, f'{name}.slot{i}')) for i in range(concurrency)]
+        self._queue_slots = [_Slot(os.path.join(directory, f'{name}.queue{i}')) for i in range(queue)]
+        self._waiting = QUEUE_DEPTH.labels(f'admission_{name}')
+
+    @property
+    def retry_after(self) -> int:
+        return max(int(math.ceil(self.max_wait)), 1)
+
+    def acquire(self) -> Optional[_Slot]:
+        """Yuva al; sınır ve kuyruk doluysa veya bekleme süresi dolduysa None"""
+        slot = _try_any(self._slots)
+        if slot is not None:
+            return slot
+
+        ticket = _try_any(self._queue_slots)
+        if ticket is None:
+            ADMISSION_REJECTIONS.labels(self.name, 'queue_full').inc()
+            return None
+
+        self._waiting.inc()
+        try:
+            deadline = time.monotonic() + self.max_wait
+            while time.monotonic() < deadline:
+                time.sleep(POLL_INTERVAL)
+                slot = _try_any(self._slots)
+                if slot is not None:
+                    return slot
+            ADMISSION_REJECTIONS.labels(self.name, 'timeout').inc()
+            return None
+        finally:
+            self._waiting.dec()
+            ticket.release()
+
+
+def _parse_class(name: str, default: Tuple[int, int, float]) -> Tuple[int, int, float]:
+    value = os.getenv(f'ADMISSION_{name.upper()}')
+    if not value:
+        return default
+    concurrency, queue, max_wait = value.split(',')
+    return int(concurrency), int(queue), float(max_wait)
+
+
+_classes: Dict[str, AdmissionClass] = {}
+_classes_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    # Ebeveynde açılan yuva dosyaları paylaşılırsa flock worker'ları ayıramaz;
+    # her süreç kendi dosya tanıtıcılarını açmalı (preload_app + ısınma)
+    global _classes_lock
+    _classes.clear()
+    _classes_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_class(name: str) -> AdmissionClass:
+    """Sınıfı ilk kullanımda oluştur (yuva dosyaları çalışma klasörüne göre)"""
+    admission_class = _classes.get(name)
+    if admission_class is None:
+        with _classes_lock:
+            admission_class = _classes.get(name)
+            if admission_class is None:
+                admission_class = AdmissionClass(name, *_parse_class(name, DEFAULT_CLASSES[name]))
+                _classes[name] = admission_class
+    return admission_class
+
+
+def admission_controlled(class_name: str) -> Callable:
+    """
+    View'i sınıfın eşzamanlılık sınırıyla sar
+
+    Akış yanıtlarında yuva akış bitene kadar tutulur. http_cached ile
+    birlikte kullanıldığında içte olmalıdır ki önbellekten dönen yanıtlar
+    yuva harcamasın.
+    """
+    if class_name not in DEFAULT_CLASSES:
+        raise ValueError(f"Bilinmeyen sınıf: {class_name} (seçenekler: {', '.join(DEFAULT_CLASSES)})")
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not ADMISSION_ENABLED:
+                return view(*args, **kwargs)
+
+            admission_class = get_class(class_name)
+            slot = admission_class.acquire()
+            if slot is None:
+                response = jsonify({
+                    'error': 'Sunucu meşgul, lütfen daha sonra tekrar deneyin',
+                    'class': class_name,
+                    'retry_after': admission_class.retry_after
+                })
+                response.status_code = 503
+                response.headers['Retry-After'] = str(admission_class.retry_after)
+                return response
+
+            try:
+                response = make_response(view(*args, **kwargs))
+            except BaseException:
+                slot.release()
+                raise
+            # direct_passthrough (send_file) yanıtlarında kapanış kancası çağrılmaz; gövde zaten hazırdır
+            if response.is_streamed and not response.direct_passthrough:
+                response.call_on_close(slot.release)
+            else:
+                slot.release()
+            return response
+        return wrapper
+    return decorator
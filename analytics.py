@@ -0,0 +1,303 @@
+"""
+Kayan Pencere Analitiği
+Kullanıcı başına 7/30 günlük hareketli ortalamalar, kayan yüzdelikler ve
+art arda kötü uyku gecesi serileri.
+Hesaplar SQLite pencere fonksiyonlarıyla yapılır ve yalnızca istenen tarih
+aralığı (+ en uzun pencere) okunur; maliyet toplam geçmiş uzunluğuyla büyümez.
+Python 3.9 Uyumlu
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+from collections import deque
+from datetime import date, datetime, timedelta
+import bisect
+import sqlite3
+
+from database import AGGREGATE_METRICS, ensure_db, history_cache, shard_path_for, user_data_version
+
+
+DEFAULT_WINDOWS = (7, 30)
+DEFAULT_PERCENTILES = (50, 90)
+DEFAULT_PERCENTILE_WINDOW = 7
+
+# Günlük ortalama uyku kalitesi bu değerin altındaysa gece "kötü" sayılır
+POOR_SLEEP_THRESHOLD = 40.0
+
+# Hareketli ortalaması hesaplanan metrikler
+ROLLING_METRICS = ('sleep_hours', 'stress_level', 'sleep_quality')
+
+# Yüzdelikler ham değerlerden hesaplanır (günlük özete dönüştürülmüş dönemlerde değer yoktur)
+PERCENTILE_METRICS = ('stress_level', 'sleep_quality')
+
+MAX_DAYS = 365
+MAX_WINDOW = 90
+
+
+def _daily_cte() -> str:
+    """Ham kayıtlar ve günlük özetlerden gün başına toplam/adet CTE'si"""
+    raw_columns = ', '.join(
+        f'SUM({column}) AS {column}_sum, COUNT({column}) AS {column}_n'
+        for column, _ in AGGREGATE_METRICS
+    )
+    aggregate_columns = ', '.join(
+        f'{column}_sum, {column}_n' for column, _ in AGGREGATE_METRICS
+    )
+    merged_columns = ', '.join(
+        f'SUM({column}_sum) AS {column}_sum, SUM({column}_n) AS {column}_n'
+        for column, _ in AGGREGATE_METRICS
+    )
+    return f'''
+        daily AS (
+            SELECT date, SUM(count) AS count, {merged_columns}
+            FROM (
+                SELECT DATE(timestamp) AS date, COUNT(*) AS count, {raw_columns}
+                FROM analysis_history
+                WHERE user_id = ? AND timestamp >= ?
+                GROUP BY DATE(timestamp)
+                UNION ALL
+                SELECT date, count, {aggregate_columns}
+                FROM analysis_daily_aggregate
+                WHERE user_id = ? AND date >= DATE(?)
+            )
+            GROUP BY date
+        )
+    '''
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 2) if value is not None else None
+
+
+def _percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    """Sıralı listede doğrusal interpolasyonlu yüzdelik (numpy varsayılanı ile aynı)"""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * q / 100.0
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    fraction = position - lower
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * fraction
+
+
+def _moving_averages(
+    conn: sqlite3.Connection,
+    user_id: str,
+    start: date,
+    read_from: date,
+    windows: Sequence[int]
+) -> List[Dict]:
+    """Günlük ortalamalar ve pencere fonksiyonlarıyla ağırlıklı hareketli ortalamalar"""
+    window_defs = ', '.join(
+        f'w{w} AS (ORDER BY julianday(date) RANGE BETWEEN {w - 1} PRECEDING AND CURRENT ROW)'
+        for w in windows
+    )
+    columns = [f'{column}_sum / {column}_n AS avg_{column}' for column in ROLLING_METRICS]
+    for w in windows:
+        columns.extend(
+            f'SUM({column}_sum) OVER w{w} / SUM({column}_n) OVER w{w} AS ma{w}_{column}'
+            for column in ROLLING_METRICS
+        )
+
+    read_from_iso = read_from.isoformat()
+    rows = conn.execute(f'''
+        WITH {_daily_cte()}
+        SELECT * FROM (
+            SELECT date, count, {', '.join(columns)}
+            FROM daily
+            WINDOW {window_defs}
+        )
+        WHERE date >= ?
+        ORDER BY date ASC
+    ''', (user_id, read_from_iso, user_id, read_from_iso, start.isoformat())).fetchall()
+
+    daily = []
+    for row in rows:
+        daily.append({
+            'date': row['date'],
+            'count': row['count'],
+            'averages': {column: _round(row[f'avg_{column}']) for column in ROLLING_METRICS},
+            'moving_averages': {
+                f'{w}d': {column: _round(row[f'ma{w}_{column}']) for column in ROLLING_METRICS}
+                for w in windows
+            }
+        })
+    return daily
+
+
+def _rolling_percentiles(
+    conn: sqlite3.Connection,
+    user_id: str,
+    days: List[str],
+    read_from: date,
+    window: int,
+    percentiles: Sequence[float]
+) -> Dict[str, Dict]:
+    """
+    Her gün için son `window` günün ham değerlerinden yüzdelikler
+
+    Ham değerler zaman sırasıyla tek geçişte okunur; pencere kayarken sıralı
+    listelere ekleme/çıkarma yapılır (tüm aralık bellekte tutulmaz).
+    """
+    cursor = conn.execute(f'''
+        SELECT DATE(timestamp) AS date, {', '.join(PERCENTILE_METRICS)}
+        FROM analysis_history
+        WHERE user_id = ? AND timestamp >= ?
+        ORDER BY timestamp ASC
+    ''', (user_id, read_from.isoformat()))
+
+    sorted_values = {metric: [] for metric in PERCENTILE_METRICS}
+    in_window = deque()
+    result = {}
+    pending = cursor.fetchone()
+
+    for day in days:
+        day_ordinal = date.fromisoformat(day).toordinal()
+
+        # Bu güne kadarki değerleri pencereye ekle
+        while pending is not None and pending['date'] <= day:
+            ordinal = date.fromisoformat(pending['date']).toordinal()
+            values = tuple(pending[metric] for metric in PERCENTILE_METRICS)
+            in_window.append((ordinal, values))
+            for metric, value in zip(PERCENTILE_METRICS, values):
+                if value is not None:
+                    bisect.insort(sorted_values[metric], value)
+            pending = cursor.fetchone()
+
+        # Pencereden çıkan günleri sil
+        while in_window and in_window[0][0] <= day_ordinal - window:
+            _, values = in_window.popleft()
+            for metric, value in zip(PERCENTILE_METRICS, values):
+                if value is not None:
+                    values_list = sorted_values[metric]
+                    del values_list[bisect.bisect_left(values_list, value)]
+
+        result[day] = {
+            metric: {
+                f'p{q:g}': _round(_percentile(sorted_values[metric], q)) for q in percentiles
+            }
+            for metric in PERCENTILE_METRICS
+        }
+    return result
+
+
+def _poor_sleep_streaks(
+    conn: sqlite3.Connection,
+    user_id: str,
+    start: date,
+    threshold: float
+) -> List[Dict]:
+    """Art arda kötü uyku gecesi serileri (gaps-and-islands)"""
+    start_iso = start.isoformat()
+    rows = conn.execute(f'''
+        WITH {_daily_cte()},
+        poor AS (
+            SELECT date,
+                   julianday(date) - ROW_NUMBER() OVER (ORDER BY date) AS island
+            FROM daily
+            WHERE sleep_quality_sum / sleep_quality_n < ?
+        )
+        SELECT MIN(date) AS start, MAX(date) AS end, COUNT(*) AS nights
+        FROM poor
+        GROUP BY island
+        ORDER BY start ASC
+    ''', (user_id, start_iso, user_id, start_iso, threshold)).fetchall()
+    return [{'start': row['start'], 'end': row['end'], 'nights': row['nights']} for row in rows]
+
+
+def get_rolling_analytics(
+    user_id: str = 'anonymous',
+    days: int = 30,
+    windows: Sequence[int] = DEFAULT_WINDOWS,
+    percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+    percentile_window: int = DEFAULT_PERCENTILE_WINDOW,
+    poor_sleep_threshold: float = POOR_SLEEP_THRESHOLD
+) -> Dict:
+    """
+    Kullanıcının son N gününe ait kayan pencere analitiği
+
+    Args:
+        user_id: str - kullanıcı kimliği
+        days: int - raporlanan gün sayısı
+        windows: hareketli ortalama pencereleri (gün)
+        percentiles: hesaplanacak yüzdelikler (0-100)
+        percentile_window: yüzdelik penceresi (gün)
+        poor_sleep_threshold: kötü uyku eşiği (günlük ortalama uyku kalitesi)
+
+    Returns:
+        dict - günlük seri (ortalamalar, hareketli ortalamalar, yüzdelikler) ve seriler
+
+    Raises:
+        ValueError - geçersiz parametre
+    """
+    windows = tuple(sorted(set(int(w) for w in windows)))
+    percentiles = tuple(float(q) for q in percentiles)
+    if not 1 <= days <= MAX_DAYS:
+        raise ValueError(f'days 1-{MAX_DAYS} aralığında olmalı')
+    if not windows or any(not 1 <= w <= MAX_WINDOW for w in windows):
+        raise ValueError(f'Pencereler 1-{MAX_WINDOW} gün aralığında olmalı')
+    if not 1 <= percentile_window <= MAX_WINDOW:
+        raise ValueError(f'percentile_window 1-{MAX_WINDOW} gün aralığında olmalı')
+    if any(not 0 <= q <= 100 for q in percentiles):
+        raise ValueError('Yüzdelikler 0-100 aralığında olmalı')
+
+    cache_key = ('analytics', days, windows, percentiles, percentile_window, poor_sleep_threshold)
+    version = user_data_version(user_id)
+    cached = history_cache.get(user_id, cache_key, version=version)
+    if cached is not None:
+        return cached
+
+    ensure_db()
+
+    today = datetime.now().date()
+    start = today - timedelta(days=days - 1)
+    # Pencerelerin ilk günlerde dolu olması için aralık öncesi de okunur
+    lookback = max(max(windows), percentile_window) - 1
+    read_from = start - timedelta(days=lookback)
+
+    conn = sqlite3.connect(shard_path_for(user_id))
+    conn.row_factory = sqlite3.Row
+    try:
+        daily = _moving_averages(conn, user_id, start, read_from, windows)
+        day_percentiles = _rolling_percentiles(
+            conn, user_id, [d['date'] for d in daily], read_from, percentile_window, percentiles
+        )
+        streaks = _poor_sleep_streaks(conn, user_id, start, poor_sleep_threshold)
+    finally:
+        conn.close()
+
+    for entry in daily:
+        entry['percentiles'] = day_percentiles[entry['date']]
+
+    last_day = daily[-1]['date'] if daily else None
+    current = streaks[-1]['nights'] if streaks and streaks[-1]['end'] == last_day else 0
+    longest = max(streaks, key=lambda s: s['nights']) if streaks else None
+
+    result = {
+        'user_id': user_id,
+        'period_days': days,
+        'start': start.isoformat(),
+        'windows': list(windows),
+        'percentile_window': percentile_window,
+        'daily': daily,
+        'poor_sleep': {
+            'threshold': poor_sleep_threshold,
+            'current_streak': current,
+            'longest_streak': longest['nights'] if longest else 0,
+            'longest_streak_start': longest['start'] if longest else None,
+            'longest_streak_end': longest['end'] if longest else None,
+            'poor_nights': sum(s['nights'] for s in streaks),
+            'streaks': streaks
+        }
+    }
+    history_cache.set(user_id, cache_key, result, version=version)
+    return result
+
+
+def parse_number_list(value: Optional[str], default: Tuple) -> Tuple:
+    """'7,30' biçimindeki sorgu parametresini ayrıştır"""
+    if not value:
+        return default
+    try:
+        return tuple(float(v) if '.' in v else int(v) for v in value.split(',') if v.strip())
+    except ValueError:
+        raise ValueError(f'Geçersiz liste: {value!r}')
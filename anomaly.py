@@ -0,0 +1,49 @@
+"""
+Kullanıcı Anomali Durumu
+Her kullanıcı için stres ve uyku kalitesinin üstel ağırlıklı ortalama ve
+varyansı user_anomaly_state tablosunda tutulur; save_analysis her kayıtta
+durumu O(1) günceller ve /analyze yanıtına z-skoru ile anomali bayrağı ekler.
+Bu araç durumu mevcut kayıtlardan yeniden hesaplar (örn. toplu içe aktarım
+veya ANOMALY_ALPHA değişikliğinden sonra).
+Python 3.9 Uyumlu
+
+Kullanım:
+    python anomaly.py --rebuild
+    python anomaly.py --rebuild --user-id user123
+    python anomaly.py --user-id user123
+"""
+
+from typing import List, Optional
+import argparse
+import sys
+
+import database
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Kullanıcı anomali durumları')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='Durumları mevcut kayıtlardan zaman sırasıyla yeniden hesapla')
+    parser.add_argument('--user-id', help='Yalnızca bu kullanıcı')
+    args = parser.parse_args(argv)
+
+    if not args.rebuild and not args.user_id:
+        parser.error('--rebuild veya --user-id gerekli')
+
+    if args.rebuild:
+        users = database.rebuild_anomaly_state(args.user_id)
+        print(f"✅ {users} kullanıcının anomali durumu yeniden hesaplandı")
+
+    if args.user_id:
+        state = database.get_anomaly_state(args.user_id)
+        if state is None:
+            print(f"⚠️  {args.user_id} için durum yok")
+            return 1
+        print(f"👤 {args.user_id} ({state['samples']} gözlem, son: {state['updated_at']})")
+        for metric in database.ANOMALY_METRICS:
+            print(f"   {metric}: ortalama={state[metric]['mean']}, std={state[metric]['std']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,24 +4,98 @@ Python 3.9 Uyumlu
 """
 from typing import Dict, Optional
 from flask import (
-    Flask, request, jsonify, send_file, 
-    render_template, send_from_directory
+    Flask, Response, abort, request, jsonify, send_file,
+    render_template, send_from_directory, stream_with_context
 )
 from fuzzy_model import analyze, get_membership_plots, RULE_DESCRIPTIONS
-from database import save_analysis, get_history, get_trend_data
+from database import (
+    save_analysis, get_history, get_trend_data, get_rule_stats, iter_history, iter_trend_data
+)
 from pdf_report import create_pdf_report
 from external_apis import calculate_environmental_score
+from export_history import stream_export, parse_time_filter, FORMAT_MIMETYPES, FORMAT_EXTENSIONS
+from bulk_import import import_records, detect_format, decode_lines
+from batch_analyze import iter_text_chunks, iter_batch_records, detect_batch_format, analyze_stream
+from cache import all_cache_stats
+import idempotency
+from admission import admission_controlled
+from http_cache import http_cached, source_path
+from metrics import instrument_app, render as render_metrics
+from profiling import TOKEN_HEADER, install_profiling, list_profiles, profile_path, token_valid
+from response_encoding import (
+    compact_record, compact_response, is_compact, negotiate, parse_include, read_request_data
+)
+from population import percentile_rank, population_percentiles, population_size
+from similarity import similar_profiles
+from live_updates import SSE_HEADERS, parse_last_event_id, sync_stream
+from event_log import EVENTS_ENABLED
+from warmup import readiness, warm_up, warmup_timings
+from analytics import get_rolling_analytics, parse_number_list, DEFAULT_WINDOWS, DEFAULT_PERCENTILES
 from datetime import datetime
 from dotenv import load_dotenv
+import itertools
 import json
+import math
 import os
 
 # Load environment variables
 load_dotenv()
 
 app = Flask(__name__)
+instrument_app(app)
+install_profiling(app)
+
+# Yanıtı belirleyen dosyalar (HTTP önbellek doğrulayıcıları için)
+APP_SOURCE = source_path('app.py')
+MODEL_SOURCE = source_path('fuzzy_model.py')
+VALIDATION_REPORT_PATH = 'static/validation_report.html'
+
+STREAM_FORMATS = ('ndjson', 'json')
+
+
+def _stream_items(items, fmt: str, key: str, head: Dict, count_key: str) -> Response:
+    """
+    Kayıtları tek tek serileştirerek akıt (tam liste oluşturulmaz)
+
+    ndjson: satır başına bir kayıt
+    json: {**head, key: [...], count_key: n} - sayaç dizi bittikten sonra yazılır
+    """
+    def ndjson():
+        for item in items:
+            yield json.dumps(item, ensure_ascii=False) + '\n'
+
+    def json_document():
+        prefix = json.dumps(head, ensure_ascii=False)[:-1]
+        yield f'{prefix}, "{key}": [' if head else f'{{"{key}": ['
+        count = 0
+        for item in items:
+            yield (',' if count else '') + json.dumps(item, ensure_ascii=False)
+            count += 1
+        yield f'], "{count_key}": {count}}}'
+
+    if fmt == 'ndjson':
+        return Response(stream_with_context(ndjson()), mimetype='application/x-ndjson')
+    return Response(stream_with_context(json_document()), mimetype='application/json')
+
+
+def _wants_percentiles(data: Dict, args: Optional[Dict] = None) -> bool:
+    """/analyze yanıtına popülasyon yüzdelikleri eklensin mi (gövde veya sorgu parametresi)"""
+    args = request.args if args is None else args
+    flag = data.get('include_percentiles', args.get('percentiles'))
+    return str(flag).lower() in ('1', 'true', 'yes')
+
+
+def _analysis_values(inputs: Dict, result: Dict) -> Dict:
+    """Yüzdelik hesabı için girdi ve sonuç değerleri"""
+    values = {key: inputs.get(key) for key in (
+        'sleep_hours', 'caffeine_mg', 'exercise_min', 'work_stress', 'environmental_score'
+    )}
+    values['stress_level'] = result.get('stress_level', result.get('stress'))
+    values['sleep_quality'] = result.get('sleep_quality')
+    return values
 
 @app.route("/")
+@http_cached(max_age=3600, sources=[APP_SOURCE])
 def index():
     return """
     <html>
@@ -69,8 +143,19 @@ def index():
                 <ul>
                     <li><b>POST /analyze</b> → Yeni analiz yap</li>
                     <li><b>POST /analyze-with-environment</b> → 🌤️ Çevresel faktörlerle analiz</li>
+                    <li><b>POST /analyze/batch</b> → Toplu analiz (JSON dizisi/NDJSON → NDJSON akış)</li>
                     <li><b>GET /history</b> → Geçmiş kayıtları getir</li>
                     <li><b>GET /trends</b> → Trend analizi</li>
+                    <li><b>GET /analytics</b> → Hareketli ortalamalar, yüzdelikler, kötü uyku serileri</li>
+                    <li><b>GET|POST /similar-profiles</b> → Benzer profillerin sonuçları (k-NN)</li>
+                    <li><b>GET /percentile</b> → Popülasyon içindeki yüzdelik</li>
+                    <li><b>GET /rule-stats</b> → Kural ateşlenme sıklıkları</li>
+                    <li><b>GET /export</b> → Geçmişi dışa aktar (NDJSON/CSV/Arrow/Parquet)</li>
+                    <li><b>POST /import</b> → Geçmiş kayıtları toplu içe aktar (NDJSON/CSV)</li>
+                    <li><b>GET /cache-stats</b> → Önbellek isabet oranları</li>
+                    <li><b>GET /metrics</b> → Prometheus metrikleri (aşama süreleri, sayaçlar)</li>
+                    <li><b>GET /events</b> → Canlı geçmiş ve trend güncellemeleri (SSE)</li>
+                    <li><b>GET /ready</b> → Hazırlık kontrolü (ısınma + veritabanı)</li>
                     <li><b>POST /download-report</b> → PDF rapor indir</li>
                     <li><b>GET /membership-plots</b> → Üyelik fonksiyonları</li>
                     <li><b>GET /rules</b> → Fuzzy kurallar listesi</li>
@@ -82,47 +167,183 @@ def index():
     </html>
     """
 
+def _analysis_response(result: Dict, data: Dict, fmt: str, include, timestamp: str) -> Response:
+    """/analyze yanıtı (ilk istekte ve saklı yanıtın tekrarında aynı biçim)"""
+    if is_compact(fmt):
+        return compact_response(compact_record(result, data, include, timestamp), fmt)
+
+    result = dict(result, active_rule_descriptions=[
+        {'id': r, 'description': RULE_DESCRIPTIONS[r]}
+        for r in result.get('active_rules', [])
+    ])
+    response = jsonify({
+        'input': data,
+        'result': result,
+        'timestamp': timestamp
+    })
+    response.vary.add('Accept')
+    return response
+
 @app.route("/analyze", methods=["POST"])
 def analyze_route():
-    """Temel analiz endpoint'i"""
-    data = request.get_json(force=True, silent=True)
+    """
+    Temel analiz endpoint'i (Accept ile kompakt JSON dizisi / MessagePack seçilebilir)
+
+    Idempotency-Key başlığı veya kısa süre içinde aynı gövde ile yapılan
+    tekrar denemeler yeniden hesaplanmaz; ilk yanıt döner.
+    """
+    fmt = negotiate(request.accept_mimetypes)
+    compact = is_compact(fmt)
+
+    def error(message, status):
+        if compact:
+            return compact_response({'error': message}, fmt, status)
+        return jsonify({'error': message}), status
+
+    data = read_request_data(request)
     if not data:
-        return jsonify({'error': 'JSON body expected'}), 400
+        return error('JSON body expected', 400)
+
+    try:
+        include = parse_include(data.get('include', request.args.get('include')))
+    except ValueError as e:
+        return error(str(e), 400)
+
+    user_id = data.get('user_id', 'anonymous')
+    try:
+        replay_entry = idempotency.request_key(user_id, request.headers.get(idempotency.IDEMPOTENCY_HEADER), data)
+        stored = idempotency.begin(replay_entry) if replay_entry else None
+    except idempotency.IdempotencyMismatch as e:
+        return error(str(e), 422)
+    except ValueError as e:
+        return error(str(e), 400)
+    except idempotency.IdempotencyConflict as e:
+        return error(str(e), 409)
+
+    if stored is not None:
+        response = _analysis_response(stored['result'], data, fmt, include, stored['timestamp'])
+        response.headers[idempotency.REPLAYED_HEADER] = 'true'
+        return response
+
+    # Parametreleri al (ham gövde yerine ayrıştırılmış sayılar kaydedilir: '7' → 7.0)
+    try:
+        inputs = parse_analysis_request(data)
+    except (TypeError, ValueError) as e:
+        if replay_entry:
+            idempotency.abandon(replay_entry)
+        return error(str(e), 400)
 
     try:
-        # Parametreleri al
-        sleep_hours = float(data.get('sleep_hours', 7))
-        caffeine_mg = float(data.get('caffeine_mg', 100))
-        exercise_min = float(data.get('exercise_min', 30))
-        work_stress = float(data.get('work_stress', 5))
-        
         # Analiz yap
         result = analyze(
-            sleep_hours=sleep_hours,
-            caffeine_mg=caffeine_mg,
-            exercise_min=exercise_min,
-            work_stress=work_stress
+            sleep_hours=inputs['sleep_hours'],
+            caffeine_mg=inputs['caffeine_mg'],
+            exercise_min=inputs['exercise_min'],
+            work_stress=inputs['work_stress'],
+            # /analyze/batch ve /import ile aynı: kaydedilen çevresel skor çıkarımda da kullanılır
+            environmental_score=inputs['environmental_score']
         )
         
         if result.get('error'):
-            return jsonify({'error': result['error']}), 500
-
-        result['active_rule_descriptions'] = [
-            {'id': r, 'description': RULE_DESCRIPTIONS[r]} 
-            for r in result.get('active_rules', [])
-        ]
+            raise RuntimeError(result['error'])
 
-        user_id = data.get('user_id', 'anonymous')
-        record_id = save_analysis(data, result, user_id)
+        record_id = save_analysis(inputs, result, user_id)
         result['record_id'] = record_id
 
-        return jsonify({
-            'input': data,
-            'result': result,
-            'timestamp': datetime.now().isoformat()
-        })
+        if _wants_percentiles(data):
+            result['population_percentiles'] = population_percentiles(_analysis_values(inputs, result))
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        if replay_entry:
+            idempotency.abandon(replay_entry)
+        return error(str(e), 500)
+
+    timestamp = datetime.now().isoformat()
+    if replay_entry:
+        idempotency.complete(replay_entry, {'result': result, 'timestamp': timestamp})
+    return _analysis_response(result, data, fmt, include, timestamp)
+
+
+def parse_analysis_request(data: Dict) -> Dict:
+    """/analyze girdileri (sayı olmayan veya sonlu olmayan değerlerde ValueError)"""
+    inputs = {
+        'sleep_hours': float(data.get('sleep_hours', 7)),
+        'caffeine_mg': float(data.get('caffeine_mg', 100)),
+        'exercise_min': float(data.get('exercise_min', 30)),
+        'work_stress': float(data.get('work_stress', 5)),
+        'environmental_score': float(data.get('environmental_score', 50))
+    }
+    for field, value in inputs.items():
+        if not math.isfinite(value):
+            raise ValueError(f'{field} sonlu bir sayı olmalı')
+    return inputs
+
+
+def parse_environment_request(data: Dict) -> Dict:
+    """/analyze-with-environment parametreleri (sayı olmayan değerlerde veya geçersiz şehirde ValueError)"""
+    city = data.get('city')
+    if city is None or (isinstance(city, str) and not city.strip()):
+        city = 'Istanbul'
+    elif isinstance(city, (int, float)) and not isinstance(city, bool):
+        city = str(city)
+    elif not isinstance(city, str):
+        raise ValueError('city metin olmalı')
+    return {
+        'sleep_hours': float(data.get('sleep_hours', 7)),
+        'caffeine_mg': float(data.get('caffeine_mg', 100)),
+        'exercise_min': float(data.get('exercise_min', 30)),
+        'work_stress': float(data.get('work_stress', 5)),
+        'city': city.strip()
+    }
+
+
+def run_environment_analysis(data: Dict, params: Dict, env_data: Dict, include_percentiles: bool = False):
+    """
+    Çevresel skorla analiz yap, kaydet ve yanıt gövdesini oluştur
+
+    Senkron (Flask) ve async (asgi_app) modları aynı işlevi kullanır;
+    async modda bu CPU/DB işi executor'da çalışır.
+
+    Returns:
+        (yanıt gövdesi, HTTP durum kodu)
+    """
+    environmental_score = env_data.get('environmental_score', 50)
+    
+    # Analiz yap
+    result = analyze(
+        sleep_hours=params['sleep_hours'],
+        caffeine_mg=params['caffeine_mg'],
+        exercise_min=params['exercise_min'],
+        work_stress=params['work_stress'],
+        environmental_score=environmental_score
+    )
+    
+    if result.get('error'):
+        return {'error': result['error']}, 500
+
+    result['active_rule_descriptions'] = [
+        {'id': r, 'description': RULE_DESCRIPTIONS[r]} 
+        for r in result.get('active_rules', [])
+    ]
+    
+    # Çevresel verileri ekle
+    result['environmental_data'] = env_data
+
+    user_id = data.get('user_id', 'anonymous')
+    
+    # Çevresel skoru da kaydet
+    inputs = {key: params[key] for key in ('sleep_hours', 'caffeine_mg', 'exercise_min', 'work_stress')}
+    inputs['environmental_score'] = environmental_score
+    record_id = save_analysis(inputs, result, user_id)
+    result['record_id'] = record_id
+
+    if include_percentiles:
+        result['population_percentiles'] = population_percentiles(_analysis_values(inputs, result))
+
+    return {
+        'input': data,
+        'result': result,
+        'timestamp': datetime.now().isoformat()
+    }, 200
 
 
 @app.route("/analyze-with-environment", methods=["POST"])
@@ -133,63 +354,58 @@ def analyze_with_environment():
         return jsonify({'error': 'JSON body expected'}), 400
 
     try:
-        # Parametreleri al
-        sleep_hours = float(data.get('sleep_hours', 7))
-        caffeine_mg = float(data.get('caffeine_mg', 100))
-        exercise_min = float(data.get('exercise_min', 30))
-        work_stress = float(data.get('work_stress', 5))
-        city = data.get('city', 'Istanbul')
-        
-        # Çevresel skoru hesapla
-        env_data = calculate_environmental_score(city)
-        environmental_score = env_data.get('environmental_score', 50)
-        
-        # Analiz yap
-        result = analyze(
-            sleep_hours=sleep_hours,
-            caffeine_mg=caffeine_mg,
-            exercise_min=exercise_min,
-            work_stress=work_stress,
-            environmental_score=environmental_score
-        )
-        
-        if result.get('error'):
-            return jsonify({'error': result['error']}), 500
+        params = parse_environment_request(data)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
 
-        result['active_rule_descriptions'] = [
-            {'id': r, 'description': RULE_DESCRIPTIONS[r]} 
-            for r in result.get('active_rules', [])
-        ]
-        
-        # Çevresel verileri ekle
-        result['environmental_data'] = env_data
-
-        user_id = data.get('user_id', 'anonymous')
+    try:
+        # Çevresel skoru hesapla (kaynaklar tek süre sınırı altında eşzamanlı çekilir; async mod için bkz. asgi_app.py)
+        env_data = calculate_environmental_score(params['city'])
         
-        # Çevresel skoru da kaydet
-        data_with_env = data.copy()
-        data_with_env['environmental_score'] = environmental_score
-        record_id = save_analysis(data_with_env, result, user_id)
-        result['record_id'] = record_id
-
-        return jsonify({
-            'input': data,
-            'result': result,
-            'timestamp': datetime.now().isoformat()
-        })
+        body, status = run_environment_analysis(data, params, env_data, _wants_percentiles(data))
+        return jsonify(body), status
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route("/analyze/batch", methods=["POST"])
+@admission_controlled('bulk')
+def analyze_batch_route():
+    """
+    Toplu analiz: JSON dizisi veya NDJSON gövde, NDJSON akış yanıtı
+
+    ?persist=1 ile sonuçlar toplu kaydedilir; ?user_id kayıtta user_id yoksa kullanılır.
+    """
+    chunks = iter_text_chunks(request.stream)
+    first = next(chunks, '')
+    fmt = request.args.get('format') or detect_batch_format(request.mimetype, first)
+
+    try:
+        records = iter_batch_records(itertools.chain([first], chunks), fmt)
+        chunk_size = int(request.args.get('chunk_size', 500))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    stream = analyze_stream(
+        records,
+        user_id=request.args.get('user_id', 'anonymous'),
+        persist=request.args.get('persist', '').lower() in ('1', 'true', 'yes'),
+        chunk_size=max(chunk_size, 1)
+    )
+    return Response(stream_with_context(stream), mimetype='application/x-ndjson')
+
 @app.route("/history")
 def history():
     user_id = request.args.get('user_id', 'anonymous')
     limit = int(request.args.get('limit', 10))
     
-    records = get_history(user_id, limit)
+    # Büyük limitler için imleçten akış: ?stream=ndjson veya ?stream=json
+    stream = request.args.get('stream')
+    if stream:
+        if stream not in STREAM_FORMATS:
+            return jsonify({'error': f"stream: {', '.join(STREAM_FORMATS)}"}), 400
+        return _stream_items(iter_history(user_id, limit), stream, 'records', {}, 'total')
     
-    for record in records:
-        if record.get('active_rules'):
-            record['active_rules'] = json.loads(record['active_rules'])
+    records = get_history(user_id, limit)
     
     return jsonify({
         'total': len(records),
@@ -201,6 +417,14 @@ def trends():
     user_id = request.args.get('user_id', 'anonymous')
     days = int(request.args.get('days', 7))
     
+    stream = request.args.get('stream')
+    if stream:
+        if stream not in STREAM_FORMATS:
+            return jsonify({'error': f"stream: {', '.join(STREAM_FORMATS)}"}), 400
+        return _stream_items(
+            iter_trend_data(user_id, days), stream, 'trends', {'period_days': days}, 'data_points'
+        )
+    
     trend_data = get_trend_data(user_id, days)
     
     return jsonify({
@@ -209,7 +433,216 @@ def trends():
         'trends': trend_data
     })
 
+@app.route("/events")
+def events():
+    """
+    Canlı dashboard olayları (Server-Sent Events)
+
+    Senkron sunucuda bekleyen olaylar yazılıp bağlantı kapatılır ve tarayıcı
+    Last-Event-ID ile yeniden bağlanır; async modda (asgi_app) bağlantı açık kalır.
+    """
+    if not EVENTS_ENABLED:
+        return jsonify({'error': 'Canlı olay akışı kapalı'}), 503
+    user_id = request.args.get('user_id', 'anonymous')
+    last_event_id = parse_last_event_id(request.headers.get('Last-Event-ID') or request.args.get('last_event_id'))
+    return Response(sync_stream(user_id, last_event_id), headers=SSE_HEADERS)
+
+@app.route("/analytics")
+def analytics():
+    """Hareketli ortalamalar, kayan yüzdelikler ve kötü uyku serileri"""
+    try:
+        result = get_rolling_analytics(
+            user_id=request.args.get('user_id', 'anonymous'),
+            days=int(request.args.get('days', 30)),
+            windows=parse_number_list(request.args.get('windows'), DEFAULT_WINDOWS),
+            percentiles=parse_number_list(request.args.get('percentiles'), DEFAULT_PERCENTILES),
+            percentile_window=int(request.args.get('percentile_window', 7)),
+            poor_sleep_threshold=float(request.args.get('poor_threshold', 40))
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(result)
+
+@app.route("/similar-profiles", methods=["GET", "POST"])
+def similar_profiles_route():
+    """
+    Benzer girdi profiline sahip diğer kullanıcıların sonuç özeti (KD-tree k-NN)
+
+    GET ?sleep_hours=6&caffeine_mg=200&...&k=20 veya aynı alanlarla JSON gövde
+    """
+    params = request.get_json(force=True, silent=True) if request.method == 'POST' else None
+    params = params or request.args
+    try:
+        inputs = {
+            field: float(params[field])
+            for field in ('sleep_hours', 'caffeine_mg', 'exercise_min', 'work_stress', 'environmental_score')
+            if params.get(field) is not None
+        }
+        result = similar_profiles.query(
+            inputs,
+            k=int(params.get('k', 20)),
+            exclude_user=params.get('user_id')
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    result['query'] = inputs
+    return jsonify(result)
+
+@app.route("/percentile")
+def percentile():
+    """
+    Popülasyon yüzdeliği (önceden hesaplanmış histogramlardan)
+
+    ?metric=stress_level&value=62 → tek değer
+    ?user_id=user123 → kullanıcının son analizindeki tüm metrikler
+    """
+    metric = request.args.get('metric')
+    value = request.args.get('value')
+    try:
+        if metric and value is not None:
+            value = float(value)
+            if not math.isfinite(value):
+                raise ValueError('value sonlu bir sayı olmalı')
+            return jsonify({
+                'metric': metric,
+                'value': value,
+                'percentile': percentile_rank(metric, value),
+                'population_size': population_size()
+            })
+
+        user_id = request.args.get('user_id', 'anonymous')
+        latest = get_history(user_id, 1)
+        if not latest:
+            return jsonify({'error': f'{user_id} için kayıt bulunamadı'}), 404
+        record = latest[0]
+        percentiles = population_percentiles(_analysis_values(record['inputs'], record['results']))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if metric:
+        percentiles = {k: v for k, v in percentiles.items() if k == metric}
+    return jsonify({
+        'user_id': user_id,
+        'timestamp': record['timestamp'],
+        'percentiles': percentiles,
+        'population_size': population_size()
+    })
+
+@app.route("/rule-stats")
+def rule_stats():
+    """Kural ateşlenme sıklıkları (SQL içinde bit maskesiyle hesaplanır)"""
+    try:
+        start = parse_time_filter(request.args.get('start'))
+        end = parse_time_filter(request.args.get('end'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    stats = get_rule_stats(
+        user_id=request.args.get('user_id'),  # Verilmezse tüm kullanıcılar
+        start=start,
+        end=end
+    )
+    stats.update({'user_id': request.args.get('user_id'), 'start': start, 'end': end})
+    return jsonify(stats)
+
+@app.route("/cache-stats")
+def cache_stats():
+    """Bellek içi önbelleklerin isabet oranları (bu worker süreci için)"""
+    return jsonify({'pid': os.getpid(), 'caches': all_cache_stats()})
+
+@app.route("/metrics")
+def metrics():
+    """Prometheus metrikleri (PROMETHEUS_MULTIPROC_DIR ayarlıysa tüm worker'ların toplamı)"""
+    body, content_type = render_metrics()
+    return Response(body, content_type=content_type)
+
+@app.route("/health")
+def health():
+    """Canlılık kontrolü (süreç yanıt veriyor)"""
+    return jsonify({'status': 'ok', 'pid': os.getpid()})
+
+@app.route("/ready")
+def ready():
+    """Hazırlık kontrolü: ısınma yapıldı ve veritabanı erişilebilir (değilse 503)"""
+    is_ready, checks = readiness()
+    checks.update({'status': 'ready' if is_ready else 'not_ready', 'pid': os.getpid(), 'warmup': warmup_timings()})
+    return jsonify(checks), 200 if is_ready else 503
+
+@app.route("/profiles")
+def profiles():
+    """Saklanan istek profilleri (X-Profile-Token gerekli)"""
+    if not token_valid(request.headers.get(TOKEN_HEADER)):
+        abort(404)
+    limit = request.args.get('limit', 50, type=int)
+    return jsonify({'profiles': list_profiles(limit)})
+
+@app.route("/profiles/<profile_id>/<kind>")
+def profile_file(profile_id, kind):
+    """Profil dosyası: pstats, collapsed veya summary (X-Profile-Token gerekli)"""
+    if not token_valid(request.headers.get(TOKEN_HEADER)):
+        abort(404)
+    path = profile_path(profile_id, kind)
+    if path is None:
+        abort(404)
+    return send_file(path, as_attachment=kind == 'pstats', download_name=os.path.basename(path))
+
+@app.route("/export")
+@admission_controlled('bulk')
+def export_history():
+    """Geçmiş kayıtlarını akış halinde dışa aktar (ndjson, csv, arrow, parquet)"""
+    fmt = request.args.get('format', 'ndjson')
+    user_id = request.args.get('user_id')  # Verilmezse tüm tablo (yalnızca yönetici)
+    if user_id is None and not token_valid(request.headers.get(TOKEN_HEADER)):
+        return jsonify({'error': f'user_id gerekli (tüm kullanıcılar için {TOKEN_HEADER} başlığı)'}), 403
+
+    try:
+        stream = stream_export(
+            fmt=fmt,
+            user_id=user_id,
+            start=request.args.get('start'),
+            end=request.args.get('end')
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 501
+
+    filename = f"history_{user_id or 'all'}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{FORMAT_EXTENSIONS[fmt]}"
+    return Response(
+        stream_with_context(stream),
+        mimetype=FORMAT_MIMETYPES[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+@app.route("/import", methods=["POST"])
+@admission_controlled('bulk')
+def import_history():
+    """Geçmiş kayıtları toplu içe aktar (NDJSON/CSV dosya yükleme veya ham gövde)"""
+    upload = request.files.get('file')
+    if upload:
+        stream, filename, content_type = upload.stream, upload.filename, upload.mimetype
+    else:
+        stream, filename, content_type = request.stream, None, request.mimetype
+
+    fmt = request.args.get('format') or detect_format(filename, content_type)
+    if not fmt:
+        return jsonify({'error': 'format belirlenemedi (ndjson veya csv)'}), 400
+
+    try:
+        report = import_records(
+            decode_lines(stream),
+            fmt,
+            user_id=request.args.get('user_id', 'anonymous'),
+            chunk_size=int(request.args.get('chunk_size', 500))
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify(report)
+
 @app.route("/download-report", methods=["POST"])
+@admission_controlled('heavy')
 def download_report():
     data = request.get_json(force=True, silent=True)
     if not data:
@@ -228,6 +661,8 @@ def download_report():
     )
 
 @app.route("/membership-plots")
+@http_cached(max_age=3600, sources=[MODEL_SOURCE])
+@admission_controlled('heavy')
 def membership_plots():
     img_data = get_membership_plots()
     html = f"""
@@ -262,6 +697,7 @@ def membership_plots():
     return html
 
 @app.route("/rules")
+@http_cached(max_age=3600, sources=[MODEL_SOURCE])
 def rules():
     return jsonify({
         'total_rules': len(RULE_DESCRIPTIONS),
@@ -269,9 +705,10 @@ def rules():
     })
 
 @app.route("/validation-report")
+@http_cached(max_age=300, sources=[VALIDATION_REPORT_PATH])
 def validation_report():
     """Model doğrulama HTML raporunu göster"""
-    report_path = 'static/validation_report.html'
+    report_path = VALIDATION_REPORT_PATH
     
     if not os.path.exists(report_path):
         return """
@@ -291,10 +728,12 @@ python validate_model.py
         return f.read()
 
 @app.route("/dashboard")
+@http_cached(max_age=300, sources=[source_path('templates', 'dashboard.html')])
 def dashboard():
     return render_template('dashboard.html')
 
 @app.route("/api-docs")
+@http_cached(max_age=3600, sources=[APP_SOURCE])
 def api_docs():
     return """
     <html>
@@ -356,4 +795,5 @@ if __name__ == "__main__":
     # Debug mode should be disabled in production
     # Set via environment variable: FLASK_DEBUG=1 for development
     debug_mode = os.environ.get('FLASK_DEBUG', '0') == '1'
+    warm_up(app)
     app.run(debug=debug_mode, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,306 @@
+"""
+ASGI Sunucu Modu (async)
+/analyze-with-environment harici API'leri tek event loop'ta eşzamanlı bekler;
+fuzzy çıkarım ve veritabanı yazımı thread havuzunda çalışır. Böylece tek bir
+worker yüzlerce bekleyen çevresel isteği tutabilir. /events (SSE) bağlantıları
+da event loop'ta açık tutulur. Diğer tüm yollar değiştirilmeden Flask
+uygulamasına (WSGI köprüsü) iletilir; köprü Flask'ı kendi thread havuzunda
+çalıştırır ve environ'u kendisi kurar.
+Python 3.9 Uyumlu
+
+Kullanım:
+    uvicorn asgi_app:app --workers 2 --port 5000
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs
+import asyncio
+import json
+import os
+import sys
+import time
+
+from app import app as flask_app, parse_environment_request, run_environment_analysis, _wants_percentiles
+from external_apis_async import calculate_environmental_score_async, create_client
+from live_updates import EVENTS_PATH, EventHub
+from metrics import ERRORS, IN_PROGRESS, QUEUE_DEPTH, REQUEST_SECONDS, REQUESTS
+from warmup import warm_up
+
+
+# Çıkarım/DB işi için thread sayısı ve async istemcinin bağlantı havuzu
+EXECUTOR_WORKERS = int(os.getenv('ASGI_EXECUTOR_WORKERS', '8'))
+MAX_CONNECTIONS = int(os.getenv('ASGI_MAX_CONNECTIONS', '500'))
+# Flask'a iletilen isteklerin (WSGI köprüsü) eşzamanlı thread sayısı
+WSGI_THREADS = int(os.getenv('ASGI_WSGI_THREADS', '16'))
+
+ENVIRONMENT_PATH = '/analyze-with-environment'
+
+
+class PooledWsgiInstance:
+    """
+    Tek isteklik ASGI → WSGI köprüsü; Flask verilen thread havuzunda çalışır
+
+    Her istek havuzdan bir thread alır (tek bir thread'e sıralanmaz). Yanıt
+    mesajları event loop'a run_coroutine_threadsafe ile iletilir ve gönderilene
+    kadar beklenir (akış yanıtlarında geri basınç). environ (PEP 3333) ve
+    start_response burada kurulur; harici köprü kütüphanesinin iç API'lerine
+    bağımlılık yoktur.
+    """
+
+    def __init__(self, wsgi_application, executor: ThreadPoolExecutor):
+        self.wsgi_application = wsgi_application
+        self.executor = executor
+        self.response_start: Optional[Dict] = None
+        self.response_started = False
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            raise ValueError('WSGI köprüsü yalnızca HTTP isteklerini işler')
+        loop = asyncio.get_running_loop()
+        with SpooledTemporaryFile(max_size=65536) as body:
+            while True:
+                message = await receive()
+                if message['type'] != 'http.request':
+                    return  # istemci gövde tamamlanmadan ayrıldı
+                body.write(message.get('body', b''))
+                if not message.get('more_body'):
+                    break
+            body.seek(0)
+
+            def sync_send(message):
+                asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+            await loop.run_in_executor(self.executor, self._run_wsgi, scope, body, sync_send)
+
+    def start_response(self, status: str, response_headers, exc_info=None):
+        """WSGI start_response: durum ve başlıkları ilk gövde parçasına kadar saklar"""
+        if exc_info is not None and self.response_started:
+            raise exc_info[1].with_traceback(exc_info[2])
+        if self.response_start is not None and exc_info is None:
+            raise RuntimeError('start_response ikinci kez çağrıldı')
+        self.response_start = {
+            'type': 'http.response.start',
+            'status': int(status.split(' ', 1)[0]),
+            'headers': [
+                (name.lower().encode('latin-1'), value.encode('latin-1'))
+                for name, value in response_headers
+            ],
+        }
+
+    def _run_wsgi(self, scope, body, sync_send):
+        output = self.wsgi_application(build_environ(scope, body), self.start_response)
+        try:
+            for chunk in output:
+                if not self.response_started:
+                    self.response_started = True
+                    sync_send(self.response_start)
+                if chunk:
+                    sync_send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        finally:
+            # WSGI sözleşmesi: close() Flask'ın istek sonu işlerini (teardown) çalıştırır
+            close = getattr(output, 'close', None)
+            if close is not None:
+                close()
+        if not self.response_started:
+            self.response_started = True
+            sync_send(self.response_start)
+        sync_send({'type': 'http.response.body'})
+
+
+def build_environ(scope: Dict, body) -> Dict:
+    """
+    ASGI HTTP scope'undan WSGI environ sözlüğü kur (PEP 3333)
+
+    Args:
+        scope: dict - ASGI HTTP scope
+        body: dosya benzeri - okunmaya hazır istek gövdesi
+
+    Returns:
+        dict - WSGI environ
+    """
+    root_path = scope.get('root_path', '')
+    path = scope['path']
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root_path.encode('utf-8').decode('latin-1'),
+        # WSGI yolları latin-1 ile çözülmüş bayt dizileridir
+        'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        # Gövde tamamen tamponlandı; Content-Length'siz (chunked) gövdeler de okunabilir
+        'wsgi.input_terminated': True,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+
+    server = scope.get('server') or ('localhost', 80)
+    environ['SERVER_NAME'] = server[0]
+    environ['SERVER_PORT'] = str(server[1] or 80)
+    client = scope.get('client')
+    if client:
+        environ['REMOTE_ADDR'] = client[0]
+        environ['REMOTE_PORT'] = str(client[1])
+
+    for raw_name, raw_value in scope.get('headers', []):
+        name = raw_name.decode('latin-1')
+        if name == 'content-length':
+            key = 'CONTENT_LENGTH'
+        elif name == 'content-type':
+            key = 'CONTENT_TYPE'
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+        value = raw_value.decode('latin-1')
+        # Tekrarlanan başlıklar virgülle birleştirilir (RFC 9110)
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+class AsyncEnvironmentApp:
+    """
+    /analyze-with-environment isteğini async işleyen, gerisini Flask'a ileten ASGI uygulaması
+
+    Yanıt formatı ve durum kodları Flask route'u ile aynıdır.
+    """
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.client = None
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.wsgi_executor: Optional[ThreadPoolExecutor] = None
+        self.events = EventHub()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif (
+            scope['type'] == 'http'
+            and scope['path'] == ENVIRONMENT_PATH
+            and scope['method'] == 'POST'
+        ):
+            await self._analyze_with_environment(scope, receive, send)
+        elif scope['type'] == 'http' and scope['path'] == EVENTS_PATH and scope['method'] == 'GET':
+            # SSE bağlantıları açık kalır; boşta yalnızca bir coroutine tutar
+            self._start()
+            await self.events.stream(scope, receive, send, self.executor)
+        elif scope['type'] == 'http':
+            self._start()
+            await PooledWsgiInstance(self.flask_app, self.wsgi_executor)(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                # Worker trafik almadan önce ısınır (uvicorn worker'ları fork değil spawn ile başlar)
+                warm_up(self.flask_app)
+                self._start()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self._stop()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _start(self):
+        if self.client is None:
+            self.client = create_client(MAX_CONNECTIONS)
+            self.executor = ThreadPoolExecutor(EXECUTOR_WORKERS, thread_name_prefix='asgi-analyze')
+            self.wsgi_executor = ThreadPoolExecutor(WSGI_THREADS, thread_name_prefix='asgi-wsgi')
+
+    async def _stop(self):
+        await self.events.stop()
+        if self.client is not None:
+            await self.client.aclose()
+            self.executor.shutdown(wait=True)
+            self.wsgi_executor.shutdown(wait=True)
+            self.client = None
+            self.executor = None
+            self.wsgi_executor = None
+
+    async def _analyze_with_environment(self, scope, receive, send):
+        # Lifespan desteklemeyen sunucularda ilk istekte başlat
+        self._start()
+
+        started = time.perf_counter()
+        IN_PROGRESS.labels(ENVIRONMENT_PATH).inc()
+        try:
+            status = await self._handle_environment(scope, receive, send)
+        finally:
+            IN_PROGRESS.labels(ENVIRONMENT_PATH).dec()
+            REQUEST_SECONDS.labels(ENVIRONMENT_PATH, 'POST').observe(time.perf_counter() - started)
+        REQUESTS.labels(ENVIRONMENT_PATH, 'POST', str(status)).inc()
+        if status >= 500:
+            ERRORS.labels(ENVIRONMENT_PATH).inc()
+
+    async def _handle_environment(self, scope, receive, send) -> int:
+        body = await _read_body(receive)
+        try:
+            data = json.loads(body) if body else None
+        except ValueError:
+            data = None
+        if not isinstance(data, dict) or not data:
+            await self._send_json(send, {'error': 'JSON body expected'}, 400)
+            return 400
+
+        query = {key: values[-1] for key, values in parse_qs(scope.get('query_string', b'').decode()).items()}
+        loop = asyncio.get_running_loop()
+        try:
+            params = parse_environment_request(data)
+        except (TypeError, ValueError) as e:
+            await self._send_json(send, {'error': str(e)}, 400)
+            return 400
+
+        try:
+            env_data = await calculate_environmental_score_async(self.client, params['city'], self.executor)
+            QUEUE_DEPTH.labels('asgi_executor').inc()
+            payload, status = await loop.run_in_executor(
+                self.executor, self._run_analysis, data, params, env_data, _wants_percentiles(data, query)
+            )
+        except Exception as e:
+            payload, status = {'error': str(e)}, 500
+        await self._send_json(send, payload, status)
+        return status
+
+    def _run_analysis(self, data: Dict, params: Dict, env_data: Dict, include_percentiles: bool) -> Tuple[Dict, int]:
+        # İş thread'e alındı; kuyruk derinliği executor'da bekleyenleri gösterir
+        QUEUE_DEPTH.labels('asgi_executor').dec()
+        # jsonify ile aynı serileştirme için uygulama bağlamı gerekir
+        with self.flask_app.app_context():
+            payload, status = run_environment_analysis(data, params, env_data, include_percentiles)
+            return self.flask_app.json.dumps(payload).encode('utf-8'), status
+
+    async def _send_json(self, send, payload, status: int):
+        if not isinstance(payload, bytes):
+            with self.flask_app.app_context():
+                payload = self.flask_app.json.dumps(payload).encode('utf-8')
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(payload) + 1).encode())
+            ]
+        })
+        await send({'type': 'http.response.body', 'body': payload + b'\n'})
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body', False):
+            break
+    return b''.join(chunks)
+
+
+app = AsyncEnvironmentApp(flask_app)
@@ -0,0 +1,234 @@
+"""
+Toplu Analiz (/analyze/batch)
+JSON dizisi veya NDJSON akışı halinde gelen kayıtları parça parça okur,
+fuzzy model ile vektörel skorlar, isteğe bağlı olarak toplu kaydeder ve
+sonuçları NDJSON olarak akıtır; bellek kullanımı parça boyutuyla sınırlıdır.
+Python 3.9 Uyumlu
+"""
+
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from datetime import datetime
+import codecs
+import json
+import time
+
+from fuzzy_model import analyze_batch, RULE_DESCRIPTIONS
+from database import insert_analyses
+from bulk_import import iter_raw_records, validate_record
+
+
+BATCH_FORMATS = ('json', 'ndjson')
+DEFAULT_CHUNK_SIZE = 500
+READ_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+
+
+def iter_text_chunks(binary_stream, read_size: int = READ_SIZE) -> Iterator[str]:
+    """Binary akışı parça parça UTF-8 metne çevir (BOM atlanır)"""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    while True:
+        data = binary_stream.read(read_size)
+        if not data:
+            break
+        text = decoder.decode(data)
+        if text:
+            yield text
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+def iter_json_array(chunks: Iterable[str]) -> Iterator[Tuple[int, object]]:
+    """
+    JSON dizisini tamamını belleğe almadan eleman eleman ayrıştır
+
+    Yields:
+        (eleman no, dict) veya hatalı elemanlar için (eleman no, ValueError)
+
+    Raises:
+        ValueError - gövde bir JSON dizisi değilse veya yapı bozuksa
+    """
+    chunks = iter(chunks)
+    buffer = ''
+    position = 0
+    index = 0
+    started = False
+    exhausted = False
+
+    def fill():
+        nonlocal buffer, position, exhausted
+        chunk = next(chunks, None)
+        if chunk is None:
+            exhausted = True
+            return False
+        buffer = buffer[position:] + chunk
+        position = 0
+        return True
+
+    def skip_whitespace():
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n':
+                position += 1
+            if position < len(buffer) or not fill():
+                return
+
+    skip_whitespace()
+    if position >= len(buffer) or buffer[position] != '[':
+        raise ValueError('Gövde bir JSON dizisi olmalı')
+    position += 1
+
+    while True:
+        skip_whitespace()
+        if position >= len(buffer):
+            raise ValueError('JSON dizisi tamamlanmamış')
+        char = buffer[position]
+        if char == ']':
+            return
+        if started:
+            if char != ',':
+                raise ValueError(f'{index}. elemandan sonra "," bekleniyordu')
+            position += 1
+            skip_whitespace()
+        started = True
+
+        # Eleman tamamlanana kadar yeni parça oku
+        while True:
+            try:
+                record, end = _decoder.raw_decode(buffer, position)
+            except ValueError as e:
+                if exhausted or not fill():
+                    raise ValueError(f'{index + 1}. eleman geçersiz JSON: {e}')
+                continue
+            # Sayı gibi değerler parça sınırında kesilmiş olabilir
+            if end == len(buffer) and not exhausted and fill():
+                continue
+            position = end
+            break
+
+        index += 1
+        if isinstance(record, dict):
+            yield index, record
+        else:
+            yield index, ValueError('Her eleman bir JSON nesnesi olmalı')
+
+
+def detect_batch_format(content_type: Optional[str], first_chunk: str) -> str:
+    """Content-Type veya ilk karakterden formatı belirle"""
+    if content_type and ('ndjson' in content_type or 'jsonl' in content_type):
+        return 'ndjson'
+    return 'json' if first_chunk.lstrip().startswith('[') else 'ndjson'
+
+
+def _split_lines(chunks: Iterable[str]) -> Iterator[str]:
+    pending = ''
+    for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split('\n')
+        yield from lines
+    if pending:
+        yield pending
+
+
+def iter_batch_records(chunks: Iterable[str], fmt: str) -> Iterator[Tuple[int, object]]:
+    """Metin parçalarından (no, ham kayıt veya hata) üret"""
+    if fmt not in BATCH_FORMATS:
+        raise ValueError(f"Desteklenmeyen format: {fmt} (seçenekler: {', '.join(BATCH_FORMATS)})")
+    if fmt == 'json':
+        return iter_json_array(chunks)
+    return iter_raw_records(_split_lines(chunks), 'ndjson')
+
+
+def _score_chunk(chunk: List[Tuple[int, Dict, Dict, str, Optional[str]]], persist: bool) -> List[str]:
+    """Parçayı skorla, isteğe bağlı kaydet ve /analyze formatında NDJSON satırları döndür"""
+    results = analyze_batch(
+        [inputs['sleep_hours'] for _, _, inputs, _, _ in chunk],
+        [inputs['caffeine_mg'] for _, _, inputs, _, _ in chunk],
+        [inputs['exercise_min'] for _, _, inputs, _, _ in chunk],
+        [inputs['work_stress'] for _, _, inputs, _, _ in chunk],
+        [inputs['environmental_score'] for _, _, inputs, _, _ in chunk]
+    )
+    for result in results:
+        result['active_rule_descriptions'] = [
+            {'id': r, 'description': RULE_DESCRIPTIONS[r]}
+            for r in result.get('active_rules', [])
+        ]
+
+    if persist:
+        ids = insert_analyses([
+            (inputs, result, user_id, timestamp)
+            for (_, _, inputs, user_id, timestamp), result in zip(chunk, results)
+        ])
+        for result, record_id in zip(results, ids):
+            result['record_id'] = record_id
+
+    now = datetime.now().isoformat()
+    return [
+        json.dumps({'line': line_no, 'input': raw, 'result': result, 'timestamp': now}, ensure_ascii=False) + '\n'
+        for (line_no, raw, _, _, _), result in zip(chunk, results)
+    ]
+
+
+def analyze_stream(
+    records: Iterable[Tuple[int, object]],
+    user_id: str = 'anonymous',
+    persist: bool = False,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[str]:
+    """
+    Kayıtları parça parça analiz et ve NDJSON satırları üret
+
+    Her kayıt için /analyze ile aynı 'input'/'result'/'timestamp' alanları ve
+    kaynak satır/eleman numarası ('line') döner. Hatalı kayıtlar
+    {"line": n, "error": "..."} olarak raporlanır. Son satır özet içerir.
+    """
+    started = time.perf_counter()
+    summary = {'records': 0, 'analyzed': 0, 'failed': 0, 'persisted': persist}
+    chunk = []
+    errors = []  # (no, NDJSON satırı) - çıktı sırası girdi sırasıyla aynı kalır
+
+    def error_line(line_no, message):
+        summary['failed'] += 1
+        return line_no, json.dumps({'line': line_no, 'error': message}, ensure_ascii=False) + '\n'
+
+    def flush():
+        lines = []
+        try:
+            if chunk:
+                lines = list(zip((entry[0] for entry in chunk), _score_chunk(chunk, persist)))
+                summary['analyzed'] += len(lines)
+        except Exception as e:
+            # Parçanın transaction'ı geri alındı; kayıtlar hatalı sayılır
+            lines = [error_line(entry[0], f'Kayıt hatası: {e}') for entry in chunk]
+        lines = sorted(lines + errors, key=lambda item: item[0])
+        chunk.clear()
+        errors.clear()
+        return ''.join(line for _, line in lines)
+
+    try:
+        for line_no, raw in records:
+            summary['records'] += 1
+            if isinstance(raw, Exception):
+                errors.append(error_line(line_no, str(raw)))
+            else:
+                try:
+                    inputs, record_user, timestamp = validate_record(raw, user_id)
+                    chunk.append((line_no, raw, inputs, record_user, timestamp))
+                except ValueError as e:
+                    errors.append(error_line(line_no, str(e)))
+
+            # Hata satırları da bellekte biriktiğinden parça sınırına sayılır
+            if len(chunk) + len(errors) >= chunk_size:
+                yield flush()
+    except ValueError as e:
+        # Gövde yapısı bozuk (örn. kapanmamış JSON dizisi); o ana kadarki kayıtlar işlenir
+        summary['error'] = str(e)
+
+    if chunk or errors:
+        yield flush()
+
+    elapsed = time.perf_counter() - started
+    summary['elapsed_sec'] = round(elapsed, 3)
+    summary['records_per_sec'] = round(summary['records'] / elapsed, 1) if elapsed > 0 else 0.0
+    yield json.dumps({'summary': summary}, ensure_ascii=False) + '\n'
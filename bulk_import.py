@@ -0,0 +1,287 @@
+"""
+Toplu Geçmiş Kayıt İçe Aktarma
+Giyilebilir cihaz dışa aktarımları gibi NDJSON/CSV dosyalarındaki geçmiş
+kayıtları doğrular, fuzzy model ile toplu (vektörel) skorlar ve parça parça
+transaction'lar içinde executemany ile kaydeder.
+Python 3.9 Uyumlu
+
+Kullanım:
+    python bulk_import.py export.csv --user-id user123
+    python bulk_import.py export.ndjson --chunk-size 1000
+"""
+
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from datetime import datetime
+import argparse
+import codecs
+import csv
+import json
+import math
+import sys
+import time
+
+from fuzzy_model import analyze_batch
+from database import INPUT_DEFAULTS, INPUT_FIELDS, save_analyses_bulk
+
+
+IMPORT_FORMATS = ('ndjson', 'csv')
+
+# Kabul edilen değer aralıkları (dahil)
+INPUT_RANGES = {
+    'sleep_hours': (0, 24),
+    'caffeine_mg': (0, 2000),
+    'exercise_min': (0, 1440),
+    'work_stress': (0, 10),
+    'environmental_score': (0, 100)
+}
+
+DEFAULT_CHUNK_SIZE = 500
+MAX_REPORTED_ERRORS = 100
+
+
+def detect_format(filename: Optional[str] = None, content_type: Optional[str] = None) -> Optional[str]:
+    """Dosya adı veya content-type'tan formatı tahmin et"""
+    if filename:
+        lower = filename.lower()
+        if lower.endswith('.csv'):
+            return 'csv'
+        if lower.endswith(('.ndjson', '.jsonl')):
+            return 'ndjson'
+    if content_type:
+        if 'csv' in content_type:
+            return 'csv'
+        if 'ndjson' in content_type or 'jsonl' in content_type or 'json' in content_type:
+            return 'ndjson'
+    return None
+
+
+def _iter_csv_records(lines: Iterable[str]) -> Iterator[Tuple[int, object]]:
+    """
+    CSV satırlarını ham kayıtlara çevir (bkz. iter_raw_records)
+
+    csv.Error (alan boyutu sınırı, NUL baytı vb.) o kaydı hatalı sayar, okuma
+    sonraki satırdan sürer. Kapanmamış tırnak sonraki tüm satırları tek kayda
+    katar; son kayıtta tırnak sayısı tekse kayıt reddedilir.
+    """
+    counts = {'lines': 0, 'quotes': 0}
+
+    def counted():
+        for line in lines:
+            counts['lines'] += 1
+            counts['quotes'] += line.count('"')
+            yield line
+
+    reader = csv.DictReader(counted())
+    try:
+        reader.fieldnames
+    except csv.Error as e:
+        yield counts['lines'], ValueError(f'Geçersiz CSV başlığı: {e}')
+        return
+
+    pending = None  # (başlangıç satırı, kayıt, tırnak sayısı); son kayıt ayrıca kontrol edilir
+    while True:
+        start = counts['lines'] + 1
+        counts['quotes'] = 0
+        try:
+            row = next(reader)
+        except StopIteration:
+            break
+        except csv.Error as e:
+            if pending is not None:
+                yield pending[0], pending[1]
+                pending = None
+            yield counts['lines'], ValueError(f'Geçersiz CSV satırı: {e}')
+            continue
+        if pending is not None:
+            yield pending[0], pending[1]
+            pending = None
+        # Boş hücreler eksik alan sayılır, tamamen boş satırlar atlanır
+        record = {k: v for k, v in row.items() if k and v not in (None, '')}
+        if record:
+            pending = (start, record, counts['quotes'])
+
+    if pending is not None:
+        if pending[2] % 2:
+            yield pending[0], ValueError('Kapanmamış tırnak: kayıt dosya sonuna kadar sürüyor')
+        else:
+            yield pending[0], pending[1]
+
+
+def iter_raw_records(lines: Iterable[str], fmt: str) -> Iterator[Tuple[int, object]]:
+    """
+    Satırları ham kayıtlara çevir
+
+    Yields:
+        (satır no, dict) veya ayrıştırılamayan satırlar için (satır no, ValueError)
+    """
+    if fmt == 'csv':
+        yield from _iter_csv_records(lines)
+        return
+
+    for line_no, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_no, ValueError(f'Geçersiz JSON: {e}')
+            continue
+        if not isinstance(record, dict):
+            yield line_no, ValueError('Her satır bir JSON nesnesi olmalı')
+            continue
+        yield line_no, record
+
+
+def validate_record(raw: Dict, default_user: str) -> Tuple[Dict, str, Optional[str]]:
+    """
+    Ham kaydı doğrula
+
+    Returns:
+        (inputs, user_id, timestamp)
+
+    Raises:
+        ValueError - geçersiz alan
+    """
+    inputs = {}
+    for field in INPUT_FIELDS:
+        value = raw.get(field, INPUT_DEFAULTS[field])
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f'{field} sayı olmalı: {value!r}')
+        low, high = INPUT_RANGES[field]
+        if math.isnan(value) or not low <= value <= high:
+            raise ValueError(f'{field} {low}-{high} aralığında olmalı: {value}')
+        inputs[field] = value
+
+    timestamp = raw.get('timestamp')
+    if timestamp:
+        try:
+            timestamp = datetime.fromisoformat(str(timestamp)).isoformat()
+        except ValueError:
+            raise ValueError(f'Geçersiz timestamp: {timestamp!r}')
+
+    user_id = str(raw.get('user_id') or default_user)
+    return inputs, user_id, timestamp
+
+
+def _score_and_save(chunk: List[Tuple[int, Dict, str, Optional[str]]]) -> int:
+    """Bir parçayı toplu skorla ve tek transaction'da kaydet"""
+    results = analyze_batch(
+        [inputs['sleep_hours'] for _, inputs, _, _ in chunk],
+        [inputs['caffeine_mg'] for _, inputs, _, _ in chunk],
+        [inputs['exercise_min'] for _, inputs, _, _ in chunk],
+        [inputs['work_stress'] for _, inputs, _, _ in chunk],
+        [inputs['environmental_score'] for _, inputs, _, _ in chunk]
+    )
+    return save_analyses_bulk([
+        (inputs, result, user_id, timestamp)
+        for (_, inputs, user_id, timestamp), result in zip(chunk, results)
+    ])
+
+
+def import_records(
+    lines: Iterable[str],
+    fmt: str,
+    user_id: str = 'anonymous',
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Dict:
+    """
+    Kayıtları içe aktar; hatalı satırlar raporlanır, yükleme durmaz
+
+    Args:
+        lines: satır iterable'ı (dosya veya HTTP gövdesi)
+        fmt: 'ndjson' veya 'csv'
+        user_id: satırda user_id yoksa kullanılacak kimlik
+        chunk_size: transaction başına kayıt sayısı
+
+    Returns:
+        dict - toplam/aktarılan/hatalı satır sayıları, hatalar ve satır/saniye
+    """
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"Desteklenmeyen format: {fmt} (seçenekler: {', '.join(IMPORT_FORMATS)})")
+
+    started = time.perf_counter()
+    report = {'rows_total': 0, 'rows_imported': 0, 'rows_failed': 0, 'errors': []}
+
+    def add_error(line_no, message):
+        report['rows_failed'] += 1
+        if len(report['errors']) < MAX_REPORTED_ERRORS:
+            report['errors'].append({'line': line_no, 'error': message})
+
+    def flush(chunk):
+        try:
+            report['rows_imported'] += _score_and_save(chunk)
+        except Exception as e:
+            # Parçanın transaction'ı geri alındı; satırlar hatalı sayılır
+            for line_no, _, _, _ in chunk:
+                add_error(line_no, f'Kayıt hatası: {e}')
+
+    chunk = []
+    for line_no, raw in iter_raw_records(lines, fmt):
+        report['rows_total'] += 1
+        if isinstance(raw, Exception):
+            add_error(line_no, str(raw))
+            continue
+        try:
+            inputs, record_user, timestamp = validate_record(raw, user_id)
+        except ValueError as e:
+            add_error(line_no, str(e))
+            continue
+
+        chunk.append((line_no, inputs, record_user, timestamp))
+        if len(chunk) >= chunk_size:
+            flush(chunk)
+            chunk = []
+
+    if chunk:
+        flush(chunk)
+
+    elapsed = time.perf_counter() - started
+    report['elapsed_sec'] = round(elapsed, 3)
+    report['rows_per_sec'] = round(report['rows_total'] / elapsed, 1) if elapsed > 0 else 0.0
+    if report['rows_failed'] > len(report['errors']):
+        report['errors_truncated'] = True
+    return report
+
+
+def decode_lines(binary_stream) -> Iterator[str]:
+    """Binary akışı satır satır UTF-8 metne çevir (BOM atlanır)"""
+    return codecs.iterdecode(binary_stream, 'utf-8-sig')
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Geçmiş kayıtları toplu içe aktar')
+    parser.add_argument('path', help='NDJSON veya CSV dosyası ("-" ise stdin)')
+    parser.add_argument('--format', '-f', choices=IMPORT_FORMATS,
+                        help='Dosya formatı (varsayılan: uzantıdan)')
+    parser.add_argument('--user-id', default='anonymous',
+                        help='Satırda user_id yoksa kullanılacak kimlik')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    fmt = args.format or detect_format(args.path)
+    if not fmt:
+        print("❌ Format belirlenemedi, --format kullanın", file=sys.stderr)
+        return 1
+
+    if args.path == '-':
+        report = import_records(decode_lines(sys.stdin.buffer), fmt, args.user_id, args.chunk_size)
+    else:
+        with open(args.path, 'rb') as f:
+            report = import_records(decode_lines(f), fmt, args.user_id, args.chunk_size)
+
+    print(f"📥 Toplam satır: {report['rows_total']}")
+    print(f"   ✅ Aktarılan: {report['rows_imported']}")
+    print(f"   ❌ Hatalı: {report['rows_failed']}")
+    for error in report['errors'][:20]:
+        print(f"      satır {error['line']}: {error['error']}")
+    if report['rows_failed'] > 20:
+        print(f"      ... ve {report['rows_failed'] - 20} hata daha")
+    print(f"   ⏱️  {report['elapsed_sec']} sn ({report['rows_per_sec']} satır/sn)")
+    return 0 if report['rows_failed'] == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+"""
+Bellek İçi Önbellekler
+LRU + TTL ile sınırlandırılmış, thread-safe önbellek sınıfları ve
+isabet oranı metrikleri.
+Python 3.9 Uyumlu
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+import threading
+import time
+
+
+# İsimle kayıtlı önbellekler (/cache-stats ve metrikler için)
+CACHES: Dict[str, Any] = {}
+
+_MISSING = object()
+
+
+class _Stats:
+    """Önbellek sayaçları"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def as_dict(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations
+        }
+
+
+class TTLCache:
+    """
+    Boyutu sınırlı LRU önbellek; her kaydın bir son kullanma süresi vardır
+
+    Args:
+        name: str - kayıt adı (CACHES içinde)
+        maxsize: int - en fazla kayıt sayısı (aşılınca en eski kullanılan atılır)
+        ttl: float - varsayılan yaşam süresi (saniye)
+    """
+
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = 60.0):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: 'OrderedDict[Hashable, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = _Stats()
+        CACHES[name] = self
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self._stats.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                self._stats.expirations += 1
+                self._stats.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self._stats.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._stats.evictions += 1
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            if self._data.pop(key, _MISSING) is not _MISSING:
+                self._stats.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._stats.invalidations += len(self._data)
+            self._data.clear()
+
+    def items(self):
+        """Süresi dolmamış (anahtar, değer, kalan süre) kayıtlarının kopyası"""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                (key, value, expires_at - now)
+                for key, (expires_at, value) in self._data.items()
+                if expires_at > now
+            ]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = self._stats.as_dict()
+            stats.update({'size': len(self._data), 'maxsize': self.maxsize, 'ttl': self.ttl})
+        return stats
+
+    def counters(self) -> Dict:
+        """Yalnızca sayaçlar (boyut hesabı yapılmaz; metrik aktarımı için)"""
+        return self._stats.as_dict()
+
+
+class UserCache:
+    """
+    Kullanıcı başına gruplanmış LRU + TTL önbellek
+
+    Bir kullanıcının tüm kayıtları (örn. farklı limit/gün parametreleri)
+    tek seferde geçersiz kılınabilir. Hem kullanıcı sayısı hem de kullanıcı
+    başına kayıt sayısı sınırlıdır.
+
+    Kayıtlar isteğe bağlı bir kullanıcı veri sürümüyle saklanabilir: get'e
+    verilen sürüm saklanandan farklıysa (başka bir süreç yazmış) kullanıcının
+    tüm kayıtları geçersiz sayılır. Sürüm, veri okunmadan önce alınmalıdır;
+    böylece okuma sırasında gelen bir yazma sonraki okumada fark edilir.
+
+    Args:
+        name: str - kayıt adı (CACHES içinde)
+        max_users: int - önbellekte tutulan en fazla kullanıcı
+        max_entries_per_user: int - kullanıcı başına en fazla kayıt
+        ttl: float - kayıt yaşam süresi (saniye)
+    """
+
+    def __init__(self, name: str, max_users: int = 1000, max_entries_per_user: int = 16, ttl: float = 60.0):
+        self.name = name
+        self.max_users = max_users
+        self.max_entries_per_user = max_entries_per_user
+        self.ttl = ttl
+        self._users: 'OrderedDict[str, OrderedDict]' = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stats = _Stats()
+        CACHES[name] = self
+
+    def _drop_user(self, user_id: str):
+        entries = self._users.pop(user_id, None)
+        self._versions.pop(user_id, None)
+        if entries:
+            self._stats.invalidations += len(entries)
+
+    def get(self, user_id: str, key: Hashable, default: Any = None, version: Optional[int] = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            if version is not None and user_id in self._users and self._versions.get(user_id) != version:
+                self._drop_user(user_id)
+            entries = self._users.get(user_id)
+            entry = entries.get(key, _MISSING) if entries is not None else _MISSING
+            if entry is _MISSING:
+                self._stats.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at <= now:
+                del entries[key]
+                self._stats.expirations += 1
+                self._stats.misses += 1
+                return default
+            entries.move_to_end(key)
+            self._users.move_to_end(user_id)
+            self._stats.hits += 1
+            return value
+
+    def set(self, user_id: str, key: Hashable, value: Any, version: Optional[int] = None):
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            if version is not None:
+                current = self._versions.get(user_id)
+                if current is not None and version < current:
+                    return  # daha yeni veriyle hesaplanmış kayıtların üzerine eski sonuç yazılmaz
+                if current != version:
+                    self._drop_user(user_id)
+                self._versions[user_id] = version
+            entries = self._users.get(user_id)
+            if entries is None:
+                entries = self._users[user_id] = OrderedDict()
+            entries[key] = (expires_at, value)
+            entries.move_to_end(key)
+            self._users.move_to_end(user_id)
+
+            while len(entries) > self.max_entries_per_user:
+                entries.popitem(last=False)
+                self._stats.evictions += 1
+            while len(self._users) > self.max_users:
+                evicted_user, evicted = self._users.popitem(last=False)
+                self._versions.pop(evicted_user, None)
+                self._stats.evictions += len(evicted)
+
+    def invalidate(self, user_id: str):
+        """Kullanıcının tüm kayıtlarını sil (yeni analiz yazıldığında)"""
+        with self._lock:
+            self._drop_user(user_id)
+
+    def clear(self):
+        with self._lock:
+            self._stats.invalidations += sum(len(e) for e in self._users.values())
+            self._users.clear()
+            self._versions.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = self._stats.as_dict()
+            stats.update({
+                'users': len(self._users),
+                'size': sum(len(e) for e in self._users.values()),
+                'max_users': self.max_users,
+                'max_entries_per_user': self.max_entries_per_user,
+                'ttl': self.ttl
+            })
+        return stats
+
+    def counters(self) -> Dict:
+        """Yalnızca sayaçlar (boyut hesabı yapılmaz; metrik aktarımı için)"""
+        return self._stats.as_dict()
+
+
+def all_cache_stats() -> Dict[str, Dict]:
+    """Kayıtlı tüm önbelleklerin metrikleri"""
+    return {name: cache.stats() for name, cache in CACHES.items()}
@@ -1,29 +1,151 @@
 """
 SQLite Database işlemleri
 Analiz kayıtları ve trend verileri
+Kayıtlar user_id'ye göre shard'lara bölünebilir (bkz. shards.py, HISTORY_SHARDS)
 Python 3.9 Uyumlu
 """
 
-from typing import Dict, List, Optional
+from contextlib import closing
+from typing import Dict, Iterator, List, Optional, Tuple
 import sqlite3
 import json
 from datetime import datetime, timedelta
+import heapq
+import itertools
+import math
 import os
+import threading
+
+from fuzzy_model import RULE_BITS, RULE_DESCRIPTIONS, mask_to_rules, rules_to_mask
+from cache import UserCache
+from metrics import timed_stage
+import event_log
+import shards
 
 
 DB_PATH = 'data/history.db'
 
+# Dışa aktarımda kullanılan sütun sırası
+EXPORT_COLUMNS = (
+    'id', 'user_id', 'timestamp',
+    'sleep_hours', 'caffeine_mg', 'exercise_min', 'work_stress', 'environmental_score',
+    'stress_level', 'sleep_quality', 'active_rules_mask'
+)
+
+# Günlük özet tablosundaki metrikler: (ham sütun, trend anahtarı)
+AGGREGATE_METRICS = (
+    ('sleep_hours', 'avg_sleep'),
+    ('caffeine_mg', 'avg_caffeine'),
+    ('exercise_min', 'avg_exercise'),
+    ('work_stress', 'avg_work_stress'),
+    ('environmental_score', 'avg_environmental_score'),
+    ('stress_level', 'avg_stress_level'),
+    ('sleep_quality', 'avg_sleep_quality')
+)
+
+# Analiz girdileri (sıra HISTOGRAM_BINS ile aynı)
+INPUT_FIELDS = ('sleep_hours', 'caffeine_mg', 'exercise_min', 'work_stress', 'environmental_score')
+
+# Eksik alanlar için /analyze ile aynı varsayılanlar
+INPUT_DEFAULTS = {
+    'sleep_hours': 7.0,
+    'caffeine_mg': 100.0,
+    'exercise_min': 30.0,
+    'work_stress': 5.0,
+    'environmental_score': 50.0
+}
+
+# Popülasyon histogramları: metrik → (alt sınır, üst sınır, kutu sayısı).
+# Aralık dışındaki değerler uç kutulara düşer. Sıra AGGREGATE_METRICS ile aynıdır.
+HISTOGRAM_BINS = {
+    'sleep_hours': (0.0, 24.0, 96),
+    'caffeine_mg': (0.0, 1000.0, 100),
+    'exercise_min': (0.0, 300.0, 60),
+    'work_stress': (0.0, 10.0, 100),
+    'environmental_score': (0.0, 100.0, 100),
+    'stress_level': (0.0, 100.0, 100),
+    'sleep_quality': (0.0, 100.0, 100)
+}
+
+# Kullanıcı başına üstel ağırlıklı ortalama/varyans ile anomali tespiti
+ANOMALY_METRICS = ('stress_level', 'sleep_quality')
+ANOMALY_ALPHA = float(os.getenv('ANOMALY_ALPHA', '0.1'))
+ANOMALY_Z_THRESHOLD = float(os.getenv('ANOMALY_Z_THRESHOLD', '3.0'))
+ANOMALY_MIN_SAMPLES = 5
+# Çok kararlı kullanıcılarda küçük oynamaların anomali sayılmaması için alt sınır (skor puanı)
+ANOMALY_MIN_STD = 2.0
+
+# Toplu yazmada kullanıcı başına yayınlanan 'bulk' olayındaki en yeni kayıt sayısı
+# (dashboard geçmiş listesinin uzunluğu)
+BULK_EVENT_RECORDS = 10
+
+# Kullanıcıya ait satırlar içeren tablolar (reshard.py bunları user_id'ye göre taşır)
+USER_TABLES = [
+    'analysis_history', 'analysis_daily_aggregate', 'rule_daily_counts', 'user_anomaly_state',
+    'user_data_version'
+]
+
+_ready_paths = set()
+
+# /history ve /trends sonuçları için kullanıcı başına sıcak önbellek.
+# Kayıtlar user_data_version sürümüyle saklanır; başka bir worker sürecinde yapılan
+# yazma sürümü artırdığından bir sonraki okumada önbellek atlanır.
+history_cache = UserCache(
+    'history',
+    max_users=int(os.getenv('HISTORY_CACHE_MAX_USERS', '1000')),
+    max_entries_per_user=int(os.getenv('HISTORY_CACHE_MAX_ENTRIES', '16')),
+    ttl=float(os.getenv('HISTORY_CACHE_TTL', '30'))
+)
+
+_CACHE_MISS = object()
+
+# Sürüm okuması için thread başına, shard dosyası başına kalıcı bağlantılar
+_version_local = threading.local()
+
+
+def get_shard_paths() -> List[str]:
+    """Geçerli shard düzenindeki tüm veritabanı dosyaları"""
+    return shards.shard_paths(DB_PATH, shards.SHARD_COUNT)
+
+
+def shard_path_for(user_id: str) -> str:
+    """Kullanıcının kayıtlarının bulunduğu veritabanı dosyası"""
+    paths = get_shard_paths()
+    return paths[shards.shard_index(user_id, len(paths))]
+
 
-def init_db():
+def _reset_after_fork():
+    # Ebeveynin SQLite bağlantıları çocukta kullanılamaz
+    global _version_local
+    _version_local = threading.local()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def init_db(db_path: Optional[str] = None, shard_number: Optional[int] = None):
     """
     Veritabanını başlat, gerekli tabloları oluştur
+    
+    Args:
+        db_path: str - tek bir shard dosyası (None ise tüm shard'lar)
+        shard_number: int - çok shard'lı düzende shard sırası (id aralığı için)
     """
+    if db_path is None:
+        paths = get_shard_paths()
+        for index, path in enumerate(paths):
+            init_db(path, index if len(paths) > 1 else None)
+        return
+    
     # data klasörünü oluştur
-    os.makedirs('data', exist_ok=True)
+    os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
     
-    conn = sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
     
+    # Yeni veritabanlarında silinen sayfalar incremental_vacuum ile geri verilebilsin
+    cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    
     # Analiz kayıtları tablosu
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS analysis_history (
@@ -38,26 +160,542 @@ def init_db():
             stress_level REAL,
             sleep_quality REAL,
             active_rules TEXT,
+            active_rules_mask INTEGER,
             created_at DATETIME DEFAULT CURRENT_TIMESTAMP
         )
     ''')
     
+    # Çok shard'lı düzende her shard kendi id aralığından başlar
+    if shard_number is not None:
+        cursor.execute('''
+            INSERT INTO sqlite_sequence (name, seq)
+            SELECT 'analysis_history', ?
+            WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'analysis_history')
+        ''', (shard_number * shards.SHARD_ID_STRIDE,))
+    
+    # Eski veritabanlarına bit maskesi sütununu ekle
+    _add_column_if_missing(cursor, 'analysis_history', 'active_rules_mask', 'INTEGER')
+    _backfill_rule_masks(cursor)
+    
     # Index oluştur
     cursor.execute('''
         CREATE INDEX IF NOT EXISTS idx_user_timestamp 
         ON analysis_history(user_id, timestamp DESC)
     ''')
+    # Kullanıcıdan bağımsız zaman aralığı sorguları (kural istatistikleri, saklama işi)
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_timestamp
+        ON analysis_history(timestamp)
+    ''')
+    
+    # Saklama süresini aşan kayıtların günlük özetleri (retention.py doldurur)
+    metric_columns = ',\n'.join(
+        f'            {column}_sum REAL DEFAULT 0,\n            {column}_n INTEGER DEFAULT 0'
+        for column, _ in AGGREGATE_METRICS
+    )
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS analysis_daily_aggregate (
+            user_id TEXT NOT NULL,
+            date TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+{metric_columns},
+            PRIMARY KEY (user_id, date)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS rule_daily_counts (
+            user_id TEXT NOT NULL,
+            date TEXT NOT NULL,
+            rule_id TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, date, rule_id)
+        )
+    ''')
+    
+    # Kullanıcı başına anomali durumu (save_analysis günceller, anomaly.py --rebuild yeniden hesaplar)
+    state_columns = ',\n'.join(
+        f'            {metric}_mean REAL,\n            {metric}_var REAL' for metric in ANOMALY_METRICS
+    )
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS user_anomaly_state (
+            user_id TEXT PRIMARY KEY,
+            count INTEGER NOT NULL DEFAULT 0,
+{state_columns},
+            updated_at TEXT
+        )
+    ''')
+    
+    # Kullanıcı verisi sürümü: her yazmada aynı transaction içinde artar (history_cache doğrulaması)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_data_version (
+            user_id TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    
+    # Tüm kullanıcılar için sabit kutulu histogramlar (her kayıtta güncellenir)
+    histogram_missing = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'population_histogram'"
+    ).fetchone() is None
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS population_histogram (
+            metric TEXT NOT NULL,
+            bin INTEGER NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (metric, bin)
+        )
+    ''')
+    if histogram_missing:
+        _rebuild_histogram(cursor)
     
     conn.commit()
     conn.close()
     
-    print(f"✅ Veritabanı hazır: {DB_PATH}")
+    print(f"✅ Veritabanı hazır: {db_path}")
+
+
+def has_column(cursor: sqlite3.Cursor, table: str, column: str) -> bool:
+    return column in [row[1] for row in cursor.execute(f'PRAGMA table_info({table})')]
+
+
+def _add_column_if_missing(cursor: sqlite3.Cursor, table: str, column: str, column_type: str):
+    if not has_column(cursor, table, column):
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {column_type}')
+
+
+def legacy_rules_mask(active_rules: str) -> int:
+    """Eski JSON active_rules değerinin bit maskesi (bozuk JSON / bilinmeyen kuralda ValueError)"""
+    rules = json.loads(active_rules)
+    if not isinstance(rules, list):
+        raise ValueError(f'Kural listesi bekleniyordu: {active_rules!r}')
+    try:
+        return rules_to_mask(rules)
+    except (KeyError, TypeError) as e:
+        raise ValueError(f'Bilinmeyen kural: {e}') from None
+
+
+def _backfill_rule_masks(cursor: sqlite3.Cursor, chunk_size: int = 1000) -> int:
+    """
+    JSON olarak saklanmış eski active_rules değerlerini bit maskesine çevir
+    
+    active_rules sütunu değiştirilmez; dönüşüm doğrulandıktan sonra ayrı bir
+    adımla kaldırılır (bkz. rule_masks.py). Dönüştürülemeyen satırlar maskesiz
+    bırakılıp loglanır, şema kontrolü durmaz.
+    
+    Returns:
+        int - dönüştürülemeyen satır sayısı
+    """
+    if not has_column(cursor, 'analysis_history', 'active_rules'):
+        return 0
+    
+    failed = []
+    last_id = 0
+    while True:
+        rows = cursor.execute('''
+            SELECT id, active_rules FROM analysis_history
+            WHERE active_rules_mask IS NULL AND active_rules IS NOT NULL AND id > ?
+            ORDER BY id
+            LIMIT ?
+        ''', (last_id, chunk_size)).fetchall()
+        if not rows:
+            break
+        updates = []
+        for record_id, rules in rows:
+            try:
+                updates.append((legacy_rules_mask(rules), record_id))
+            except ValueError as e:
+                failed.append((record_id, str(e)))
+        cursor.executemany('UPDATE analysis_history SET active_rules_mask = ? WHERE id = ?', updates)
+        last_id = rows[-1][0]
+    
+    if failed:
+        sample = ', '.join(f'id={record_id} ({error})' for record_id, error in failed[:5])
+        print(f"⚠️  {len(failed)} eski kaydın active_rules değeri maskeye çevrilemedi: {sample}")
+    return len(failed)
+
+
+def histogram_bin(metric: str, value: float) -> int:
+    """Değerin histogram kutusu (SQL tarafındaki _histogram_bin_sql ile aynı)"""
+    low, high, bins = HISTOGRAM_BINS[metric]
+    return min(max(int((value - low) / ((high - low) / bins)), 0), bins - 1)
+
+
+def _histogram_bin_sql(metric: str, expression: str) -> str:
+    low, high, bins = HISTOGRAM_BINS[metric]
+    return f'MIN(MAX(CAST(({expression} - {low}) / {(high - low) / bins} AS INTEGER), 0), {bins - 1})'
+
+
+def _add_to_histogram(cursor: sqlite3.Cursor, rows: List[Tuple]):
+    """
+    Eklenen kayıtları histograma işle (kayıtla aynı transaction içinde)
+    
+    Args:
+        rows: analysis_history insert satırları (1-7. alanlar HISTOGRAM_BINS sırasıyla metrikler)
+    """
+    increments = {}
+    for row in rows:
+        for metric, value in zip(HISTOGRAM_BINS, row[1:8]):
+            if value is not None:
+                key = (metric, histogram_bin(metric, value))
+                increments[key] = increments.get(key, 0) + 1
+    cursor.executemany('''
+        INSERT INTO population_histogram (metric, bin, count) VALUES (?, ?, ?)
+        ON CONFLICT (metric, bin) DO UPDATE SET count = count + excluded.count
+    ''', [(metric, bin_, count) for (metric, bin_), count in increments.items()])
+
+
+def _rebuild_histogram(cursor: sqlite3.Cursor):
+    """
+    Histogramı tablolardan yeniden hesapla
+    
+    Günlük özete dönüştürülmüş dönemler gün ortalamasının kutusuna kayıt
+    sayısı kadar eklenir (yaklaşık).
+    """
+    cursor.execute('DELETE FROM population_histogram')
+    for metric in HISTOGRAM_BINS:
+        cursor.execute(f'''
+            INSERT INTO population_histogram (metric, bin, count)
+            SELECT ?, bin, SUM(weight) FROM (
+                SELECT {_histogram_bin_sql(metric, metric)} AS bin, 1 AS weight
+                FROM analysis_history
+                WHERE {metric} IS NOT NULL
+                UNION ALL
+                SELECT {_histogram_bin_sql(metric, f'{metric}_sum / {metric}_n')}, {metric}_n
+                FROM analysis_daily_aggregate
+                WHERE {metric}_n > 0
+            )
+            GROUP BY bin
+        ''', (metric,))
+
+
+def rebuild_population_histograms() -> int:
+    """
+    Tüm shard'larda histogramları baştan hesapla
+    
+    Returns:
+        int - histogramdaki toplam kayıt sayısı (ilk metrik için)
+    """
+    ensure_db()
+    
+    def rebuild(path):
+        conn = sqlite3.connect(path)
+        try:
+            with conn:
+                _rebuild_histogram(conn.cursor())
+        finally:
+            conn.close()
+    
+    shards.map_parallel(rebuild, get_shard_paths())
+    first = next(iter(HISTOGRAM_BINS))
+    return sum(get_population_histograms()[first])
+
+
+def get_population_histograms() -> Dict[str, List[int]]:
+    """
+    Tüm shard'ların histogramlarının toplamı
+    
+    Returns:
+        dict - metrik → kutu sayaçları listesi
+    """
+    ensure_db()
+    
+    def read(path):
+        conn = sqlite3.connect(path)
+        try:
+            return conn.execute('SELECT metric, bin, count FROM population_histogram').fetchall()
+        finally:
+            conn.close()
+    
+    histograms = {metric: [0] * bins for metric, (_, _, bins) in HISTOGRAM_BINS.items()}
+    for rows in shards.map_parallel(read, get_shard_paths()):
+        for metric, bin_, count in rows:
+            if metric in histograms and 0 <= bin_ < len(histograms[metric]):
+                histograms[metric][bin_] += count
+    return histograms
+
+
+def ew_update(state: Optional[Dict], values: Dict[str, float]) -> Tuple[Dict, Dict]:
+    """
+    Üstel ağırlıklı ortalama/varyansı yeni gözlemle güncelle (O(1))
+    
+    Z-skoru güncellemeden önceki duruma göre hesaplanır.
+    
+    Args:
+        state: dict - mevcut durum (count, <metrik>_mean, <metrik>_var) veya None
+        values: dict - metrik → yeni değer
+    
+    Returns:
+        (yeni durum, anomali bilgisi)
+    """
+    state = state or {'count': 0}
+    count = state['count']
+    new_state = {'count': count + 1}
+    anomaly = {'samples': count, 'is_anomaly': False}
+    
+    for metric in ANOMALY_METRICS:
+        mean = state.get(f'{metric}_mean')
+        var = state.get(f'{metric}_var')
+        value = values.get(metric)
+        if value is None:
+            new_state[f'{metric}_mean'], new_state[f'{metric}_var'] = mean, var
+            continue
+        
+        if mean is None:
+            new_state[f'{metric}_mean'], new_state[f'{metric}_var'] = value, 0.0
+            anomaly[metric] = {'value': value, 'expected': None, 'std': None, 'z_score': None}
+            continue
+        
+        std = max(math.sqrt(var), ANOMALY_MIN_STD)
+        z_score = (value - mean) / std if count >= ANOMALY_MIN_SAMPLES else None
+        
+        diff = value - mean
+        increment = ANOMALY_ALPHA * diff
+        new_state[f'{metric}_mean'] = mean + increment
+        new_state[f'{metric}_var'] = (1 - ANOMALY_ALPHA) * (var + diff * increment)
+        
+        anomaly[metric] = {
+            'value': round(value, 2),
+            'expected': round(mean, 2),
+            'std': round(std, 2),
+            'z_score': round(z_score, 2) if z_score is not None else None
+        }
+        if z_score is not None and abs(z_score) >= ANOMALY_Z_THRESHOLD:
+            anomaly['is_anomaly'] = True
+    
+    return new_state, anomaly
+
+
+def _load_anomaly_states(cursor: sqlite3.Cursor, user_ids: List[str]) -> Dict[str, Dict]:
+    states = {}
+    user_ids = list(user_ids)
+    for start in range(0, len(user_ids), 500):
+        batch = user_ids[start:start + 500]
+        cursor.execute(
+            f"SELECT * FROM user_anomaly_state WHERE user_id IN ({', '.join('?' for _ in batch)})",
+            batch
+        )
+        columns = [d[0] for d in cursor.description]
+        for row in cursor.fetchall():
+            state = dict(zip(columns, row))
+            states[state.pop('user_id')] = state
+    return states
+
+
+def _store_anomaly_states(cursor: sqlite3.Cursor, states: Dict[str, Dict]):
+    columns = ['count'] + [f'{m}_{k}' for m in ANOMALY_METRICS for k in ('mean', 'var')] + ['updated_at']
+    cursor.executemany(f'''
+        INSERT OR REPLACE INTO user_anomaly_state (user_id, {', '.join(columns)})
+        VALUES ({', '.join('?' for _ in range(len(columns) + 1))})
+    ''', [
+        (user_id,) + tuple(state.get(column) for column in columns)
+        for user_id, state in states.items()
+    ])
+
+
+def _update_anomaly_states(cursor: sqlite3.Cursor, rows: List[Tuple]) -> List[Dict]:
+    """
+    Eklenen kayıtlarla kullanıcı durumlarını güncelle (kayıtla aynı transaction içinde)
+    
+    Args:
+        rows: analysis_history insert satırları (0: user_id, 6: stress, 7: quality, 9: timestamp)
+    
+    Returns:
+        list of dict - satır sırasıyla anomali bilgileri
+    """
+    states = _load_anomaly_states(cursor, {row[0] for row in rows})
+    anomalies = [None] * len(rows)
+    # Aynı kullanıcının kayıtları zaman sırasıyla işlenir
+    for index in sorted(range(len(rows)), key=lambda i: (rows[i][0], rows[i][9])):
+        row = rows[index]
+        state, anomalies[index] = ew_update(
+            states.get(row[0]), {'stress_level': row[6], 'sleep_quality': row[7]}
+        )
+        state['updated_at'] = row[9]
+        states[row[0]] = state
+    _store_anomaly_states(cursor, states)
+    return anomalies
+
+
+def rebuild_anomaly_state(user_id: Optional[str] = None, chunk_size: int = 5000) -> int:
+    """
+    Anomali durumlarını mevcut kayıtlardan zaman sırasıyla yeniden hesapla
+    
+    Günlük özete dönüştürülmüş günler gün ortalaması olarak tek gözlem sayılır.
+    
+    Args:
+        user_id: str - yalnızca bu kullanıcı (None ise herkes)
+    
+    Returns:
+        int - durumu hesaplanan kullanıcı sayısı
+    """
+    ensure_db()
+    user_filter = 'WHERE user_id = ?' if user_id is not None else ''
+    params = (user_id, user_id) if user_id is not None else ()
+    
+    def rebuild(path):
+        conn = sqlite3.connect(path)
+        try:
+            with conn:
+                cursor = conn.cursor()
+                cursor.execute(f'DELETE FROM user_anomaly_state {user_filter}', params[:1])
+                read = conn.execute(f'''
+                    SELECT user_id, timestamp, stress_level, sleep_quality FROM (
+                        SELECT user_id, timestamp, stress_level, sleep_quality
+                        FROM analysis_history {user_filter}
+                        UNION ALL
+                        SELECT user_id, date,
+                               stress_level_sum / stress_level_n, sleep_quality_sum / sleep_quality_n
+                        FROM analysis_daily_aggregate {user_filter}
+                    )
+                    ORDER BY user_id, timestamp
+                ''', params)
+                
+                states = {}
+                users = 0
+                current, state = None, None
+                for rows in iter(lambda: read.fetchmany(chunk_size), []):
+                    for row_user, timestamp, stress, quality in rows:
+                        if row_user != current:
+                            if current is not None:
+                                states[current] = state
+                            current, state = row_user, None
+                            users += 1
+                        state, _ = ew_update(state, {'stress_level': stress, 'sleep_quality': quality})
+                        state['updated_at'] = timestamp
+                    if len(states) >= chunk_size:
+                        _store_anomaly_states(cursor, states)
+                        states = {}
+                if current is not None:
+                    states[current] = state
+                _store_anomaly_states(cursor, states)
+                return users
+        finally:
+            conn.close()
+    
+    paths = [shard_path_for(user_id)] if user_id is not None else get_shard_paths()
+    return sum(shards.map_parallel(rebuild, paths))
+
+
+def get_anomaly_state(user_id: str) -> Optional[Dict]:
+    """Kullanıcının güncel ortalama/standart sapma durumu"""
+    ensure_db()
+    conn = sqlite3.connect(shard_path_for(user_id))
+    try:
+        state = _load_anomaly_states(conn.cursor(), [user_id]).get(user_id)
+    finally:
+        conn.close()
+    if state is None:
+        return None
+    result = {'user_id': user_id, 'samples': state['count'], 'updated_at': state['updated_at']}
+    for metric in ANOMALY_METRICS:
+        var = state[f'{metric}_var']
+        result[metric] = {
+            'mean': round(state[f'{metric}_mean'], 2) if state[f'{metric}_mean'] is not None else None,
+            'std': round(math.sqrt(var), 2) if var is not None else None
+        }
+    return result
 
 
+def _bump_data_versions(cursor: sqlite3.Cursor, user_ids: List[str]):
+    """Kullanıcıların veri sürümünü artır (yazma transaction'ı içinde çağrılır)"""
+    cursor.executemany('''
+        INSERT INTO user_data_version (user_id, version) VALUES (?, 1)
+        ON CONFLICT(user_id) DO UPDATE SET version = version + 1
+    ''', [(user_id,) for user_id in user_ids])
+
+
+def user_data_version(user_id: str) -> int:
+    """
+    Kullanıcının veri sürümü (tüm worker süreçleri için ortak)
+    
+    Önbellekli okumalar sürümü veriyi okumadan önce almalıdır: okuma sırasında
+    gelen bir yazma sürümü artırır ve eski sonuç bir sonraki okumada atlanır.
+    
+    Returns:
+        int - hiç yazılmamış kullanıcı için 0
+    """
+    ensure_db()
+    path = shard_path_for(user_id)
+    connections = getattr(_version_local, 'connections', None)
+    if connections is None:
+        connections = _version_local.connections = {}
+    conn = connections.get(path)
+    if conn is None:
+        conn = connections[path] = sqlite3.connect(path, timeout=10.0, isolation_level=None)
+    # fetchall: imleç açık kalıp okuma kilidi tutmasın
+    rows = conn.execute(
+        'SELECT version FROM user_data_version WHERE user_id = ?', (user_id,)
+    ).fetchall()
+    return rows[0][0] if rows else 0
+
+
+def ensure_db():
+    """
+    Şema kontrolünü süreç ve shard başına bir kez yap (eski veritabanlarına yeni tabloları ekler)
+    """
+    paths = get_shard_paths()
+    for index, path in enumerate(paths):
+        if path not in _ready_paths:
+            init_db(path, index if len(paths) > 1 else None)
+            _ready_paths.add(path)
+
+
+def _metric_value(value) -> Optional[float]:
+    """Girdi/sonuç değerini sayıya çevir (istek gövdesinden '7' gibi metinler gelebilir)"""
+    if value is None:
+        return None
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f'Sonlu bir sayı bekleniyordu: {value!r}')
+    return number
+
+
+def _analysis_row(inputs: Dict, results: Dict, user_id: str, timestamp: str) -> Tuple:
+    """analysis_history insert satırı (metrikler histogram/anomali adımları için float)"""
+    return (
+        user_id,
+        _metric_value(inputs.get('sleep_hours')),
+        _metric_value(inputs.get('caffeine_mg')),
+        _metric_value(inputs.get('exercise_min')),
+        _metric_value(inputs.get('work_stress')),
+        _metric_value(inputs.get('environmental_score', 50.0)),
+        _metric_value(results.get('stress_level', results.get('stress', 50.0))),
+        _metric_value(results.get('sleep_quality', 50.0)),
+        rules_to_mask(results.get('active_rules', [])),
+        timestamp
+    )
+
+
+def _event_record(record_id: int, row: Tuple, anomaly: Optional[Dict]) -> Dict:
+    """Canlı olay yükü: insert satırından /history kaydı formatı"""
+    return {
+        'id': record_id,
+        'user_id': row[0],
+        'timestamp': row[9],
+        'inputs': {
+            'sleep_hours': row[1],
+            'caffeine_mg': row[2],
+            'exercise_min': row[3],
+            'work_stress': row[4],
+            'environmental_score': row[5]
+        },
+        'results': {
+            'stress_level': row[6],
+            'sleep_quality': row[7]
+        },
+        'active_rules': mask_to_rules(row[8]),
+        'anomaly': anomaly
+    }
+
+
+@timed_stage('save_analysis')
 def save_analysis(inputs: Dict, results: Dict, user_id: str = 'anonymous') -> int:
     """
     Analiz sonucunu veritabanına kaydet
     
+    Kullanıcının anomali durumu aynı transaction içinde güncellenir ve
+    results sözlüğüne 'anomaly' (z-skorları ve bayrak) eklenir.
+    
     Args:
         inputs: dict - girdi parametreleri
         results: dict - analiz sonuçları
@@ -67,56 +705,196 @@ def save_analysis(inputs: Dict, results: Dict, user_id: str = 'anonymous') -> in
         int - kayıt ID'si
     """
     # DB yoksa oluştur
-    if not os.path.exists(DB_PATH):
-        init_db()
+    ensure_db()
     
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    # Aktif kurallar bit maskesine çevrilir (R1 → bit 0)
+    row = _analysis_row(inputs, results, user_id, datetime.now().isoformat())
     
-    # Active rules'ı JSON string'e çevir
-    active_rules_json = json.dumps(results.get('active_rules', []))
+    # Histogram/anomali adımı hata verirse transaction geri alınır ve bağlantı kapanır
+    # (açık kalan yazma kilidi sonraki kayıtları 'database is locked' ile bekletirdi)
+    with closing(sqlite3.connect(shard_path_for(user_id))) as conn, conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO analysis_history 
+            (user_id, sleep_hours, caffeine_mg, exercise_min, work_stress, 
+             environmental_score, stress_level, sleep_quality, active_rules_mask, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', row)
+        
+        record_id = cursor.lastrowid
+        _add_to_histogram(cursor, [row])
+        results['anomaly'] = _update_anomaly_states(cursor, [row])[0]
+        _bump_data_versions(cursor, [user_id])
     
-    cursor.execute('''
-        INSERT INTO analysis_history 
-        (user_id, sleep_hours, caffeine_mg, exercise_min, work_stress, 
-         environmental_score, stress_level, sleep_quality, active_rules, timestamp)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
-        user_id,
-        inputs.get('sleep_hours'),
-        inputs.get('caffeine_mg'),
-        inputs.get('exercise_min'),
-        inputs.get('work_stress'),
-        inputs.get('environmental_score', 50.0),
-        results.get('stress_level', results.get('stress', 50.0)),
-        results.get('sleep_quality', 50.0),
-        active_rules_json,
-        datetime.now().isoformat()
-    ))
-    
-    record_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    history_cache.invalidate(user_id)
+    
+    # Canlı dashboard akışları için (/events); /history kaydı formatında
+    event_log.publish(user_id, 'analysis', _event_record(record_id, row, results['anomaly']))
     
     return record_id
 
 
+@timed_stage('insert_analyses')
+def insert_analyses(
+    records: List[Tuple[Dict, Dict, str, Optional[str]]]
+) -> List[int]:
+    """
+    Birden çok analiz sonucunu shard başına tek transaction içinde executemany ile kaydet
+    
+    Her kaydın results sözlüğüne save_analysis'teki gibi 'anomaly' eklenir.
+    Canlı dashboard'lar için kullanıcı başına tek 'bulk' olayı yayınlanır
+    (kayıt sayısı ve en yeni BULK_EVENT_RECORDS kayıt).
+    
+    Args:
+        records: list of (inputs, results, user_id, timestamp) - timestamp None ise şu an
+    
+    Returns:
+        list of int - kayıt sırasıyla ID'ler
+    """
+    if not records:
+        return []
+    
+    ensure_db()
+    
+    now = datetime.now().isoformat()
+    rows = [_analysis_row(inputs, results, user_id, timestamp or now)
+            for inputs, results, user_id, timestamp in records]
+    by_shard = {}
+    for position, row in enumerate(rows):
+        by_shard.setdefault(shard_path_for(row[0]), []).append((position, row))
+    
+    ids = [None] * len(records)
+    
+    def insert(item):
+        path, entries = item
+        shard_rows = [row for _, row in entries]
+        conn = sqlite3.connect(path)
+        try:
+            with conn:
+                conn.executemany('''
+                    INSERT INTO analysis_history 
+                    (user_id, sleep_hours, caffeine_mg, exercise_min, work_stress, 
+                     environmental_score, stress_level, sleep_quality, active_rules_mask, timestamp)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', shard_rows)
+                # Transaction yazma kilidini tuttuğundan AUTOINCREMENT id'leri ardışıktır
+                last_id = conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+                _add_to_histogram(conn.cursor(), shard_rows)
+                anomalies = _update_anomaly_states(conn.cursor(), shard_rows)
+                _bump_data_versions(conn.cursor(), sorted({row[0] for row in shard_rows}))
+        finally:
+            conn.close()
+        
+        first_id = last_id - len(shard_rows) + 1
+        for offset, ((position, _), anomaly) in enumerate(zip(entries, anomalies)):
+            ids[position] = first_id + offset
+            records[position][1]['anomaly'] = anomaly
+    
+    # Farklı shard'lar farklı dosyalar olduğundan yazmalar paralel yapılabilir
+    shards.map_parallel(insert, by_shard.items())
+    
+    positions_by_user = {}
+    for position, row in enumerate(rows):
+        positions_by_user.setdefault(row[0], []).append(position)
+    
+    for user_id, positions in positions_by_user.items():
+        history_cache.invalidate(user_id)
+        # Kayıt başına olay yerine kullanıcı başına özet (büyük içe aktarmalar günlüğü şişirmesin)
+        latest = heapq.nlargest(BULK_EVENT_RECORDS, positions, key=lambda p: (rows[p][9], ids[p]))
+        event_log.publish(user_id, 'bulk', {
+            'user_id': user_id,
+            'count': len(positions),
+            'records': [_event_record(ids[p], rows[p], records[p][1]['anomaly']) for p in latest]
+        })
+    
+    return ids
+
+
+def save_analyses_bulk(
+    records: List[Tuple[Dict, Dict, str, Optional[str]]]
+) -> int:
+    """
+    Birden çok analiz sonucunu toplu kaydet (bkz. insert_analyses)
+    
+    Returns:
+        int - eklenen kayıt sayısı
+    """
+    return len(insert_analyses(records))
+
+
+def _row_to_record(row: sqlite3.Row) -> Dict:
+    """Ham kayıt satırını API formatına çevir"""
+    record = {
+        'id': row['id'],
+        'user_id': row['user_id'],
+        'timestamp': row['timestamp'],
+        'inputs': {
+            'sleep_hours': row['sleep_hours'],
+            'caffeine_mg': row['caffeine_mg'],
+            'exercise_min': row['exercise_min'],
+            'work_stress': row['work_stress']
+        },
+        'results': {
+            'stress_level': row['stress_level'],
+            'sleep_quality': row['sleep_quality']
+        },
+        'active_rules': mask_to_rules(row['active_rules_mask'])
+    }
+    # environmental_score varsa ekle
+    if 'environmental_score' in row.keys():
+        record['inputs']['environmental_score'] = row['environmental_score']
+    return record
+
+
+def _aggregate_row_to_record(row: sqlite3.Row) -> Dict:
+    """Günlük özet satırını geçmiş kaydı formatına çevir (ortalamalar)"""
+    def avg(column):
+        n = row[f'{column}_n']
+        return round(row[f'{column}_sum'] / n, 2) if n else None
+    
+    return {
+        'id': None,
+        'user_id': row['user_id'],
+        'timestamp': row['date'],
+        'aggregated': True,
+        'count': row['count'],
+        'inputs': {
+            'sleep_hours': avg('sleep_hours'),
+            'caffeine_mg': avg('caffeine_mg'),
+            'exercise_min': avg('exercise_min'),
+            'work_stress': avg('work_stress'),
+            'environmental_score': avg('environmental_score')
+        },
+        'results': {
+            'stress_level': avg('stress_level'),
+            'sleep_quality': avg('sleep_quality')
+        },
+        'active_rules': []
+    }
+
+
 def get_history(user_id: str = 'anonymous', limit: int = 10) -> List[Dict]:
     """
     Kullanıcının analiz geçmişini getir
     
+    Saklama süresini aşıp günlük özete dönüştürülmüş dönemler için
+    her gün tek kayıt olarak ('aggregated': True) döner.
+    
     Args:
         user_id: str - kullanıcı kimliği
         limit: int - maksimum kayıt sayısı
     
     Returns:
-        list of dict - analiz kayıtları
+        list of dict - analiz kayıtları (yeniden eskiye)
     """
-    if not os.path.exists(DB_PATH):
-        init_db()
-        return []
+    version = user_data_version(user_id)
+    cached = history_cache.get(user_id, ('history', limit), _CACHE_MISS, version=version)
+    if cached is not _CACHE_MISS:
+        return list(cached)
+    
+    ensure_db()
     
-    conn = sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(shard_path_for(user_id))
     conn.row_factory = sqlite3.Row  # Dict gibi erişim için
     cursor = conn.cursor()
     
@@ -124,99 +902,339 @@ def get_history(user_id: str = 'anonymous', limit: int = 10) -> List[Dict]:
         SELECT 
             id, user_id, timestamp, 
             sleep_hours, caffeine_mg, exercise_min, work_stress, environmental_score,
-            stress_level, sleep_quality, active_rules
+            stress_level, sleep_quality, active_rules_mask
         FROM analysis_history
         WHERE user_id = ?
         ORDER BY timestamp DESC
         LIMIT ?
     ''', (user_id, limit))
+    raw_rows = cursor.fetchall()
+    
+    # Ham kayıtlar limiti doldurmuyorsa eski dönemler özet tablodan gelir
+    aggregate_rows = []
+    if len(raw_rows) < limit:
+        cursor.execute('''
+            SELECT * FROM analysis_daily_aggregate
+            WHERE user_id = ?
+            ORDER BY date DESC
+            LIMIT ?
+        ''', (user_id, limit))
+        aggregate_rows = cursor.fetchall()
     
-    rows = cursor.fetchall()
     conn.close()
     
-    # Row objelerini dict'e çevir
-    records = []
-    for row in rows:
-        record = {
-            'id': row['id'],
-            'user_id': row['user_id'],
-            'timestamp': row['timestamp'],
-            'inputs': {
-                'sleep_hours': row['sleep_hours'],
-                'caffeine_mg': row['caffeine_mg'],
-                'exercise_min': row['exercise_min'],
-                'work_stress': row['work_stress']
-            },
-            'results': {
-                'stress_level': row['stress_level'],
-                'sleep_quality': row['sleep_quality']
-            },
-            'active_rules': row['active_rules']  # JSON string olarak
-        }
-        # environmental_score varsa ekle
-        if 'environmental_score' in row.keys():
-            record['inputs']['environmental_score'] = row['environmental_score']
-        records.append(record)
+    records = [_row_to_record(row) for row in raw_rows]
+    if aggregate_rows:
+        records.extend(_aggregate_row_to_record(row) for row in aggregate_rows)
+        records.sort(key=lambda r: r['timestamp'], reverse=True)
+        records = records[:limit]
     
-    return records
+    history_cache.set(user_id, ('history', limit), records, version=version)
+    return list(records)
 
 
-def get_trend_data(user_id: str = 'anonymous', days: int = 7) -> List[Dict]:
+def iter_trend_data(user_id: str = 'anonymous', days: int = 7) -> Iterator[Dict]:
     """
-    Son N günün trend verilerini getir
+    Son N günün trend verilerini imleçten gün gün üret (önbelleksiz)
+    
+    Ham kayıtlar ile günlük özet tablosu birlikte okunur; saklama süresini
+    aşan dönemler de aynı formatta döner.
     
     Args:
         user_id: str - kullanıcı kimliği
         days: int - kaç günlük veri
     
-    Returns:
-        list of dict - günlük ortalama veriler
+    Yields:
+        dict - günlük ortalama veriler (eskiden yeniye)
     """
-    if not os.path.exists(DB_PATH):
-        init_db()
-        return []
+    ensure_db()
     
-    conn = sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(shard_path_for(user_id))
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     
     # Son N günün başlangıç tarihi
     start_date = (datetime.now() - timedelta(days=days)).isoformat()
     
-    cursor.execute('''
-        SELECT 
-            DATE(timestamp) as date,
-            AVG(sleep_hours) as avg_sleep,
-            AVG(caffeine_mg) as avg_caffeine,
-            AVG(exercise_min) as avg_exercise,
-            AVG(work_stress) as avg_work_stress,
-            AVG(stress_level) as avg_stress_level,
-            AVG(sleep_quality) as avg_sleep_quality,
-            COUNT(*) as count
-        FROM analysis_history
-        WHERE user_id = ? AND timestamp >= ?
-        GROUP BY DATE(timestamp)
-        ORDER BY date ASC
-    ''', (user_id, start_date))
+    raw_columns = ', '.join(
+        f'SUM({column}) AS {column}_sum, COUNT({column}) AS {column}_n'
+        for column, _ in AGGREGATE_METRICS
+    )
+    aggregate_columns = ', '.join(
+        f'{column}_sum, {column}_n' for column, _ in AGGREGATE_METRICS
+    )
+    averages = ', '.join(
+        f'SUM({column}_sum) / SUM({column}_n) AS {key}'
+        for column, key in AGGREGATE_METRICS
+    )
     
-    rows = cursor.fetchall()
-    conn.close()
+    try:
+        cursor.execute(f'''
+            SELECT date, {averages}, SUM(count) AS count
+            FROM (
+                SELECT DATE(timestamp) AS date, {raw_columns}, COUNT(*) AS count
+                FROM analysis_history
+                WHERE user_id = ? AND timestamp >= ?
+                GROUP BY DATE(timestamp)
+                UNION ALL
+                SELECT date, {aggregate_columns}, count
+                FROM analysis_daily_aggregate
+                WHERE user_id = ? AND date >= DATE(?)
+            )
+            GROUP BY date
+            ORDER BY date ASC
+        ''', (user_id, start_date, user_id, start_date))
+        
+        # Sonuçları formatla
+        for row in cursor:
+            yield {
+                'date': row['date'],
+                'avg_sleep': round(row['avg_sleep'], 2) if row['avg_sleep'] else 0,
+                'avg_caffeine': round(row['avg_caffeine'], 2) if row['avg_caffeine'] else 0,
+                'avg_exercise': round(row['avg_exercise'], 2) if row['avg_exercise'] else 0,
+                'avg_work_stress': round(row['avg_work_stress'], 2) if row['avg_work_stress'] else 0,
+                'avg_stress_level': round(row['avg_stress_level'], 2) if row['avg_stress_level'] else 0,
+                'avg_sleep_quality': round(row['avg_sleep_quality'], 2) if row['avg_sleep_quality'] else 0,
+                'count': row['count']
+            }
+    finally:
+        conn.close()
+
+
+def get_trend_data(user_id: str = 'anonymous', days: int = 7) -> List[Dict]:
+    """
+    Son N günün trend verilerini getir (önbellekli, bkz. iter_trend_data)
     
-    # Sonuçları formatla
-    trends = []
-    for row in rows:
-        trends.append({
-            'date': row['date'],
-            'avg_sleep': round(row['avg_sleep'], 2) if row['avg_sleep'] else 0,
-            'avg_caffeine': round(row['avg_caffeine'], 2) if row['avg_caffeine'] else 0,
-            'avg_exercise': round(row['avg_exercise'], 2) if row['avg_exercise'] else 0,
-            'avg_work_stress': round(row['avg_work_stress'], 2) if row['avg_work_stress'] else 0,
-            'avg_stress_level': round(row['avg_stress_level'], 2) if row['avg_stress_level'] else 0,
-            'avg_sleep_quality': round(row['avg_sleep_quality'], 2) if row['avg_sleep_quality'] else 0,
-            'count': row['count']
-        })
+    Args:
+        user_id: str - kullanıcı kimliği
+        days: int - kaç günlük veri
+    
+    Returns:
+        list of dict - günlük ortalama veriler
+    """
+    version = user_data_version(user_id)
+    cached = history_cache.get(user_id, ('trends', days), _CACHE_MISS, version=version)
+    if cached is not _CACHE_MISS:
+        return list(cached)
+    
+    trends = list(iter_trend_data(user_id, days))
+    
+    history_cache.set(user_id, ('trends', days), trends, version=version)
+    return list(trends)
+
+
+def iter_history(user_id: str = 'anonymous', limit: int = 10, chunk_size: int = 500) -> Iterator[Dict]:
+    """
+    Kullanıcının analiz geçmişini imleçten parça parça üret (önbelleksiz)
+    
+    Ham kayıtlar ve günlük özetler zaman sırasıyla birleştirilir; sonuç
+    listesi bellekte oluşturulmaz.
+    
+    Args:
+        user_id: str - kullanıcı kimliği
+        limit: int - maksimum kayıt sayısı
+        chunk_size: int - imleçten tek seferde okunan satır sayısı
+    
+    Yields:
+        dict - analiz kayıtları (yeniden eskiye)
+    """
+    ensure_db()
+    
+    conn = sqlite3.connect(shard_path_for(user_id))
+    conn.row_factory = sqlite3.Row
+    
+    def rows(cursor):
+        while True:
+            batch = cursor.fetchmany(chunk_size)
+            if not batch:
+                return
+            yield from batch
+    
+    try:
+        raw = conn.execute('''
+            SELECT 
+                id, user_id, timestamp, 
+                sleep_hours, caffeine_mg, exercise_min, work_stress, environmental_score,
+                stress_level, sleep_quality, active_rules_mask
+            FROM analysis_history
+            WHERE user_id = ?
+            ORDER BY timestamp DESC
+            LIMIT ?
+        ''', (user_id, limit))
+        aggregated = conn.execute('''
+            SELECT * FROM analysis_daily_aggregate
+            WHERE user_id = ?
+            ORDER BY date DESC
+            LIMIT ?
+        ''', (user_id, limit))
+        
+        merged = heapq.merge(
+            (_row_to_record(row) for row in rows(raw)),
+            (_aggregate_row_to_record(row) for row in rows(aggregated)),
+            key=lambda record: record['timestamp'],
+            reverse=True
+        )
+        yield from itertools.islice(merged, limit)
+    finally:
+        conn.close()
+
+
+def iter_history_chunks(
+    user_id: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    chunk_size: int = 1000,
+    max_ids: Optional[Dict[str, int]] = None
+) -> Iterator[List[Tuple]]:
+    """
+    Analiz kayıtlarını parça parça oku (bellek kullanımı kayıt sayısından bağımsız)
+    
+    Args:
+        user_id: str - kullanıcı kimliği (None ise tüm tablo)
+        start: str - ISO başlangıç zamanı (dahil)
+        end: str - ISO bitiş zamanı (hariç)
+        chunk_size: int - her parçadaki satır sayısı
+        max_ids: dict - shard yolu → dahil edilecek en büyük id (okuma sırasında
+            eklenen satırları dışarıda bırakmak için; listede olmayan shard atlanır)
+    
+    Yields:
+        list of tuple - EXPORT_COLUMNS sırasında satırlar (tüm tabloda shard shard)
+    """
+    ensure_db()
+    
+    conditions = []
+    params = []
+    if user_id is not None:
+        conditions.append('user_id = ?')
+        params.append(user_id)
+    if start:
+        conditions.append('timestamp >= ?')
+        params.append(start)
+    if end:
+        conditions.append('timestamp < ?')
+        params.append(end)
+    
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    # Kullanıcı filtresinde index sırası, tüm tabloda rowid sırası kullanılır (sıralama maliyeti yok)
+    order = 'timestamp ASC, id ASC' if user_id is not None else 'id ASC'
+    paths = [shard_path_for(user_id)] if user_id is not None else get_shard_paths()
+    
+    for path in paths:
+        shard_where, shard_params = where, params
+        if max_ids is not None:
+            if path not in max_ids:
+                continue
+            shard_where = f"{where} AND id <= ?" if where else 'WHERE id <= ?'
+            shard_params = params + [max_ids[path]]
+        
+        conn = sqlite3.connect(path)
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT {', '.join(EXPORT_COLUMNS)}
+                FROM analysis_history
+                {shard_where}
+                ORDER BY {order}
+            ''', shard_params)
+            
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            conn.close()
+
+
+def get_rule_stats(
+    user_id: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None
+) -> Dict:
+    """
+    Kuralların ateşlenme sıklıklarını SQL içinde bit işlemleriyle hesapla
+    
+    Özetlenmiş (saklama süresini aşmış) dönemler rule_daily_counts
+    tablosundan gün çözünürlüğünde eklenir. Kullanıcı verilmezse tüm
+    shard'lar paralel sorgulanıp toplanır.
+    
+    Args:
+        user_id: str - kullanıcı kimliği (None ise tüm kullanıcılar)
+        start: str - ISO başlangıç zamanı (dahil)
+        end: str - ISO bitiş zamanı (hariç)
+    
+    Returns:
+        dict - toplam analiz sayısı ve kural bazında sayım/oran
+    """
+    ensure_db()
+    
+    raw_conditions, raw_params = [], []
+    day_conditions, day_params = [], []
+    if user_id is not None:
+        raw_conditions.append('user_id = ?')
+        raw_params.append(user_id)
+        day_conditions.append('user_id = ?')
+        day_params.append(user_id)
+    if start:
+        raw_conditions.append('timestamp >= ?')
+        raw_params.append(start)
+        day_conditions.append('date >= DATE(?)')
+        day_params.append(start)
+    if end:
+        raw_conditions.append('timestamp < ?')
+        raw_params.append(end)
+        day_conditions.append('date < DATE(?)')
+        day_params.append(end)
+    raw_where = f"WHERE {' AND '.join(raw_conditions)}" if raw_conditions else ''
+    day_where = f"WHERE {' AND '.join(day_conditions)}" if day_conditions else ''
+    
+    bit_sums = ', '.join(
+        f'COALESCE(SUM((active_rules_mask >> {bit}) & 1), 0)'
+        for bit in RULE_BITS.values()
+    )
+    
+    def query_shard(path):
+        conn = sqlite3.connect(path)
+        cursor = conn.cursor()
+        
+        row = cursor.execute(
+            f'SELECT COUNT(*), {bit_sums} FROM analysis_history {raw_where}', raw_params
+        ).fetchone()
+        shard_total = row[0]
+        shard_counts = dict(zip(RULE_BITS.keys(), row[1:]))
+        
+        shard_total += cursor.execute(
+            f'SELECT COALESCE(SUM(count), 0) FROM analysis_daily_aggregate {day_where}', day_params
+        ).fetchone()[0]
+        for rule_id, count in cursor.execute(
+            f'SELECT rule_id, SUM(count) FROM rule_daily_counts {day_where} GROUP BY rule_id', day_params
+        ):
+            if rule_id in shard_counts:
+                shard_counts[rule_id] += count
+        
+        conn.close()
+        return shard_total, shard_counts
+    
+    paths = [shard_path_for(user_id)] if user_id is not None else get_shard_paths()
+    total = 0
+    counts = {rule_id: 0 for rule_id in RULE_BITS}
+    for shard_total, shard_counts in shards.map_parallel(query_shard, paths):
+        total += shard_total
+        for rule_id, count in shard_counts.items():
+            counts[rule_id] += count
     
-    return trends
+    return {
+        'total_analyses': total,
+        'rules': [
+            {
+                'id': rule_id,
+                'description': RULE_DESCRIPTIONS[rule_id],
+                'count': count,
+                'frequency': round(count / total, 4) if total else 0.0
+            }
+            for rule_id, count in counts.items()
+        ]
+    }
 
 
 # Database is initialized when needed (on first save_analysis or explicit init_db call)
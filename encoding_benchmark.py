@@ -0,0 +1,120 @@
+"""
+/analyze Yanıt Kodlaması Karşılaştırması
+Rastgele girdilerle üretilmiş analiz sonuçlarını mevcut ayrıntılı JSON yanıtı
+ve kompakt biçimler (sabit alanlı JSON dizisi, MessagePack) olarak
+serileştirir; yanıt başına boyut ve serileştirme süresini raporlar.
+Python 3.9 Uyumlu
+
+Kullanım:
+    python encoding_benchmark.py --records 2000 --repeat 5
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+from datetime import datetime
+import argparse
+import gzip
+import json
+import random
+import sys
+import time
+
+from flask import Flask
+
+from fuzzy_model import analyze, RULE_DESCRIPTIONS
+from response_encoding import COMPACT_JSON_MIMETYPE, MSGPACK_MIMETYPE, compact_record, encode
+
+
+def sample_responses(count: int, seed: int = 42) -> List[Tuple[Dict, Dict]]:
+    """/analyze'ın döndüreceği (girdi, sonuç) çiftleri"""
+    rng = random.Random(seed)
+    responses = []
+    for index in range(count):
+        inputs = {
+            'sleep_hours': round(rng.uniform(3, 10), 1),
+            'caffeine_mg': rng.randrange(0, 600, 25),
+            'exercise_min': rng.randrange(0, 120, 5),
+            'work_stress': rng.randint(1, 10),
+            'user_id': f'user-{rng.randint(1, 500)}'
+        }
+        result = analyze(inputs['sleep_hours'], inputs['caffeine_mg'], inputs['exercise_min'], inputs['work_stress'])
+        result['record_id'] = index + 1
+        result['anomaly'] = {'samples': 10, 'is_anomaly': False}
+        responses.append((inputs, result))
+    return responses
+
+
+def _verbose_payload(inputs: Dict, result: Dict) -> Dict:
+    result = dict(result)
+    result['active_rule_descriptions'] = [
+        {'id': r, 'description': RULE_DESCRIPTIONS[r]} for r in result.get('active_rules', [])
+    ]
+    return {'input': inputs, 'result': result, 'timestamp': datetime.now().isoformat()}
+
+
+def encoders() -> Dict[str, Callable]:
+    """Biçim adı → (girdi, sonuç) çiftini baytlara çeviren fonksiyon"""
+    app = Flask(__name__)
+
+    def verbose_json(inputs, result):
+        # jsonify ile aynı: Flask varsayılan JSON sağlayıcısı
+        return app.json.dumps(_verbose_payload(inputs, result)).encode('utf-8')
+
+    def compact_stdlib_json(inputs, result):
+        return json.dumps(compact_record(result), separators=(',', ':')).encode('utf-8')
+
+    return {
+        'json (ayrıntılı, mevcut)': verbose_json,
+        'json dizi (stdlib)': compact_stdlib_json,
+        'json dizi (orjson)': lambda inputs, result: encode(compact_record(result), COMPACT_JSON_MIMETYPE),
+        'msgpack': lambda inputs, result: encode(compact_record(result), MSGPACK_MIMETYPE)
+    }
+
+
+def run(count: int, repeat: int) -> List[Dict]:
+    responses = sample_responses(count)
+    results = []
+    for name, encoder in encoders().items():
+        bodies = [encoder(inputs, result) for inputs, result in responses]
+        best = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for inputs, result in responses:
+                encoder(inputs, result)
+            best = min(best, time.perf_counter() - started)
+        total = sum(len(body) for body in bodies)
+        results.append({
+            'format': name,
+            'bytes_per_response': round(total / count, 1),
+            'gzip_bytes_per_response': round(sum(len(gzip.compress(body)) for body in bodies) / count, 1),
+            'encode_us_per_response': round(best / count * 1e6, 2)
+        })
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='/analyze yanıt kodlaması boyut/süre karşılaştırması')
+    parser.add_argument('--records', type=int, default=2000, help='Örnek yanıt sayısı')
+    parser.add_argument('--repeat', type=int, default=5, help='Tekrar sayısı (en iyisi raporlanır)')
+    parser.add_argument('--json', action='store_true', help='Sonuçları JSON olarak yazdır')
+    args = parser.parse_args(argv)
+
+    results = run(args.records, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+        return 0
+
+    baseline = results[0]
+    print(f"📦 {args.records} yanıt, {args.repeat} tekrar\n")
+    print(f"{'Biçim':<26}{'Bayt':>8}{'gzip':>8}{'µs/yanıt':>11}{'Boyut':>8}{'Hız':>8}")
+    for row in results:
+        print(
+            f"{row['format']:<26}{row['bytes_per_response']:>8}{row['gzip_bytes_per_response']:>8}"
+            f"{row['encode_us_per_response']:>11}"
+            f"{row['bytes_per_response'] / baseline['bytes_per_response']:>7.0%}"
+            f"{baseline['encode_us_per_response'] / row['encode_us_per_response']:>7.1f}x"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
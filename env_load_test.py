@@ -0,0 +1,248 @@
+"""
+/analyze-with-environment Yük Testi (sync vs async)
+Harici API'ler yerine yapay gecikmeli yerel bir sahte sunucu başlatır,
+uygulamayı senkron (gunicorn, sync worker) ve async (uvicorn, asgi_app)
+modlarında ayağa kaldırır ve aynı eşzamanlılıkta istek yağdırarak
+throughput ve gecikme yüzdeliklerini karşılaştırır.
+Python 3.9 Uyumlu
+
+Kullanım:
+    python env_load_test.py --mode both --workers 2 --concurrency 100 --requests 1000 --latency 0.3
+"""
+
+from typing import Dict, List, Optional
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import uvicorn
+
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+MODES = ('sync', 'async')
+
+WEATHER_RESPONSE = {'main': {'temp': 21.0, 'humidity': 55}, 'weather': [{'main': 'Clear', 'description': 'clear sky'}]}
+AIR_QUALITY_RESPONSE = {'data': {'current': {'pollution': {'aqius': 42}}}}
+STUB_LATENCY = 0.0
+# Sahte API'nin 503 döndürme olasılığı (yeniden deneme testleri için)
+STUB_ERROR_RATE = 0.0
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def stub_api(scope, receive, send):
+    """OpenWeatherMap ve AirVisual yanıtlarını STUB_LATENCY saniye gecikmeyle veren sahte API (ASGI; STUB_ERROR_RATE olasılıkla 503)"""
+    if scope['type'] != 'http':
+        return
+    await asyncio.sleep(STUB_LATENCY)
+    status = 503 if random.random() < STUB_ERROR_RATE else 200
+    payload = AIR_QUALITY_RESPONSE if scope['path'].startswith('/airvisual') else WEATHER_RESPONSE
+    body = json.dumps(payload if status == 200 else {'error': 'unavailable'}).encode()
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def serve_stub(port: int, latency: float, error_rate: float = 0.0):
+    global STUB_LATENCY, STUB_ERROR_RATE
+    STUB_LATENCY = latency
+    STUB_ERROR_RATE = error_rate
+    uvicorn.run(stub_api, host='127.0.0.1', port=port, log_level='warning', access_log=False, backlog=4096)
+
+
+def start_stub_server(port: int, latency: float, error_rate: float = 0.0) -> multiprocessing.Process:
+    """Sahte sunucuyu ayrı süreçte başlat (yük üreticisiyle GIL paylaşmasın)"""
+    process = multiprocessing.Process(target=serve_stub, args=(port, latency, error_rate), daemon=True)
+    process.start()
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return process
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError('Sahte API sunucusu başlatılamadı')
+
+
+def start_app(
+    mode: str,
+    workers: int,
+    port: int,
+    stub_url: str,
+    workdir: str,
+    production_config: bool = False
+) -> subprocess.Popen:
+    """
+    Uygulamayı verilen modda başlat (veritabanı geçici klasörde tutulur)
+
+    Args:
+        production_config: sync modda gunicorn.conf.py kullan (preload + ısınma)
+    """
+    env = dict(os.environ)
+    env.update({
+        'PYTHONPATH': APP_DIR + os.pathsep + env.get('PYTHONPATH', ''),
+        'OPENWEATHER_API_KEY': 'load-test',
+        'AIRVISUAL_API_KEY': 'load-test',
+        'OPENWEATHER_API_URL': f'{stub_url}/weather',
+        'AIRVISUAL_API_URL': f'{stub_url}/airvisual',
+        'FLASK_DEBUG': '0'
+    })
+    if mode == 'sync' and production_config:
+        env['WEB_CONCURRENCY'] = str(workers)
+        command = [
+            sys.executable, '-m', 'gunicorn', '-c', os.path.join(APP_DIR, 'gunicorn.conf.py'),
+            '--bind', f'127.0.0.1:{port}', '--log-level', 'warning', 'app:app'
+        ]
+    elif mode == 'sync':
+        command = [
+            sys.executable, '-m', 'gunicorn', '-w', str(workers), '--bind', f'127.0.0.1:{port}',
+            '--timeout', '120', '--log-level', 'warning', 'app:app'
+        ]
+    else:
+        command = [
+            sys.executable, '-m', 'uvicorn', 'asgi_app:app', '--workers', str(workers),
+            '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning', '--no-access-log'
+        ]
+    return subprocess.Popen(command, cwd=workdir, env=env)
+
+
+def wait_ready(base_url: str, process: subprocess.Popen, timeout: float = 60.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'Sunucu başlatılamadı (çıkış kodu {process.returncode})')
+        try:
+            if httpx.get(f'{base_url}/', timeout=2.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError('Sunucu zamanında hazır olmadı')
+
+
+async def run_load(base_url: str, total: int, concurrency: int, timeout: float) -> Dict:
+    """`concurrency` eşzamanlı istemciyle toplam `total` istek gönder"""
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(total))
+    payload = {'sleep_hours': 6.5, 'caffeine_mg': 150, 'exercise_min': 20, 'work_stress': 6, 'city': 'Istanbul'}
+
+    async def worker(client: httpx.AsyncClient, index: int):
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                response = await client.post(
+                    '/analyze-with-environment', json=dict(payload, user_id=f'load-{index}-{i % 50}')
+                )
+                ok = response.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client, index) for index in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+
+    def percentile(p: float) -> Optional[float]:
+        if not latencies:
+            return None
+        return round(latencies[min(int(len(latencies) * p / 100), len(latencies) - 1)] * 1000, 1)
+
+    return {
+        'requests': total,
+        'ok': len(latencies),
+        'errors': errors,
+        'elapsed_sec': round(elapsed, 2),
+        'requests_per_sec': round(len(latencies) / elapsed, 1) if elapsed > 0 else 0.0,
+        'latency_ms': {'p50': percentile(50), 'p95': percentile(95), 'p99': percentile(99)}
+    }
+
+
+def benchmark(mode: str, args, stub_url: str) -> Dict:
+    workdir = tempfile.mkdtemp(prefix=f'env-load-{mode}-')
+    port = _free_port()
+    base_url = f'http://127.0.0.1:{port}'
+    process = start_app(mode, args.workers, port, stub_url, workdir)
+    try:
+        wait_ready(base_url, process)
+        # Isınma (model, veritabanı şeması)
+        asyncio.run(run_load(base_url, args.workers * 2, args.workers, args.timeout))
+        result = asyncio.run(run_load(base_url, args.requests, args.concurrency, args.timeout))
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        shutil.rmtree(workdir, ignore_errors=True)
+    result.update({'mode': mode, 'workers': args.workers, 'concurrency': args.concurrency})
+    return result
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='/analyze-with-environment yük testi (sync vs async)')
+    parser.add_argument('--mode', choices=MODES + ('both',), default='both')
+    parser.add_argument('--workers', type=int, default=2, help='Sunucu worker süreç sayısı')
+    parser.add_argument('--concurrency', type=int, default=100, help='Eşzamanlı istemci sayısı')
+    parser.add_argument('--requests', type=int, default=1000, help='Toplam istek sayısı')
+    parser.add_argument('--latency', type=float, default=0.3, help='Sahte harici API gecikmesi (saniye)')
+    parser.add_argument('--timeout', type=float, default=60.0, help='İstemci zaman aşımı (saniye)')
+    parser.add_argument('--json', action='store_true', help='Sonuçları JSON olarak yazdır')
+    args = parser.parse_args(argv)
+
+    stub_port = _free_port()
+    stub = start_stub_server(stub_port, args.latency)
+    stub_url = f'http://127.0.0.1:{stub_port}'
+    modes = MODES if args.mode == 'both' else (args.mode,)
+
+    results = []
+    try:
+        for mode in modes:
+            if not args.json:
+                print(f"🚀 {mode}: {args.workers} worker, {args.concurrency} eşzamanlı istemci, "
+                      f"{args.requests} istek (API gecikmesi {args.latency:g} sn)")
+            result = benchmark(mode, args, stub_url)
+            results.append(result)
+            if not args.json:
+                latency = result['latency_ms']
+                print(f"   ✅ {result['requests_per_sec']} istek/sn, "
+                      f"p50 {latency['p50']} ms, p95 {latency['p95']} ms, p99 {latency['p99']} ms, "
+                      f"{result['errors']} hata")
+    finally:
+        stub.terminate()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    elif len(results) == 2 and results[0]['requests_per_sec']:
+        speedup = results[1]['requests_per_sec'] / results[0]['requests_per_sec']
+        print(f"\n📊 async / sync throughput: {speedup:.1f}x")
+    return 0 if all(result['errors'] == 0 for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
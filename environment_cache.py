@@ -0,0 +1,181 @@
+"""
+Şehir Bazlı Çevresel Veri Önbelleği
+Hava durumu, hava kalitesi, gün ışığı ve ay fazı yavaş değişir; aynı şehirden
+gelen binlerce /analyze-with-environment isteği için her seferinde harici API
+çağırmak ve ephem hesabı yapmak gereksizdir. Her kaynak kendi TTL'i ile
+ayrı bir LRU önbellekte (cache.TTLCache) tutulur:
+
+    weather      - şehir başına, ENV_CACHE_WEATHER_TTL (varsayılan 10 dk)
+    air_quality  - şehir başına, ENV_CACHE_AIR_QUALITY_TTL (varsayılan 30 dk)
+    daylight     - şehir + gün başına, ENV_CACHE_ASTRO_TTL (varsayılan 1 gün)
+    moon         - gün başına, ENV_CACHE_ASTRO_TTL
+
+Başarısız çağrılar (None) önbelleğe alınmaz. İsabet/ıska sayaçları
+/cache-stats ve /metrics'te (`env_weather`, `env_air_quality`, ...) görünür.
+
+ENV_CACHE_PATH verilirse kayıtlar ayrıca SQLite dosyasına yazılır: bellekte
+bulunamayan kayıt oradan okunur. Böylece değerler yeniden başlatmadan sonra
+ve worker'lar arasında paylaşılır.
+Python 3.9 Uyumlu
+"""
+
+from datetime import date
+from typing import Callable, Dict, Optional
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from cache import TTLCache
+from metrics import ENV_CACHE_SHARED_HITS
+
+
+ENV_CACHE_ENABLED = os.getenv('ENV_CACHE_ENABLED', '1') == '1'
+MAX_CITIES = int(os.getenv('ENV_CACHE_MAX_CITIES', '1000'))
+ASTRO_TTL = float(os.getenv('ENV_CACHE_ASTRO_TTL', str(24 * 3600)))
+# Boş: kalıcı katman kapalı (yalnızca süreç içi önbellek)
+ENV_CACHE_PATH = os.getenv('ENV_CACHE_PATH', '')
+
+SOURCE_TTLS = {
+    'weather': float(os.getenv('ENV_CACHE_WEATHER_TTL', '600')),
+    'air_quality': float(os.getenv('ENV_CACHE_AIR_QUALITY_TTL', '1800')),
+    'daylight': ASTRO_TTL,
+    'moon': ASTRO_TTL
+}
+
+# Kalıcı katmanda süresi dolan kayıtlar her PRUNE_EVERY yazımda bir silinir
+PRUNE_EVERY = 100
+
+_caches = {
+    source: TTLCache(f'env_{source}', maxsize=MAX_CITIES, ttl=ttl)
+    for source, ttl in SOURCE_TTLS.items()
+}
+_local = threading.local()
+_writes = itertools.count(1)
+
+
+def normalize_city(city: str) -> str:
+    # Doğrulanmamış çağıranlardan gelen None/sayı da anahtar üretir; kaynak kendi varsayılanına düşer
+    return ' '.join(str(city).split()).casefold()
+
+
+def cache_key(source: str, city: str) -> str:
+    """
+    Kaynağın önbellek anahtarı
+
+    Gün ışığı ve ay fazı tarihe bağlıdır; anahtara günün tarihi eklenir ki
+    gün değişince TTL dolmadan da yeniden hesaplansın.
+    """
+    if source == 'moon':
+        return date.today().isoformat()
+    if source == 'daylight':
+        return f'{normalize_city(city)}|{date.today().isoformat()}'
+    return normalize_city(city)
+
+
+def _connect() -> sqlite3.Connection:
+    """Thread başına kalıcı bağlantı (WAL; worker'lar aynı dosyayı paylaşır)"""
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        return conn
+    os.makedirs(os.path.dirname(ENV_CACHE_PATH) or '.', exist_ok=True)
+    conn = sqlite3.connect(ENV_CACHE_PATH, timeout=10.0, isolation_level=None)
+    conn.execute('PRAGMA journal_mode = WAL')
+    # Kayıp bir kayıt yalnızca bir harici çağrının tekrarlanması demektir
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS environment_cache (
+            source TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT NOT NULL,
+            expires_at REAL NOT NULL,
+            PRIMARY KEY (source, key)
+        )
+    ''')
+    _local.conn = conn
+    return conn
+
+
+def _reset_after_fork():
+    # Ebeveynin SQLite bağlantısı çocukta kullanılamaz
+    global _local
+    _local = threading.local()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _load_persisted(source: str, key: str) -> Optional[Dict]:
+    """Kalıcı katmandan oku; bulunursa kalan süresiyle belleğe al"""
+    try:
+        row = _connect().execute(
+            'SELECT value, expires_at FROM environment_cache WHERE source = ? AND key = ?', (source, key)
+        ).fetchone()
+    except sqlite3.Error as e:
+        print(f"Çevresel önbellek okunamadı: {e}")
+        return None
+    if row is None:
+        return None
+    remaining = row[1] - time.time()
+    if remaining <= 0:
+        return None
+    value = json.loads(row[0])
+    _caches[source].set(key, value, ttl=remaining)
+    ENV_CACHE_SHARED_HITS.labels(source).inc()
+    return value
+
+
+def _persist(source: str, key: str, value: Dict):
+    try:
+        conn = _connect()
+        conn.execute(
+            'INSERT OR REPLACE INTO environment_cache (source, key, value, expires_at) VALUES (?, ?, ?, ?)',
+            (source, key, json.dumps(value, ensure_ascii=False), time.time() + SOURCE_TTLS[source])
+        )
+        if next(_writes) % PRUNE_EVERY == 0:
+            conn.execute('DELETE FROM environment_cache WHERE expires_at <= ?', (time.time(),))
+    except sqlite3.Error as e:
+        print(f"Çevresel önbellek yazılamadı: {e}")
+
+
+def lookup(source: str, city: str) -> Optional[Dict]:
+    """Önbellekteki değer (bellek, sonra kalıcı katman); yoksa None"""
+    if not ENV_CACHE_ENABLED:
+        return None
+    key = cache_key(source, city)
+    value = _caches[source].get(key)
+    if value is None and ENV_CACHE_PATH:
+        value = _load_persisted(source, key)
+    return value
+
+
+def store(source: str, city: str, value: Optional[Dict]):
+    """Başarılı sonucu sakla (None saklanmaz; sonraki istek yeniden dener)"""
+    if not ENV_CACHE_ENABLED or value is None:
+        return
+    key = cache_key(source, city)
+    _caches[source].set(key, value)
+    if ENV_CACHE_PATH:
+        _persist(source, key, value)
+
+
+def cached(source: str, city: str, fetch: Callable[[], Optional[Dict]]) -> Optional[Dict]:
+    """
+    Önbellekte varsa döndür, yoksa fetch() çağırıp sakla
+
+    Args:
+        source: 'weather', 'air_quality', 'daylight' veya 'moon'
+        city: Şehir adı (moon için kullanılmaz)
+        fetch: değeri hesaplayan/çeken fonksiyon
+
+    Returns:
+        dict veya None (fetch başarısız)
+    """
+    value = lookup(source, city)
+    if value is None:
+        value = fetch()
+        store(source, city, value)
+    return value
+
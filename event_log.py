@@ -0,0 +1,118 @@
+"""
+Süreçler Arası Olay Günlüğü
+save_analysis commit ettikten sonra yeni analizi kısa ömürlü bir SQLite
+tablosuna yazar; canlı güncelleme akışları (live_updates.py) hangi worker
+sürecinde olurlarsa olsunlar bu tabloyu artan id ile okur. Olay gövdesi
+JSON metni olarak saklanır ve SSE'ye yeniden serileştirilmeden yazılır.
+
+Kayıtlar EVENTS_RETENTION saniye tutulur; daha eski bir Last-Event-ID ile
+gelen istemci anlık görüntüyü yeniden alır.
+Python 3.9 Uyumlu
+"""
+
+from typing import Dict, List, Optional, Tuple
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+EVENTS_ENABLED = os.getenv('LIVE_EVENTS_ENABLED', '1') == '1'
+EVENTS_DB_PATH = os.getenv('LIVE_EVENTS_DB_PATH', 'data/events.db')
+EVENTS_RETENTION = float(os.getenv('LIVE_EVENTS_RETENTION', '600'))
+
+# Süresi dolan olaylar her PRUNE_EVERY yayında bir silinir
+PRUNE_EVERY = 200
+
+# (id, user_id, kind, JSON gövde)
+Event = Tuple[int, str, str, str]
+
+_publishes = itertools.count(1)
+_local = threading.local()
+
+
+def _connect() -> sqlite3.Connection:
+    """Thread başına kalıcı bağlantı (WAL; okuyucular yazarı beklemez)"""
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        return conn
+    os.makedirs(os.path.dirname(EVENTS_DB_PATH) or '.', exist_ok=True)
+    conn = sqlite3.connect(EVENTS_DB_PATH, timeout=10.0, isolation_level=None)
+    conn.execute('PRAGMA journal_mode = WAL')
+    # Olaylar geçicidir; kaybolan olay yalnızca bir canlı güncellemenin kaçması demektir
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS live_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            created_at REAL NOT NULL
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_live_events_user ON live_events(user_id, id)')
+    _local.conn = conn
+    return conn
+
+
+def _reset_after_fork():
+    # Ebeveynin SQLite bağlantısı çocukta kullanılamaz
+    global _local
+    _local = threading.local()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def publish(user_id: str, kind: str, payload: Dict) -> Optional[int]:
+    """
+    Olayı günlüğe yaz
+
+    Hata durumunda çağıranı (save_analysis) bozmaz; olay atlanır.
+
+    Returns:
+        int - olay id'si, kapalıysa veya yazılamadıysa None
+    """
+    if not EVENTS_ENABLED:
+        return None
+    try:
+        conn = _connect()
+        event_id = conn.execute(
+            'INSERT INTO live_events (user_id, kind, payload, created_at) VALUES (?, ?, ?, ?)',
+            (user_id, kind, json.dumps(payload, ensure_ascii=False), time.time())
+        ).lastrowid
+        if next(_publishes) % PRUNE_EVERY == 0:
+            conn.execute('DELETE FROM live_events WHERE created_at < ?', (time.time() - EVENTS_RETENTION,))
+        return event_id
+    except sqlite3.Error as e:
+        print(f"Canlı olay yazılamadı: {e}")
+        return None
+
+
+def read_since(after_id: int, user_id: Optional[str] = None, limit: int = 1000) -> List[Event]:
+    """after_id'den sonraki olaylar (id sırasıyla; user_id verilirse yalnızca o kullanıcının)"""
+    conn = _connect()
+    if user_id is None:
+        cursor = conn.execute(
+            'SELECT id, user_id, kind, payload FROM live_events WHERE id > ? ORDER BY id LIMIT ?',
+            (after_id, limit)
+        )
+    else:
+        cursor = conn.execute(
+            'SELECT id, user_id, kind, payload FROM live_events WHERE user_id = ? AND id > ? ORDER BY id LIMIT ?',
+            (user_id, after_id, limit)
+        )
+    return cursor.fetchall()
+
+
+def id_range() -> Tuple[int, int]:
+    """(en eski saklı olay id'si, en son olay id'si); günlük boşsa (0, son id)"""
+    conn = _connect()
+    first, last = conn.execute('SELECT MIN(id), MAX(id) FROM live_events').fetchone()
+    if last is None:
+        # Tüm olaylar silinmiş olabilir; AUTOINCREMENT sayacı korunur
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'live_events'").fetchone()
+        return 0, row[0] if row else 0
+    return first, last
@@ -0,0 +1,261 @@
+"""
+Analiz Geçmişi Dışa Aktarma
+analysis_history tablosunu parça parça okuyup NDJSON, CSV veya
+sütunlu formatlarda (Arrow IPC, Parquet) akış halinde yazar.
+Bellek kullanımı kayıt sayısından bağımsızdır.
+CSV ve sütunlu formatlarda aktif kurallar active_rules_mask (R1 → bit 0)
+tamsayısı olarak yazılır.
+Python 3.9 Uyumlu
+
+Kullanım:
+    python export_history.py --format csv --user-id user123 --start 2025-01-01 -o out.csv
+"""
+
+from typing import Iterator, List, Optional, Tuple
+from datetime import datetime
+import argparse
+import csv
+import io
+import json
+import sys
+
+from database import EXPORT_COLUMNS, iter_history_chunks
+from fuzzy_model import mask_to_rules
+
+
+EXPORT_FORMATS = ('ndjson', 'csv', 'arrow', 'parquet')
+
+# Formatlara göre HTTP content-type ve dosya uzantısı
+FORMAT_MIMETYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'parquet': 'application/vnd.apache.parquet'
+}
+FORMAT_EXTENSIONS = {
+    'ndjson': 'ndjson',
+    'csv': 'csv',
+    'arrow': 'arrows',
+    'parquet': 'parquet'
+}
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def parse_time_filter(value: Optional[str]) -> Optional[str]:
+    """
+    Zaman filtresini doğrula ve veritabanındaki ISO formatına çevir
+
+    Args:
+        value: str - ISO tarih/zaman (örn: 2025-01-01 veya 2025-01-01T08:00:00)
+
+    Returns:
+        str - ISO zaman veya None
+
+    Raises:
+        ValueError - geçersiz tarih
+    """
+    if not value:
+        return None
+    return datetime.fromisoformat(value).isoformat()
+
+
+def _row_to_dict(row: Tuple) -> dict:
+    record = dict(zip(EXPORT_COLUMNS, row))
+    # NDJSON çıktısı API ile aynı: kural listesi
+    record['active_rules'] = mask_to_rules(record.pop('active_rules_mask'))
+    return record
+
+
+def iter_ndjson(chunks: Iterator[List[Tuple]]) -> Iterator[str]:
+    """Her parça için NDJSON satırlarını üret"""
+    for rows in chunks:
+        yield ''.join(
+            json.dumps(_row_to_dict(row), ensure_ascii=False) + '\n'
+            for row in rows
+        )
+
+
+def iter_csv(chunks: Iterator[List[Tuple]]) -> Iterator[str]:
+    """Başlık satırı ve her parça için CSV metni üret"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue()
+
+    for rows in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue()
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        return pyarrow
+    except ImportError:
+        raise RuntimeError(
+            "Sütunlu formatlar için pyarrow gerekli: pip install -r requirements.txt"
+        )
+
+
+def _arrow_schema(pa):
+    return pa.schema([
+        ('id', pa.int64()),
+        ('user_id', pa.string()),
+        ('timestamp', pa.string()),
+        ('sleep_hours', pa.float64()),
+        ('caffeine_mg', pa.float64()),
+        ('exercise_min', pa.float64()),
+        ('work_stress', pa.float64()),
+        ('environmental_score', pa.float64()),
+        ('stress_level', pa.float64()),
+        ('sleep_quality', pa.float64()),
+        ('active_rules_mask', pa.int32())
+    ])
+
+
+def _rows_to_batch(pa, schema, rows: List[Tuple]):
+    columns = list(zip(*rows))
+    return pa.RecordBatch.from_arrays(
+        [pa.array(col, type=field.type) for col, field in zip(columns, schema)],
+        schema=schema
+    )
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    pyarrow yazıcıları için bellek içi hedef; yazılan baytlar her parçadan
+    sonra drain() ile alınır, böylece tampon büyümez.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._parts = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def iter_columnar(chunks: Iterator[List[Tuple]], fmt: str) -> Iterator[bytes]:
+    """
+    Arrow IPC stream veya Parquet baytlarını parça parça üret
+
+    Her veritabanı parçası bir record batch / row group olarak yazılır.
+    """
+    pa = _require_pyarrow()
+    schema = _arrow_schema(pa)
+    sink = _ChunkSink()
+
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(sink, schema, compression='snappy')
+        write = lambda batch: writer.write_table(pa.Table.from_batches([batch]))
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+        write = writer.write_batch
+
+    for rows in chunks:
+        write(_rows_to_batch(pa, schema, rows))
+        data = sink.drain()
+        if data:
+            yield data
+
+    writer.close()
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def stream_export(
+    fmt: str = 'ndjson',
+    user_id: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator:
+    """
+    Seçilen formatta dışa aktarım akışı oluştur
+
+    Args:
+        fmt: str - 'ndjson', 'csv', 'arrow' veya 'parquet'
+        user_id: str - kullanıcı filtresi (None ise tüm kullanıcılar)
+        start: str - ISO başlangıç zamanı (dahil)
+        end: str - ISO bitiş zamanı (hariç)
+        chunk_size: int - parça başına satır
+
+    Returns:
+        iterator - metin (ndjson/csv) veya bayt (arrow/parquet) parçaları
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Desteklenmeyen format: {fmt} (seçenekler: {', '.join(EXPORT_FORMATS)})")
+
+    if fmt in ('arrow', 'parquet'):
+        _require_pyarrow()
+
+    chunks = iter_history_chunks(
+        user_id=user_id,
+        start=parse_time_filter(start),
+        end=parse_time_filter(end),
+        chunk_size=chunk_size
+    )
+
+    if fmt == 'ndjson':
+        return iter_ndjson(chunks)
+    if fmt == 'csv':
+        return iter_csv(chunks)
+    return iter_columnar(chunks, fmt)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Analiz geçmişini dışa aktar')
+    parser.add_argument('--format', '-f', choices=EXPORT_FORMATS, default='ndjson')
+    parser.add_argument('--user-id', help='Sadece bu kullanıcının kayıtları')
+    parser.add_argument('--start', help='Başlangıç zamanı (ISO, dahil)')
+    parser.add_argument('--end', help='Bitiş zamanı (ISO, hariç)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--output', '-o', help='Çıktı dosyası (varsayılan: stdout)')
+    args = parser.parse_args(argv)
+
+    try:
+        stream = stream_export(args.format, args.user_id, args.start, args.end, args.chunk_size)
+    except (ValueError, RuntimeError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+
+    binary = args.format in ('arrow', 'parquet')
+    if args.output:
+        out = open(args.output, 'wb') if binary else open(args.output, 'w', encoding='utf-8', newline='')
+    else:
+        out = sys.stdout.buffer if binary else sys.stdout
+
+    try:
+        for part in stream:
+            out.write(part)
+    finally:
+        if args.output:
+            out.close()
+
+    if args.output:
+        print(f"✅ Dışa aktarıldı: {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,12 +4,122 @@ Harici API Entegrasyonları
 """
 
 import os
-import requests
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Callable, Dict, Optional, Tuple
 import ephem
 
+from environment_cache import cache_key, cached, lookup
+from http_sessions import provider_get
+from metrics import ENV_LOOKUP_SHARED, api_fallback, timed_stage
 
+
+# Çevresel kaynakların (hava, hava kalitesi, gün ışığı, ay) toplam bekleme süresi (saniye).
+# Süreyi kaçıran kaynak için varsayılan skor kullanılır ve yanıtta degraded_sources'ta listelenir.
+LOOKUP_DEADLINE = float(os.getenv('ENV_LOOKUP_DEADLINE', '3'))
+LOOKUP_WORKERS = int(os.getenv('ENV_LOOKUP_WORKERS', '16'))
+# Süreç başına süren (çalışan + kuyrukta) en fazla kaynak çağrısı. Dolunca yeni çağrı
+# başlatılmaz, kaynak varsayılan skora düşer (süreyi kaçıran çağrılar birikmesin).
+LOOKUP_MAX_PENDING = int(os.getenv('ENV_LOOKUP_MAX_PENDING', '64'))
+
+# Kaynak sırası combine_environmental_scores argümanlarıyla aynı
+ENVIRONMENT_SOURCES = ('weather', 'air_quality', 'daylight', 'moon')
+
+# Kaynak başına varsayılan skor (veri alınamadığında)
+FALLBACK_SCORE = 70
+
+# api_fallback metrik etiketi kaynak adından farklı olanlar
+FALLBACK_LABELS = {'moon': 'moon_phase'}
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+# (kaynak, önbellek anahtarı) → süren çağrı; aynı şehir için eşzamanlı ıskalar tek çağrıyı bekler
+_inflight: Dict[Tuple[str, str], Future] = {}
+_inflight_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    # Ebeveynin thread'leri çocuk süreçte yoktur; havuz ilk kullanımda yeniden kurulur
+    global _executor, _executor_lock, _inflight, _inflight_lock
+    _executor = None
+    _executor_lock = threading.Lock()
+    _inflight = {}
+    _inflight_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def api_url(name: str, default: str) -> str:
+    """API adresi (test/yük testi için ortam değişkeniyle değiştirilebilir)"""
+    return os.getenv(name, default)
+
+
+def weather_request(city: str, api_key: str) -> Dict:
+    """OpenWeatherMap isteğinin adresi ve parametreleri"""
+    return {
+        'url': api_url('OPENWEATHER_API_URL', 'http://api.openweathermap.org/data/2.5/weather'),
+        'params': {'q': city, 'appid': api_key, 'units': 'metric'}
+    }
+
+
+def default_weather() -> Dict:
+    """API anahtarı yokken kullanılan hava durumu değerleri"""
+    # Default environmental values (can be overridden via environment variables)
+    DEFAULT_TEMP = float(os.getenv('DEFAULT_TEMPERATURE', '20'))
+    DEFAULT_HUMIDITY = float(os.getenv('DEFAULT_HUMIDITY', '50'))
+    DEFAULT_WEATHER_SCORE = float(os.getenv('DEFAULT_WEATHER_SCORE', '70'))
+    
+    return {
+        'temperature': DEFAULT_TEMP,
+        'humidity': DEFAULT_HUMIDITY,
+        'weather': 'clear',
+        'score': DEFAULT_WEATHER_SCORE
+    }
+
+
+def score_weather(data: Dict) -> Dict:
+    """
+    OpenWeatherMap yanıtından hava durumu skorunu hesapla
+    
+    Args:
+        data: API JSON yanıtı
+    
+    Returns:
+        dict: Hava durumu verisi ve skor
+    """
+    temp = data['main']['temp']
+    humidity = data['main']['humidity']
+    weather_main = data['weather'][0]['main'].lower()
+    
+    # İdeal sıcaklık: 18-24°C
+    temp_score = 100 if 18 <= temp <= 24 else max(0, 100 - abs(temp - 21) * 5)
+    
+    # İdeal nem: 40-60%
+    humidity_score = 100 if 40 <= humidity <= 60 else max(0, 100 - abs(humidity - 50) * 2)
+    
+    # Hava durumu skoru
+    weather_score = 100
+    if weather_main in ['rain', 'thunderstorm', 'drizzle']:
+        weather_score = 40
+    elif weather_main in ['clouds', 'mist', 'fog']:
+        weather_score = 60
+    elif weather_main in ['clear']:
+        weather_score = 100
+    
+    overall_score = (temp_score + humidity_score + weather_score) / 3
+    
+    return {
+        'temperature': temp,
+        'humidity': humidity,
+        'weather': weather_main,
+        'score': round(overall_score, 2)
+    }
+
+
+@timed_stage('external_weather')
 def get_weather_data(city: str) -> Optional[Dict]:
     """
     OpenWeatherMap API'den hava durumu verisini çek
@@ -22,62 +132,84 @@ def get_weather_data(city: str) -> Optional[Dict]:
     """
     api_key = os.getenv('OPENWEATHER_API_KEY')
     
-    # Default environmental values (can be overridden via environment variables)
-    DEFAULT_TEMP = float(os.getenv('DEFAULT_TEMPERATURE', '20'))
-    DEFAULT_HUMIDITY = float(os.getenv('DEFAULT_HUMIDITY', '50'))
-    DEFAULT_WEATHER_SCORE = float(os.getenv('DEFAULT_WEATHER_SCORE', '70'))
-    
     if not api_key:
         # API key yoksa default değer dön
-        return {
-            'temperature': DEFAULT_TEMP,
-            'humidity': DEFAULT_HUMIDITY,
-            'weather': 'clear',
-            'score': DEFAULT_WEATHER_SCORE
-        }
+        api_fallback('weather', 'no_key')
+        return default_weather()
     
     try:
-        url = f"http://api.openweathermap.org/data/2.5/weather?q={city}&appid={api_key}&units=metric"
-        response = requests.get(url, timeout=5)
+        response = provider_get('weather', **weather_request(city, api_key))
         
         if response.status_code == 200:
-            data = response.json()
-            
-            # Hava durumu skorunu hesapla
-            temp = data['main']['temp']
-            humidity = data['main']['humidity']
-            weather_main = data['weather'][0]['main'].lower()
-            
-            # İdeal sıcaklık: 18-24°C
-            temp_score = 100 if 18 <= temp <= 24 else max(0, 100 - abs(temp - 21) * 5)
-            
-            # İdeal nem: 40-60%
-            humidity_score = 100 if 40 <= humidity <= 60 else max(0, 100 - abs(humidity - 50) * 2)
-            
-            # Hava durumu skoru
-            weather_score = 100
-            if weather_main in ['rain', 'thunderstorm', 'drizzle']:
-                weather_score = 40
-            elif weather_main in ['clouds', 'mist', 'fog']:
-                weather_score = 60
-            elif weather_main in ['clear']:
-                weather_score = 100
-            
-            overall_score = (temp_score + humidity_score + weather_score) / 3
-            
-            return {
-                'temperature': temp,
-                'humidity': humidity,
-                'weather': weather_main,
-                'score': round(overall_score, 2)
-            }
+            return score_weather(response.json())
         else:
+            api_fallback('weather', 'status')
             return None
     except Exception as e:
         print(f"Hava durumu API hatası: {e}")
+        api_fallback('weather', 'error')
         return None
 
 
+def air_quality_request(city: str, api_key: str) -> Dict:
+    """AirVisual isteğinin adresi ve parametreleri"""
+    # AirVisual API country ve state de gerektiriyor
+    return {
+        'url': api_url('AIRVISUAL_API_URL', 'http://api.airvisual.com/v2/city'),
+        'params': {'city': city, 'state': '', 'country': '', 'key': api_key}
+    }
+
+
+def default_air_quality() -> Dict:
+    """API anahtarı yokken kullanılan hava kalitesi değerleri"""
+    # Default air quality values (can be overridden via environment variables)
+    DEFAULT_AQI = int(os.getenv('DEFAULT_AQI', '50'))
+    DEFAULT_AIR_SCORE = float(os.getenv('DEFAULT_AIR_SCORE', '75'))
+    
+    return {
+        'aqi': DEFAULT_AQI,
+        'quality': 'good',
+        'score': DEFAULT_AIR_SCORE
+    }
+
+
+def score_air_quality(data: Dict) -> Dict:
+    """
+    AirVisual yanıtından hava kalitesi skorunu hesapla
+    
+    Args:
+        data: API JSON yanıtı
+    
+    Returns:
+        dict: AQI, kalite sınıfı ve skor
+    """
+    aqi = data['data']['current']['pollution']['aqius']
+    
+    # AQI skorunu 0-100 skalasına çevir
+    if aqi <= 50:
+        score = 100
+        quality = 'good'
+    elif aqi <= 100:
+        score = 75
+        quality = 'moderate'
+    elif aqi <= 150:
+        score = 50
+        quality = 'unhealthy_sensitive'
+    elif aqi <= 200:
+        score = 25
+        quality = 'unhealthy'
+    else:
+        score = 0
+        quality = 'hazardous'
+    
+    return {
+        'aqi': aqi,
+        'quality': quality,
+        'score': score
+    }
+
+
+@timed_stage('external_air_quality')
 def get_air_quality(city: str) -> Optional[Dict]:
     """
     AirVisual API'den hava kalitesi verisini çek
@@ -90,57 +222,26 @@ def get_air_quality(city: str) -> Optional[Dict]:
     """
     api_key = os.getenv('AIRVISUAL_API_KEY')
     
-    # Default air quality values (can be overridden via environment variables)
-    DEFAULT_AQI = int(os.getenv('DEFAULT_AQI', '50'))
-    DEFAULT_AIR_SCORE = float(os.getenv('DEFAULT_AIR_SCORE', '75'))
-    
     if not api_key:
         # API key yoksa default değer dön
-        return {
-            'aqi': DEFAULT_AQI,
-            'quality': 'good',
-            'score': DEFAULT_AIR_SCORE
-        }
+        api_fallback('air_quality', 'no_key')
+        return default_air_quality()
     
     try:
-        # AirVisual API country ve state de gerektiriyor
-        # Basitleştirme için default değer dönelim
-        url = f"http://api.airvisual.com/v2/city?city={city}&state=&country=&key={api_key}"
-        response = requests.get(url, timeout=5)
+        response = provider_get('air_quality', **air_quality_request(city, api_key))
         
         if response.status_code == 200:
-            data = response.json()
-            aqi = data['data']['current']['pollution']['aqius']
-            
-            # AQI skorunu 0-100 skalasına çevir
-            if aqi <= 50:
-                score = 100
-                quality = 'good'
-            elif aqi <= 100:
-                score = 75
-                quality = 'moderate'
-            elif aqi <= 150:
-                score = 50
-                quality = 'unhealthy_sensitive'
-            elif aqi <= 200:
-                score = 25
-                quality = 'unhealthy'
-            else:
-                score = 0
-                quality = 'hazardous'
-            
-            return {
-                'aqi': aqi,
-                'quality': quality,
-                'score': score
-            }
+            return score_air_quality(response.json())
         else:
+            api_fallback('air_quality', 'status')
             return None
     except Exception as e:
         print(f"Hava kalitesi API hatası: {e}")
+        api_fallback('air_quality', 'error')
         return None
 
 
+@timed_stage('daylight')
 def get_daylight_hours(city: str = "Istanbul") -> Optional[Dict]:
     """
     Gün ışığı süresi hesaplama (basitleştirilmiş)
@@ -192,6 +293,7 @@ def get_daylight_hours(city: str = "Istanbul") -> Optional[Dict]:
         }
     except Exception as e:
         print(f"Gün ışığı hesaplama hatası: {e}")
+        api_fallback('daylight', 'error')
         # Default değer
         return {
             'daylight_hours': 12,
@@ -199,6 +301,7 @@ def get_daylight_hours(city: str = "Istanbul") -> Optional[Dict]:
         }
 
 
+@timed_stage('moon_phase')
 def get_moon_phase() -> Dict:
     """
     Ay fazını hesapla (ephem kütüphanesi)
@@ -245,6 +348,7 @@ def get_moon_phase() -> Dict:
         }
     except Exception as e:
         print(f"Ay fazı hesaplama hatası: {e}")
+        api_fallback('moon_phase', 'error')
         return {
             'illumination': 50,
             'phase_name': 'unknown',
@@ -252,44 +356,131 @@ def get_moon_phase() -> Dict:
         }
 
 
-def calculate_environmental_score(city: str = "Istanbul") -> Dict:
+def combine_environmental_scores(
+    city: str,
+    weather: Optional[Dict],
+    air_quality: Optional[Dict],
+    daylight: Optional[Dict],
+    moon: Optional[Dict]
+) -> Dict:
+    """
+    Kaynak skorlarını ağırlıklı ortalamayla birleştir
+    
+    Verisi alınamayan (None) kaynak için FALLBACK_SCORE kullanılır.
+    
+    Returns:
+        dict: Çevresel skor, detaylar ve degraded_sources (varsayılan skor kullanılan kaynaklar)
+    """
+    # Skorları birleştir (ağırlıklı ortalama)
+    weather_score = weather['score'] if weather else FALLBACK_SCORE
+    air_score = air_quality['score'] if air_quality else FALLBACK_SCORE
+    daylight_score = daylight['score'] if daylight else FALLBACK_SCORE
+    moon_score = moon['score'] if moon else FALLBACK_SCORE
+    
+    environmental_score = (
+        weather_score * 0.3 +
+        air_score * 0.3 +
+        daylight_score * 0.2 +
+        moon_score * 0.2
+    )
+    
+    return {
+        'environmental_score': round(environmental_score, 2),
+        'weather': weather,
+        'air_quality': air_quality,
+        'daylight': daylight,
+        'moon': moon,
+        'city': city,
+        'degraded_sources': [
+            source for source, value in zip(ENVIRONMENT_SOURCES, (weather, air_quality, daylight, moon))
+            if value is None
+        ]
+    }
+
+
+def _source_fetchers(city: str) -> Dict[str, Callable[[], Optional[Dict]]]:
+    return {
+        'weather': lambda: get_weather_data(city),
+        'air_quality': lambda: get_air_quality(city),
+        'daylight': lambda: get_daylight_hours(city),
+        'moon': get_moon_phase
+    }
+
+
+def _lookup_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=LOOKUP_WORKERS, thread_name_prefix='env-lookup')
+    return _executor
+
+
+def _submit_lookup(source: str, city: str, fetch: Callable[[], Optional[Dict]]) -> Optional[Future]:
+    """
+    Kaynağın çağrısını başlat veya aynı anahtar için sürmekte olana katıl
+
+    Returns:
+        Future; LOOKUP_MAX_PENDING dolmuşsa None (çağıran varsayılan skora düşer)
+    """
+    key = (source, cache_key(source, city))
+    with _inflight_lock:
+        future = _inflight.get(key)
+        if future is not None:
+            ENV_LOOKUP_SHARED.labels(source).inc()
+            return future
+        if len(_inflight) >= LOOKUP_MAX_PENDING:
+            return None
+        future = _inflight[key] = _lookup_executor().submit(cached, source, city, fetch)
+
+    def release(done: Future):
+        with _inflight_lock:
+            if _inflight.get(key) is done:
+                del _inflight[key]
+
+    future.add_done_callback(release)
+    return future
+
+
+@timed_stage('environmental_score')
+def calculate_environmental_score(city: str = "Istanbul", deadline: Optional[float] = None) -> Dict:
     """
     Tüm çevresel faktörleri birleştirerek genel skor hesapla
     
+    Önbellekte olmayan kaynaklar thread havuzunda eşzamanlı çekilir; toplam
+    bekleme en kötü durumda kaynak sürelerinin toplamı değil, deadline'dır.
+    Süreyi kaçıran çağrı arka planda tamamlanır ve sonucu önbelleğe yazılır.
+    Aynı şehir ve kaynak için süren çağrı varsa yenisi başlatılmaz, o beklenir;
+    süren çağrı sayısı LOOKUP_MAX_PENDING'e ulaşmışsa kaynak varsayılan skora düşer.
+    
     Args:
         city: Şehir adı
+        deadline: Toplam bekleme süresi (saniye; None ise LOOKUP_DEADLINE)
     
     Returns:
-        dict: Çevresel skor ve detaylar
+        dict: Çevresel skor, detaylar ve degraded_sources
     """
     try:
-        # API'lerden veri çek
-        weather = get_weather_data(city)
-        air_quality = get_air_quality(city)
-        daylight = get_daylight_hours(city)
-        moon = get_moon_phase()
+        values = {source: lookup(source, city) for source in ENVIRONMENT_SOURCES}
+        missing = [source for source, value in values.items() if value is None]
+        if missing:
+            fetchers = _source_fetchers(city)
+            futures = {}
+            for source in missing:
+                future = _submit_lookup(source, city, fetchers[source])
+                if future is None:
+                    api_fallback(FALLBACK_LABELS.get(source, source), 'overloaded')
+                else:
+                    futures[source] = future
+            done, _ = wait(futures.values(), timeout=LOOKUP_DEADLINE if deadline is None else deadline)
+            for source, future in futures.items():
+                if future not in done:
+                    api_fallback(FALLBACK_LABELS.get(source, source), 'deadline')
+                elif future.exception() is None:
+                    values[source] = future.result()
         
-        # Skorları birleştir (ağırlıklı ortalama)
-        weather_score = weather['score'] if weather else 70
-        air_score = air_quality['score'] if air_quality else 70
-        daylight_score = daylight['score'] if daylight else 70
-        moon_score = moon['score']
-        
-        environmental_score = (
-            weather_score * 0.3 +
-            air_score * 0.3 +
-            daylight_score * 0.2 +
-            moon_score * 0.2
+        return combine_environmental_scores(
+            city, values['weather'], values['air_quality'], values['daylight'], values['moon']
         )
-        
-        return {
-            'environmental_score': round(environmental_score, 2),
-            'weather': weather,
-            'air_quality': air_quality,
-            'daylight': daylight,
-            'moon': moon,
-            'city': city
-        }
     except Exception as e:
         print(f"Çevresel skor hesaplama hatası: {e}")
         # Hata durumunda ortalama değer dön
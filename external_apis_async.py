@@ -0,0 +1,173 @@
+"""
+Harici API Entegrasyonları (async)
+ASGI modunda çevresel veriler httpx.AsyncClient ile eşzamanlı çekilir;
+skorlama external_apis ile aynıdır. ephem hesapları (gün ışığı, ay fazı)
+CPU işi olduğundan executor'da çalışır.
+Python 3.9 Uyumlu
+"""
+
+from concurrent.futures import Executor
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import os
+
+import httpx
+
+import environment_cache
+from external_apis import (
+    ENVIRONMENT_SOURCES, FALLBACK_LABELS, LOOKUP_DEADLINE, LOOKUP_MAX_PENDING, air_quality_request,
+    combine_environmental_scores, default_air_quality, default_weather, get_daylight_hours, get_moon_phase,
+    score_air_quality, score_weather, weather_request
+)
+from http_sessions import TIMEOUTS
+from metrics import ENV_LOOKUP_SHARED, api_fallback, stage
+
+
+# Varsayılan istek zaman aşımı; sağlayıcı çağrıları http_sessions.TIMEOUTS'u kullanır
+API_TIMEOUT = 5.0
+
+# (kaynak, önbellek anahtarı) → süren çağrı görevi. Aynı şehir için eşzamanlı ıskalar
+# tek görevi bekler; süreyi kaçıran görevler de tamamlanana kadar burada tutulur.
+_inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+
+
+def _timeout(provider: str) -> httpx.Timeout:
+    """Senkron oturumlarla aynı sağlayıcı başına (bağlantı, okuma) zaman aşımı"""
+    connect, read = TIMEOUTS[provider]
+    return httpx.Timeout(read, connect=connect)
+
+
+def create_client(max_connections: int = 500) -> httpx.AsyncClient:
+    """Süreç başına paylaşılan async HTTP istemcisi (bağlantı havuzlu)"""
+    return httpx.AsyncClient(
+        timeout=API_TIMEOUT,
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=100)
+    )
+
+
+async def fetch_weather(client: httpx.AsyncClient, city: str) -> Optional[Dict]:
+    """OpenWeatherMap'ten hava durumu (bkz. external_apis.get_weather_data)"""
+    api_key = os.getenv('OPENWEATHER_API_KEY')
+    if not api_key:
+        api_fallback('weather', 'no_key')
+        return default_weather()
+
+    try:
+        with stage('external_weather'):
+            response = await client.get(**weather_request(city, api_key), timeout=_timeout('weather'))
+        if response.status_code == 200:
+            return score_weather(response.json())
+        api_fallback('weather', 'status')
+        return None
+    except Exception as e:
+        print(f"Hava durumu API hatası: {e}")
+        api_fallback('weather', 'error')
+        return None
+
+
+async def fetch_air_quality(client: httpx.AsyncClient, city: str) -> Optional[Dict]:
+    """AirVisual'dan hava kalitesi (bkz. external_apis.get_air_quality)"""
+    api_key = os.getenv('AIRVISUAL_API_KEY')
+    if not api_key:
+        api_fallback('air_quality', 'no_key')
+        return default_air_quality()
+
+    try:
+        with stage('external_air_quality'):
+            response = await client.get(**air_quality_request(city, api_key), timeout=_timeout('air_quality'))
+        if response.status_code == 200:
+            return score_air_quality(response.json())
+        api_fallback('air_quality', 'status')
+        return None
+    except Exception as e:
+        print(f"Hava kalitesi API hatası: {e}")
+        api_fallback('air_quality', 'error')
+        return None
+
+
+async def _fetch_and_store(source: str, city: str, fetch: Callable[[], Awaitable[Optional[Dict]]]) -> Optional[Dict]:
+    value = await fetch()
+    environment_cache.store(source, city, value)
+    return value
+
+
+def _start_lookup(
+    loop: asyncio.AbstractEventLoop, source: str, city: str, fetch: Callable[[], Awaitable[Optional[Dict]]]
+) -> Optional[asyncio.Task]:
+    """Kaynağın görevini başlat veya sürene katıl (LOOKUP_MAX_PENDING doluysa None)"""
+    key = (source, environment_cache.cache_key(source, city))
+    task = _inflight.get(key)
+    if task is not None and task.get_loop() is loop:
+        ENV_LOOKUP_SHARED.labels(source).inc()
+        return task
+    if len(_inflight) >= LOOKUP_MAX_PENDING:
+        return None
+    task = _inflight[key] = loop.create_task(_fetch_and_store(source, city, fetch))
+
+    def release(done: asyncio.Task):
+        if _inflight.get(key) is done:
+            del _inflight[key]
+
+    task.add_done_callback(release)
+    return task
+
+
+async def calculate_environmental_score_async(
+    client: httpx.AsyncClient,
+    city: str = "Istanbul",
+    executor: Optional[Executor] = None,
+    deadline: Optional[float] = None
+) -> Dict:
+    """
+    Tüm çevresel faktörleri eşzamanlı çekip genel skoru hesapla
+
+    Süreyi kaçıran kaynak için varsayılan skor kullanılır; çağrı arka planda
+    tamamlanır ve sonucu önbelleğe yazılır. Aynı şehir ve kaynak için süren
+    görev varsa o beklenir (bkz. external_apis.calculate_environmental_score).
+
+    Args:
+        client: paylaşılan httpx.AsyncClient
+        city: Şehir adı
+        executor: ephem hesapları için executor (None ise varsayılan)
+        deadline: Toplam bekleme süresi (saniye; None ise LOOKUP_DEADLINE)
+
+    Returns:
+        dict: external_apis.calculate_environmental_score ile aynı format
+    """
+    loop = asyncio.get_running_loop()
+    fetchers = {
+        'weather': lambda: fetch_weather(client, city),
+        'air_quality': lambda: fetch_air_quality(client, city),
+        'daylight': lambda: loop.run_in_executor(executor, get_daylight_hours, city),
+        'moon': lambda: loop.run_in_executor(executor, get_moon_phase)
+    }
+    try:
+        with stage('environmental_score'):
+            # Şehir bazlı önbellekte olmayan kaynaklar eşzamanlı çekilir
+            values = {source: environment_cache.lookup(source, city) for source in ENVIRONMENT_SOURCES}
+            tasks = {}
+            for source, value in values.items():
+                if value is not None:
+                    continue
+                task = _start_lookup(loop, source, city, fetchers[source])
+                if task is None:
+                    api_fallback(FALLBACK_LABELS.get(source, source), 'overloaded')
+                else:
+                    tasks[source] = task
+            if tasks:
+                await asyncio.wait(tasks.values(), timeout=LOOKUP_DEADLINE if deadline is None else deadline)
+            for source, task in tasks.items():
+                if not task.done():
+                    api_fallback(FALLBACK_LABELS.get(source, source), 'deadline')
+                elif task.exception() is None:
+                    values[source] = task.result()
+        return combine_environmental_scores(
+            city, values['weather'], values['air_quality'], values['daylight'], values['moon']
+        )
+    except Exception as e:
+        print(f"Çevresel skor hesaplama hatası: {e}")
+        return {
+            'environmental_score': 50,
+            'error': str(e),
+            'city': city
+        }
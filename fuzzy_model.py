@@ -12,6 +12,8 @@ import matplotlib.pyplot as plt
 import io
 import base64
 
+from metrics import stage, timed_stage
+
 
 # Üyelik fonksiyonları
 
@@ -47,6 +49,21 @@ def trimf(x: float, params: List[float]) -> float:
         return (c - x) / (c - b)
 
 
+def trapmf_array(x: np.ndarray, params: List[float]) -> np.ndarray:
+    """
+    trapmf'nin vektörel hali (aynı kenar durumları, aynı sonuçlar)
+    params = [a, b, c, d] where a <= b <= c <= d
+    """
+    a, b, c, d = params
+    x = np.asarray(x, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.select(
+            [(x <= a) | (x >= d), (b <= x) & (x <= c), (a < x) & (x < b)],
+            [0.0, 1.0, (x - a) / (b - a)],
+            default=(d - x) / (d - c)
+        )
+
+
 # Girdi değişkenleri tanımları (README'ye göre)
 
 # sleep_hours (0-12): low(0-6), medium(5-9), high(8-12)
@@ -86,6 +103,33 @@ OUTPUT_QUALITY_POOR = [0, 0, 25, 40]      # trapmf
 OUTPUT_QUALITY_AVERAGE = [30, 45, 55, 70] # trapmf
 OUTPUT_QUALITY_GOOD = [60, 75, 100, 100]  # trapmf
 
+# Toplu (vektörel) analiz için değişken → küme parametreleri
+INPUT_SETS = {
+    'sleep': {'low': SLEEP_LOW, 'medium': SLEEP_MEDIUM, 'high': SLEEP_HIGH},
+    'caffeine': {'low': CAFFEINE_LOW, 'medium': CAFFEINE_MEDIUM, 'high': CAFFEINE_HIGH},
+    'exercise': {'low': EXERCISE_LOW, 'medium': EXERCISE_MEDIUM, 'high': EXERCISE_HIGH},
+    'work': {'low': WORK_LOW, 'medium': WORK_MEDIUM, 'high': WORK_HIGH},
+    'environmental': {'bad': ENV_BAD, 'medium': ENV_MEDIUM, 'good': ENV_GOOD}
+}
+OUTPUT_SETS = {
+    'stress': {'low': OUTPUT_STRESS_LOW, 'medium': OUTPUT_STRESS_MEDIUM, 'high': OUTPUT_STRESS_HIGH},
+    'quality': {'poor': OUTPUT_QUALITY_POOR, 'average': OUTPUT_QUALITY_AVERAGE, 'good': OUTPUT_QUALITY_GOOD}
+}
+
+# Defuzzification örnekleme aralığı ve çıktı üyelik değerleri (bir kez hesaplanır)
+DEFUZZ_X = np.linspace(0, 100, 1000)
+_output_mf_table: Dict[str, Dict[str, np.ndarray]] = {}
+
+
+def get_output_mf_table() -> Dict[str, Dict[str, np.ndarray]]:
+    """Çıktı kümelerinin DEFUZZ_X üzerindeki üyelik değerlerini döndür (önbellekli)"""
+    if not _output_mf_table:
+        for output_type, sets in OUTPUT_SETS.items():
+            _output_mf_table[output_type] = {
+                level: trapmf_array(DEFUZZ_X, params) for level, params in sets.items()
+            }
+    return _output_mf_table
+
 
 # 10 Fuzzy Kurallar (README'ye göre)
 RULE_DESCRIPTIONS = {
@@ -101,6 +145,25 @@ RULE_DESCRIPTIONS = {
     'R10': 'IF (environmental_score = good) THEN stress = low'
 }
 
+# Kural bit sırası (veritabanında active_rules_mask: R1 → bit 0, R10 → bit 9)
+RULE_IDS = list(RULE_DESCRIPTIONS.keys())
+RULE_BITS = {rule_id: index for index, rule_id in enumerate(RULE_IDS)}
+
+
+def rules_to_mask(active_rules: List[str]) -> int:
+    """Aktif kural listesini tamsayı bit maskesine çevir"""
+    mask = 0
+    for rule_id in active_rules:
+        mask |= 1 << RULE_BITS[rule_id]
+    return mask
+
+
+def mask_to_rules(mask: Optional[int]) -> List[str]:
+    """Bit maskesini kural sırasına göre aktif kural listesine çevir"""
+    if not mask:
+        return []
+    return [rule_id for rule_id, bit in RULE_BITS.items() if mask >> bit & 1]
+
 
 def fuzzify(value: float, variable_name: str) -> Dict[str, float]:
     """
@@ -237,31 +300,15 @@ def defuzzify(rule_outputs: Dict[str, float], output_type: str = 'stress') -> fl
     Returns:
         float: Defuzzified değer (0-100)
     """
-    # 0-100 aralığında örnekle
-    x_range = np.linspace(0, 100, 1000)
+    # 0-100 aralığında örnekle (üyelik değerleri önceden hesaplanmış tablodan)
+    x_range = DEFUZZ_X
     aggregated = np.zeros_like(x_range)
+    mf_table = get_output_mf_table()['stress' if output_type == 'stress' else 'quality']
     
     # Output membership fonksiyonlarını birleştir
     for level, activation in rule_outputs.items():
         if activation > 0:
-            # Membership fonksiyonunu seç
-            if output_type == 'stress':
-                if level == 'low':
-                    params = OUTPUT_STRESS_LOW
-                elif level == 'medium':
-                    params = OUTPUT_STRESS_MEDIUM
-                else:  # high
-                    params = OUTPUT_STRESS_HIGH
-            else:  # quality
-                if level == 'poor':
-                    params = OUTPUT_QUALITY_POOR
-                elif level == 'average':
-                    params = OUTPUT_QUALITY_AVERAGE
-                else:  # good
-                    params = OUTPUT_QUALITY_GOOD
-            
-            # Her x için membership değerini hesapla
-            mf_values = np.array([trapmf(x, params) for x in x_range])
+            mf_values = mf_table[level]
             
             # Mamdani implication: minimum
             clipped = np.minimum(mf_values, activation)
@@ -299,20 +346,23 @@ def analyze(
     """
     try:
         # Fuzzification
-        memberships = {
-            'sleep': fuzzify(sleep_hours, 'sleep'),
-            'caffeine': fuzzify(caffeine_mg, 'caffeine'),
-            'exercise': fuzzify(exercise_min, 'exercise'),
-            'work': fuzzify(work_stress, 'work'),
-            'environmental': fuzzify(environmental_score, 'environmental')
-        }
+        with stage('fuzzify'):
+            memberships = {
+                'sleep': fuzzify(sleep_hours, 'sleep'),
+                'caffeine': fuzzify(caffeine_mg, 'caffeine'),
+                'exercise': fuzzify(exercise_min, 'exercise'),
+                'work': fuzzify(work_stress, 'work'),
+                'environmental': fuzzify(environmental_score, 'environmental')
+            }
         
         # Kuralları uygula
-        stress_outputs, quality_outputs, active_rules = apply_rules(memberships)
+        with stage('apply_rules'):
+            stress_outputs, quality_outputs, active_rules = apply_rules(memberships)
         
         # Defuzzification
-        stress_result = defuzzify(stress_outputs, 'stress')
-        quality_result = defuzzify(quality_outputs, 'quality')
+        with stage('defuzzify'):
+            stress_result = defuzzify(stress_outputs, 'stress')
+            quality_result = defuzzify(quality_outputs, 'quality')
         
         return {
             'stress': round(stress_result, 2),
@@ -336,6 +386,108 @@ def analyze(
         }
 
 
+@timed_stage('analyze_batch')
+def analyze_batch(
+    sleep_hours,
+    caffeine_mg,
+    exercise_min,
+    work_stress,
+    environmental_score=None
+) -> List[Dict]:
+    """
+    Birden çok kaydı NumPy ile tek seferde analiz et (toplu içe aktarma için)
+    
+    Kural tabanı ve defuzzification analyze() ile birebir aynıdır; her kayıt
+    için analyze() ile aynı formatta sonuç döner.
+    
+    Args:
+        sleep_hours, caffeine_mg, exercise_min, work_stress: sayı dizileri (eşit uzunlukta)
+        environmental_score: sayı dizisi, opsiyonel (varsayılan 50)
+    
+    Returns:
+        list of dict: Kayıt başına analiz sonuçları
+    """
+    values = {
+        'sleep': np.asarray(sleep_hours, dtype=float),
+        'caffeine': np.asarray(caffeine_mg, dtype=float),
+        'exercise': np.asarray(exercise_min, dtype=float),
+        'work': np.asarray(work_stress, dtype=float)
+    }
+    n = len(values['sleep'])
+    if environmental_score is None:
+        values['environmental'] = np.full(n, 50.0)
+    else:
+        values['environmental'] = np.asarray(environmental_score, dtype=float)
+    
+    if n == 0:
+        return []
+    
+    # Fuzzification: {değişken: {küme: (n,) dizi}}
+    m = {
+        name: {level: trapmf_array(values[name], params) for level, params in sets.items()}
+        for name, sets in INPUT_SETS.items()
+    }
+    sleep, caffeine, exercise, work, env = m['sleep'], m['caffeine'], m['exercise'], m['work'], m['environmental']
+    
+    # Kural aktivasyonları (apply_rules ile aynı sırada)
+    activations = np.stack([
+        np.maximum(sleep['low'], caffeine['high']),                                  # R1
+        np.minimum(sleep['low'], np.maximum(exercise['low'], work['high'])),         # R2
+        np.minimum(np.minimum(sleep['high'], exercise['high']), work['low']),        # R3
+        np.maximum(np.maximum(sleep['low'], caffeine['high']), work['high']),        # R4
+        np.minimum(sleep['medium'], exercise['medium']),                             # R5
+        np.minimum(np.minimum(sleep['high'], exercise['high']), caffeine['low']),    # R6
+        np.minimum(work['high'], sleep['medium']),                                   # R7
+        env['bad'],                                                                  # R8
+        env['bad'],                                                                  # R9
+        env['good']                                                                  # R10
+    ])
+    fired = activations > 0.01
+    act = np.where(fired, activations, 0.0)
+    
+    stress_outputs = {
+        'low': np.maximum(act[2], act[9]),
+        'medium': act[6],
+        'high': np.maximum(np.maximum(act[0], act[1]), act[7])
+    }
+    quality_outputs = {
+        'poor': np.maximum(act[3], act[8]),
+        'average': act[4],
+        'good': act[5]
+    }
+    
+    stress = _defuzzify_batch(stress_outputs, 'stress')
+    quality = _defuzzify_batch(quality_outputs, 'quality')
+    
+    results = []
+    for i in range(n):
+        results.append({
+            'stress': round(float(stress[i]), 2),
+            'sleep_quality': round(float(quality[i]), 2),
+            'active_rules': [rule_id for rule_id, bit in RULE_BITS.items() if fired[bit, i]],
+            'memberships': {
+                name: {level: float(arr[i]) for level, arr in sets.items()}
+                for name, sets in m.items()
+            }
+        })
+    return results
+
+
+def _defuzzify_batch(rule_outputs: Dict[str, np.ndarray], output_type: str) -> np.ndarray:
+    """defuzzify()'nin satır bazlı vektörel hali"""
+    mf_table = get_output_mf_table()[output_type]
+    n = len(next(iter(rule_outputs.values())))
+    aggregated = np.zeros((n, len(DEFUZZ_X)))
+    
+    for level, activation in rule_outputs.items():
+        np.maximum(aggregated, np.minimum(mf_table[level][None, :], activation[:, None]), out=aggregated)
+    
+    total = aggregated.sum(axis=1)
+    weighted = (aggregated * DEFUZZ_X).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(total == 0, 50.0, weighted / total)
+
+
 def plot_membership_functions() -> str:
     """
     Üyelik fonksiyonlarını görselleştir
@@ -0,0 +1,119 @@
+"""
+HTTP Önbellekleme ve Koşullu İstekler
+Nadiren değişen sayfalar (kurallar, üyelik grafikleri, doğrulama raporu,
+dokümantasyon, dashboard) için ETag / Last-Modified / Cache-Control başlıkları,
+If-None-Match / If-Modified-Since ile 304 yanıtları ve büyük gövdelerin
+önceden sıkıştırılmış gzip sürümleri.
+Python 3.9 Uyumlu
+"""
+
+from typing import Callable, Sequence, Tuple
+from datetime import datetime, timezone
+from functools import wraps
+import gzip
+import hashlib
+import os
+
+from flask import Response, make_response, request
+
+from cache import TTLCache
+
+
+# Bu boyuttan büyük metin gövdeleri gzip'li olarak da saklanır
+GZIP_MIN_SIZE = 1024
+
+# Gövdeler sürüm (kaynak dosyaların mtime/boyutu) anahtarıyla tutulur; eski sürümler LRU ile düşer
+_responses = TTLCache('http', maxsize=64, ttl=24 * 3600)
+
+
+class _CachedBody:
+    """Bir yanıtın gövdesi, gzip sürümü ve doğrulayıcıları"""
+
+    def __init__(self, body: bytes, mimetype: str, last_modified: datetime):
+        self.body = body
+        self.mimetype = mimetype
+        self.last_modified = last_modified
+        self.etag = hashlib.sha1(body).hexdigest()[:20]
+        self.gzipped = None
+        if len(body) >= GZIP_MIN_SIZE and (mimetype.startswith('text/') or mimetype.endswith('json')):
+            self.gzipped = gzip.compress(body, compresslevel=6)
+
+
+def _source_version(paths: Sequence[str]) -> Tuple[Tuple, datetime]:
+    """Kaynak dosyaların sürümü (mtime, boyut) ve en son değişiklik zamanı"""
+    version = []
+    latest = 0.0
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            version.append((path, None))
+            continue
+        version.append((path, stat.st_mtime_ns, stat.st_size))
+        latest = max(latest, stat.st_mtime)
+    # HTTP tarihleri saniye hassasiyetindedir
+    return tuple(version), datetime.fromtimestamp(int(latest), tz=timezone.utc)
+
+
+def _not_modified(entry: _CachedBody) -> bool:
+    if request.if_none_match:
+        # Proxy'ler gzip'li gövdeye zayıf ETag verebilir; iki temsil de aynı içeriktir
+        return (
+            request.if_none_match.contains_weak(entry.etag)
+            or request.if_none_match.contains_weak(f'{entry.etag}-gzip')
+        )
+    if request.if_modified_since:
+        return entry.last_modified <= request.if_modified_since
+    return False
+
+
+def http_cached(max_age: int, sources: Sequence[str], private: bool = False) -> Callable:
+    """
+    View fonksiyonunu HTTP önbellekleme ile sar
+
+    Gövde yalnızca kaynak dosyalardan biri değiştiğinde yeniden üretilir.
+    200 dışındaki yanıtlar önbelleğe alınmaz.
+
+    Args:
+        max_age: int - Cache-Control max-age (saniye)
+        sources: yanıtı belirleyen dosyalar (model, şablon, rapor...)
+        private: bool - paylaşılan önbelleklerde (CDN/proxy) tutulmasın
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            version, last_modified = _source_version(sources)
+            key = (view.__name__, version)
+            entry = _responses.get(key)
+
+            if entry is None:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    response.headers['Cache-Control'] = 'no-cache'
+                    return response
+                entry = _CachedBody(response.get_data(), response.mimetype, last_modified)
+                _responses.set(key, entry)
+
+            use_gzip = entry.gzipped is not None and 'gzip' in request.headers.get('Accept-Encoding', '')
+            etag = f'{entry.etag}-gzip' if use_gzip else entry.etag
+
+            if _not_modified(entry):
+                response = Response(status=304)
+            else:
+                response = Response(entry.gzipped if use_gzip else entry.body, mimetype=entry.mimetype)
+                if use_gzip:
+                    response.headers['Content-Encoding'] = 'gzip'
+
+            response.set_etag(etag)
+            response.last_modified = entry.last_modified
+            response.headers['Cache-Control'] = f"{'private' if private else 'public'}, max-age={max_age}"
+            if entry.gzipped is not None:
+                response.headers['Vary'] = 'Accept-Encoding'
+            return response
+        return wrapper
+    return decorator
+
+
+def source_path(*parts: str) -> str:
+    """Uygulama klasörüne göre dosya yolu"""
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), *parts)
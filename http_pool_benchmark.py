@@ -0,0 +1,132 @@
+"""
+Harici API Bağlantı Havuzu Karşılaştırması (çıplak requests.get vs havuzlu oturum)
+Yerel sahte hava durumu / hava kalitesi sunucusuna aynı istekleri iki şekilde
+gönderir ve gecikme, throughput ve hata oranını karşılaştırır:
+
+- bare: her çağrıda requests.get (yeni TCP bağlantısı, yeniden deneme yok)
+- pooled: http_sessions oturumu (keep-alive havuzu, jitter'lı yeniden deneme)
+
+--error-rate ile sahte sunucu istekleri rastgele 503 ile yanıtlar; havuzlu
+oturumun yeniden denemeleri bu hataların çoğunu istemciden gizler.
+(Yerel sahte sunucu düz HTTP'dir; gerçek sağlayıcılarda her yeni bağlantıya
+bir de TLS el sıkışması eklenir, yani kazanç burada ölçülenden büyüktür.)
+Python 3.9 Uyumlu
+
+Kullanım:
+    python http_pool_benchmark.py --requests 2000 --concurrency 8
+    python http_pool_benchmark.py --error-rate 0.1 --json
+"""
+
+from typing import Callable, Dict, List, Optional
+import argparse
+import itertools
+import json
+import sys
+import threading
+import time
+
+import requests
+
+from env_load_test import _free_port, start_stub_server
+from http_sessions import POOL_SIZE, TIMEOUTS, create_session
+
+
+MODES = ('bare', 'pooled')
+PROVIDER_PATHS = (('weather', '/weather'), ('air_quality', '/airvisual'))
+
+
+def run_mode(get: Callable, base_url: str, total: int, concurrency: int) -> Dict:
+    """total isteği concurrency thread ile gönder; gecikme (ms), throughput ve hata oranı"""
+    counter = itertools.count()
+    lock = threading.Lock()
+    latencies: List[float] = []
+    errors = [0]
+
+    def worker():
+        local_latencies, local_errors = [], 0
+        while True:
+            index = next(counter)
+            if index >= total:
+                break
+            provider, path = PROVIDER_PATHS[index % len(PROVIDER_PATHS)]
+            started = time.perf_counter()
+            try:
+                response = get(f'{base_url}{path}', params={'q': 'Istanbul'}, timeout=TIMEOUTS[provider])
+                if response.status_code != 200:
+                    local_errors += 1
+            except requests.RequestException:
+                local_errors += 1
+            local_latencies.append((time.perf_counter() - started) * 1000)
+        with lock:
+            latencies.extend(local_latencies)
+            errors[0] += local_errors
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+
+    def percentile(p: float) -> float:
+        return round(latencies[min(int(len(latencies) * p / 100), len(latencies) - 1)], 2)
+
+    return {
+        'requests': len(latencies),
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+        'mean_ms': round(sum(latencies) / len(latencies), 2),
+        'p50_ms': percentile(50),
+        'p95_ms': percentile(95),
+        'p99_ms': percentile(99),
+        'error_rate': round(errors[0] / len(latencies), 4)
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Çıplak requests.get vs havuzlu oturum (sahte API)')
+    parser.add_argument('--mode', choices=MODES + ('both',), default='both')
+    parser.add_argument('--requests', type=int, default=2000, help='Mod başına istek sayısı')
+    parser.add_argument('--concurrency', type=int, default=8, help='Eşzamanlı thread sayısı')
+    parser.add_argument('--pool-size', type=int, default=POOL_SIZE, help='Havuzlu oturumun bağlantı sayısı')
+    parser.add_argument('--latency', type=float, default=0.005, help='Sahte API gecikmesi (saniye)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Sahte API 503 olasılığı')
+    parser.add_argument('--json', action='store_true', help='Sonuçları JSON olarak yazdır')
+    args = parser.parse_args(argv)
+
+    port = _free_port()
+    stub = start_stub_server(port, args.latency, args.error_rate)
+    base_url = f'http://127.0.0.1:{port}'
+    session = create_session(pool_size=args.pool_size)
+    getters = {'bare': requests.get, 'pooled': session.get}
+
+    modes = MODES if args.mode == 'both' else (args.mode,)
+    results = []
+    try:
+        for mode in modes:
+            if not args.json:
+                print(f"🚀 {mode}: {args.requests} istek, {args.concurrency} thread, "
+                      f"gecikme {args.latency * 1000:g} ms, hata oranı {args.error_rate:.0%}")
+            result = dict(mode=mode, **run_mode(getters[mode], base_url, args.requests, args.concurrency))
+            results.append(result)
+            if not args.json:
+                print(f"   {result['throughput_rps']:>8} istek/sn  ortalama {result['mean_ms']} ms  "
+                      f"p50 {result['p50_ms']} ms  p95 {result['p95_ms']} ms  p99 {result['p99_ms']} ms  "
+                      f"hata {result['error_rate']:.2%}")
+    finally:
+        session.close()
+        stub.terminate()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    elif len(results) == 2:
+        bare, pooled = results
+        print(f"\n📊 Ortalama gecikme: {bare['mean_ms']} ms → {pooled['mean_ms']} ms, "
+              f"hata oranı: {bare['error_rate']:.2%} → {pooled['error_rate']:.2%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
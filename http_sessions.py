@@ -0,0 +1,103 @@
+"""
+Harici API HTTP Oturumları
+Hava durumu ve hava kalitesi sağlayıcıları için süreç başına paylaşılan,
+bağlantı havuzlu requests.Session'lar. Çıplak requests.get her çağrıda yeni
+TCP (https'te TLS) bağlantısı açar; oturum bağlantıları keep-alive ile
+yeniden kullanır.
+
+- Havuz: sağlayıcı başına EXTERNAL_API_POOL_SIZE bağlantı (çevresel kaynak
+  thread havuzu ENV_LOOKUP_WORKERS ile aynı varsayılan)
+- Yeniden deneme: yalnızca GET; bağlantı hataları ve 429/5xx yanıtlarında
+  en fazla EXTERNAL_API_RETRIES kez, jitter'lı üstel bekleme ile
+- Zaman aşımı: sağlayıcı başına (bağlantı, okuma) saniye
+Python 3.9 Uyumlu
+"""
+
+from typing import Dict, Tuple
+import os
+import random
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+POOL_SIZE = int(os.getenv('EXTERNAL_API_POOL_SIZE', '16'))
+RETRIES = int(os.getenv('EXTERNAL_API_RETRIES', '2'))
+BACKOFF_FACTOR = float(os.getenv('EXTERNAL_API_BACKOFF', '0.2'))
+# Tek beklemenin üst sınırı (saniye); istek zaten ENV_LOOKUP_DEADLINE ile sınırlı
+BACKOFF_MAX = 2.0
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Sağlayıcı başına (bağlantı, okuma) zaman aşımı (saniye)
+TIMEOUTS: Dict[str, Tuple[float, float]] = {
+    'weather': (
+        float(os.getenv('OPENWEATHER_CONNECT_TIMEOUT', '2')),
+        float(os.getenv('OPENWEATHER_READ_TIMEOUT', '5'))
+    ),
+    'air_quality': (
+        float(os.getenv('AIRVISUAL_CONNECT_TIMEOUT', '2')),
+        float(os.getenv('AIRVISUAL_READ_TIMEOUT', '5'))
+    )
+}
+
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+class JitteredRetry(Retry):
+    """
+    Tam jitter'lı üstel bekleme: [0, min(BACKOFF_MAX, backoff_factor * 2^n)] aralığında rastgele
+
+    Aynı anda hata alan worker'ların sağlayıcıya aynı anda geri dönmesini önler
+    (urllib3'ün backoff_jitter / backoff_max parametreleri 2.x'ten önce yok).
+    """
+
+    def get_backoff_time(self) -> float:
+        return random.uniform(0, min(BACKOFF_MAX, super().get_backoff_time()))
+
+
+def _reset_after_fork():
+    # Ebeveynin havuzdaki soketleri çocuk süreçle paylaşılmamalı
+    global _sessions, _sessions_lock
+    _sessions = {}
+    _sessions_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def create_session(pool_size: int = POOL_SIZE, retries: int = RETRIES) -> requests.Session:
+    """Havuzlu ve yeniden denemeli yeni oturum"""
+    retry = JitteredRetry(
+        total=retries,
+        allowed_methods=frozenset(['GET']),
+        status_forcelist=RETRY_STATUSES,
+        backoff_factor=BACKOFF_FACTOR,
+        # Uzun Retry-After havuz thread'ini bekletmesin; bekleme BACKOFF_MAX ile sınırlı
+        respect_retry_after_header=False,
+        # Son deneme de 5xx ise yanıt döner (çağıran varsayılan değere düşer)
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def get_session(provider: str) -> requests.Session:
+    """Sağlayıcının süreç içi paylaşılan oturumu (ilk kullanımda kurulur)"""
+    session = _sessions.get(provider)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(provider)
+            if session is None:
+                session = _sessions[provider] = create_session()
+    return session
+
+
+def provider_get(provider: str, url: str, params: Dict) -> requests.Response:
+    """Sağlayıcının oturumu ve zaman aşımıyla GET"""
+    return get_session(provider).get(url, params=params, timeout=TIMEOUTS[provider])
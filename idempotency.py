@@ -0,0 +1,221 @@
+"""
+Tekrarlanan İstek Bastırma (Idempotency)
+Mobil istemciler dengesiz ağlarda POST isteklerini yeniden dener; her deneme
+çıkarımı tekrar çalıştırıp geçmişe ikinci bir satır ekler. /analyze bunu iki
+yolla engeller:
+
+- Idempotency-Key başlığı: aynı kullanıcı + anahtar IDEMPOTENCY_TTL boyunca
+  ilk yanıtı döndürür. Anahtar farklı bir gövdeyle tekrar kullanılırsa 422.
+- Anahtar yoksa içerik özeti: aynı kullanıcıdan birebir aynı gövde
+  IDEMPOTENCY_DEDUP_WINDOW saniye içinde tekrar gelirse ilk yanıt döner.
+
+Kayıtlar tüm worker'ların paylaştığı SQLite dosyasında (IDEMPOTENCY_DB_PATH)
+tutulur ve IDEMPOTENCY_MAX_ENTRIES ile sınırlıdır. Aynı anahtarlı eşzamanlı
+istekte ikinci istek ilkinin bitmesini bekler, süre dolarsa 409 alır.
+Python 3.9 Uyumlu
+"""
+
+from typing import Dict, Optional
+import hashlib
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from metrics import IDEMPOTENCY_REQUESTS
+
+
+IDEMPOTENCY_DB_PATH = os.getenv('IDEMPOTENCY_DB_PATH', 'data/idempotency.db')
+IDEMPOTENCY_TTL = float(os.getenv('IDEMPOTENCY_TTL', str(24 * 3600)))
+DEDUP_WINDOW = float(os.getenv('IDEMPOTENCY_DEDUP_WINDOW', '60'))
+MAX_ENTRIES = int(os.getenv('IDEMPOTENCY_MAX_ENTRIES', '10000'))
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+# Aynı anahtarlı istek işlenirken bekleme süresi; bundan eski 'pending' kayıt
+# çökmüş bir worker'dan kalmıştır ve devralınır (saniye)
+WAIT_TIMEOUT = float(os.getenv('IDEMPOTENCY_WAIT_TIMEOUT', '5'))
+PENDING_TIMEOUT = 30.0
+POLL_INTERVAL = 0.05
+
+# Süresi dolan ve sınırı aşan kayıtlar her PRUNE_EVERY tamamlamada bir silinir
+PRUNE_EVERY = 100
+
+_completions = itertools.count(1)
+_local = threading.local()
+
+
+class IdempotencyConflict(Exception):
+    """Aynı anahtarlı istek hâlâ işleniyor (409)"""
+
+
+class IdempotencyMismatch(ValueError):
+    """Anahtar farklı bir istek gövdesiyle yeniden kullanıldı (422)"""
+
+
+def _connect() -> sqlite3.Connection:
+    """
+    Thread başına kalıcı bağlantı
+
+    WAL'da son bağlantının kapanışı checkpoint tetikler; istek başına
+    bağlanıp kapatmak her istekte bu maliyeti öder.
+    """
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        return conn
+    os.makedirs(os.path.dirname(IDEMPOTENCY_DB_PATH) or '.', exist_ok=True)
+    # İşlemler BEGIN IMMEDIATE ile elle açılır
+    conn = sqlite3.connect(IDEMPOTENCY_DB_PATH, timeout=10.0, isolation_level=None)
+    conn.execute('PRAGMA journal_mode = WAL')
+    # Kayıt kaybı yalnızca bir tekrarın yeniden işlenmesine yol açar; her commit'te fsync gerekmez
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            key TEXT PRIMARY KEY,
+            fingerprint TEXT NOT NULL,
+            state TEXT NOT NULL,
+            response TEXT,
+            created_at REAL NOT NULL,
+            expires_at REAL NOT NULL
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_idempotency_expires ON idempotency_keys(expires_at)')
+    _local.conn = conn
+    return conn
+
+
+def _reset_after_fork():
+    # Ebeveynin SQLite bağlantısı çocukta kullanılamaz
+    global _local
+    _local = threading.local()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def fingerprint(data: Dict) -> str:
+    """İstek gövdesinin kanonik özeti (anahtar sırasından bağımsız)"""
+    canonical = json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def request_key(user_id: str, header_value: Optional[str], data: Dict) -> Optional[Dict]:
+    """
+    İsteğin tekrar kaydı: başlıktaki anahtar veya içerik özeti
+
+    Returns:
+        dict - key, fingerprint, kind ('key' / 'hash'), ttl; bastırma kapalıysa None
+
+    Raises:
+        ValueError - anahtar boş veya çok uzun
+    """
+    body_hash = fingerprint(data)
+    if header_value is not None:
+        header_value = header_value.strip()
+        if not header_value or len(header_value) > MAX_KEY_LENGTH:
+            raise ValueError(f'{IDEMPOTENCY_HEADER} 1-{MAX_KEY_LENGTH} karakter olmalı')
+        return {'key': f'key:{user_id}:{header_value}', 'fingerprint': body_hash, 'kind': 'key', 'ttl': IDEMPOTENCY_TTL}
+    if DEDUP_WINDOW <= 0:
+        return None
+    return {'key': f'hash:{user_id}:{body_hash}', 'fingerprint': body_hash, 'kind': 'hash', 'ttl': DEDUP_WINDOW}
+
+
+def _claim(conn: sqlite3.Connection, entry: Dict) -> Optional[Dict]:
+    """
+    Anahtarı bu istek için ayır veya saklı yanıtı döndür
+
+    Returns:
+        saklı yanıt (tekrar) veya None (istek işlenmeli)
+
+    Raises:
+        IdempotencyMismatch, IdempotencyConflict (henüz işleniyor; çağıran bekler)
+    """
+    now = time.time()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        row = conn.execute(
+            'SELECT fingerprint, state, response, created_at, expires_at FROM idempotency_keys WHERE key = ?',
+            (entry['key'],)
+        ).fetchone()
+        if row is not None and row[4] > now:
+            stored_fingerprint, state, response, created_at, _ = row
+            if stored_fingerprint != entry['fingerprint']:
+                raise IdempotencyMismatch(f'{IDEMPOTENCY_HEADER} farklı bir istek gövdesiyle kullanılmış')
+            if state == 'done':
+                conn.execute('COMMIT')
+                return json.loads(response)
+            if now - created_at < PENDING_TIMEOUT:
+                raise IdempotencyConflict('Aynı istek hâlâ işleniyor, lütfen tekrar deneyin')
+        conn.execute(
+            'INSERT OR REPLACE INTO idempotency_keys (key, fingerprint, state, response, created_at, expires_at) '
+            'VALUES (?, ?, ?, NULL, ?, ?)',
+            (entry['key'], entry['fingerprint'], 'pending', now, now + entry['ttl'])
+        )
+        conn.execute('COMMIT')
+        return None
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+
+
+def begin(entry: Dict) -> Optional[Dict]:
+    """
+    İsteği başlat: ilk kezse anahtarı ayırır, tekrarsa saklı yanıtı döndürür
+
+    Aynı anahtarlı istek işleniyorsa WAIT_TIMEOUT boyunca bitmesini bekler.
+
+    Returns:
+        saklı yanıt sözlüğü (tekrar) veya None (istek işlenmeli; sonra complete/abandon)
+
+    Raises:
+        IdempotencyMismatch - anahtar farklı gövdeyle kullanılmış
+        IdempotencyConflict - ilk istek süre içinde bitmedi
+    """
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    conn = _connect()
+    while True:
+        try:
+            stored = _claim(conn, entry)
+        except IdempotencyConflict:
+            if time.monotonic() >= deadline:
+                IDEMPOTENCY_REQUESTS.labels(entry['kind'], 'conflict').inc()
+                raise
+            time.sleep(POLL_INTERVAL)
+            continue
+        except IdempotencyMismatch:
+            IDEMPOTENCY_REQUESTS.labels(entry['kind'], 'mismatch').inc()
+            raise
+        IDEMPOTENCY_REQUESTS.labels(entry['kind'], 'new' if stored is None else 'replay').inc()
+        return stored
+
+
+def complete(entry: Dict, response: Dict):
+    """Yanıtı sakla; aynı anahtarlı sonraki istekler bunu alır"""
+    conn = _connect()
+    conn.execute(
+        "UPDATE idempotency_keys SET state = 'done', response = ? WHERE key = ?",
+        (json.dumps(response, ensure_ascii=False), entry['key'])
+    )
+    if next(_completions) % PRUNE_EVERY == 0:
+        _prune(conn)
+
+
+def abandon(entry: Dict):
+    """İstek başarısız: ayrılan anahtarı bırak (sonraki deneme yeniden işlenir)"""
+    _connect().execute("DELETE FROM idempotency_keys WHERE key = ? AND state = 'pending'", (entry['key'],))
+
+
+def _prune(conn: sqlite3.Connection) -> int:
+    """Süresi dolan kayıtları ve MAX_ENTRIES üzerindeki en eski kayıtları sil"""
+    deleted = conn.execute('DELETE FROM idempotency_keys WHERE expires_at <= ?', (time.time(),)).rowcount
+    deleted += conn.execute('''
+        DELETE FROM idempotency_keys WHERE key IN (
+            SELECT key FROM idempotency_keys ORDER BY created_at DESC LIMIT -1 OFFSET ?
+        )
+    ''', (MAX_ENTRIES,)).rowcount
+    return deleted
+
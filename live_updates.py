@@ -0,0 +1,267 @@
+"""
+Canlı Dashboard Güncellemeleri (Server-Sent Events)
+GET /events?user_id=... kullanıcının yeni analizlerini ve güncellenmiş trend
+ortalamalarını text/event-stream olarak iletir. Olaylar süreçler arası olay
+günlüğünden (event_log.py) gelir; hangi worker kaydetmiş olursa olsun tüm
+akışlar görür.
+
+Olaylar:
+    snapshot  - {"history": [...], "trends": {...}}  (ilk bağlantı / kaçırılan olaylar)
+    analysis  - /history kaydı formatında yeni analiz
+    bulk      - toplu yazma özeti: {"user_id", "count", "records": [en yeni kayıtlar]}
+    trends    - /trends yanıtı formatında güncel trend ortalamaları
+
+- Async modda (asgi_app.py) bağlantı açık kalır: süreç başına tek bir
+  yoklama görevi günlüğü okur ve olayları bekleyen bağlantılara dağıtır;
+  boşta bir bağlantı yalnızca bir kuyruk ve bir coroutine tutar.
+- Senkron modda (Flask/Gunicorn) bir worker'ı bağlantı süresince meşgul
+  etmemek için bekleyen olaylar yazılıp yanıt kapatılır; tarayıcının
+  EventSource'u `retry` süresi sonra Last-Event-ID ile yeniden bağlanır.
+Python 3.9 Uyumlu
+"""
+
+from typing import Dict, Iterator, List, Optional, Set
+from urllib.parse import parse_qs
+import asyncio
+import json
+import os
+
+from database import iter_history, iter_trend_data
+from event_log import EVENTS_ENABLED, Event, id_range, read_since
+from metrics import IN_PROGRESS
+
+
+POLL_INTERVAL = float(os.getenv('LIVE_EVENTS_POLL_INTERVAL', '0.5'))
+HEARTBEAT_INTERVAL = float(os.getenv('LIVE_EVENTS_HEARTBEAT', '15'))
+MAX_CONNECTIONS = int(os.getenv('LIVE_EVENTS_MAX_CONNECTIONS', '10000'))
+# Senkron modda tarayıcının yeniden bağlanma aralığı (milisaniye)
+SYNC_RETRY_MS = int(os.getenv('LIVE_EVENTS_SYNC_RETRY_MS', '5000'))
+
+SNAPSHOT_HISTORY_LIMIT = 10
+TREND_DAYS = 7
+
+# Yavaş istemcinin bekleyen olay sınırı; dolarsa bağlantı kapatılır,
+# istemci Last-Event-ID ile yeniden bağlanıp günlükten devam eder
+CLIENT_QUEUE_SIZE = 256
+
+EVENTS_PATH = '/events'
+SSE_HEADERS = {
+    'Content-Type': 'text/event-stream; charset=utf-8',
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no'  # nginx tamponlamasın
+}
+
+
+def format_event(kind: str, data: str, event_id: Optional[int] = None) -> bytes:
+    """Tek SSE olayı (data tek satır JSON)"""
+    head = f'id: {event_id}\n' if event_id is not None else ''
+    return f'{head}event: {kind}\ndata: {data}\n\n'.encode('utf-8')
+
+
+def parse_last_event_id(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+def trends_payload(user_id: str) -> Dict:
+    trends = list(iter_trend_data(user_id, TREND_DAYS))
+    return {'period_days': TREND_DAYS, 'data_points': len(trends), 'trends': trends}
+
+
+def snapshot_event(user_id: str) -> bytes:
+    """Güncel geçmiş + trendler; id günlüğün o anki sonudur (sonrası canlı gelir)"""
+    _, last_id = id_range()
+    payload = {
+        'history': list(iter_history(user_id, SNAPSHOT_HISTORY_LIMIT)),
+        'trends': trends_payload(user_id)
+    }
+    return format_event('snapshot', json.dumps(payload, ensure_ascii=False), last_id)
+
+
+def resume_events(user_id: str, last_event_id: Optional[int]) -> List[bytes]:
+    """
+    Bağlantı açılışında gönderilecek olaylar
+
+    Last-Event-ID yoksa veya o noktadan sonraki olaylar günlükten silinmişse
+    anlık görüntü; aksi halde kaçırılan analizler ve güncel trendler.
+    """
+    first_id, last_id = id_range()
+    missed = last_event_id is None or last_event_id > last_id or (
+        last_event_id < first_id - 1 if first_id else last_event_id < last_id
+    )
+    if missed:
+        return [snapshot_event(user_id)]
+    events = read_since(last_event_id, user_id)
+    frames = [format_event(kind, payload, event_id) for event_id, _, kind, payload in events]
+    if events:
+        frames.append(format_event('trends', json.dumps(trends_payload(user_id), ensure_ascii=False)))
+    return frames
+
+
+def sync_stream(user_id: str, last_event_id: Optional[int]) -> Iterator[bytes]:
+    """Senkron mod: bekleyen olayları yaz ve kapat (tarayıcı retry sonra yeniden bağlanır)"""
+    yield f'retry: {SYNC_RETRY_MS}\n\n'.encode()
+    yield from resume_events(user_id, last_event_id)
+
+
+class _Subscriber:
+    __slots__ = ('queue', 'overflowed')
+
+    def __init__(self):
+        self.queue = asyncio.Queue(CLIENT_QUEUE_SIZE)
+        self.overflowed = False
+
+
+class EventHub:
+    """
+    Süreç içi abone kaydı ve günlük yoklayıcısı (asyncio)
+
+    Günlük her POLL_INTERVAL'da tek sorguyla okunur; trendler olay gelen her
+    kullanıcı için yoklama başına bir kez hesaplanıp tüm bağlantılarına gider.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[_Subscriber]] = {}
+        self._poller: Optional[asyncio.Task] = None
+        self._last_id = 0
+        self.connections = 0
+
+    def subscribe(self, user_id: str) -> _Subscriber:
+        subscriber = _Subscriber()
+        self._subscribers.setdefault(user_id, set()).add(subscriber)
+        self.connections += 1
+        return subscriber
+
+    def unsubscribe(self, user_id: str, subscriber: _Subscriber):
+        subscribers = self._subscribers.get(user_id)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._subscribers[user_id]
+        self.connections -= 1
+
+    async def ensure_polling(self, executor):
+        if self._poller is None or self._poller.done():
+            loop = asyncio.get_running_loop()
+            _, self._last_id = await loop.run_in_executor(executor, id_range)
+            self._poller = loop.create_task(self._poll(executor))
+
+    async def stop(self):
+        if self._poller is not None:
+            self._poller.cancel()
+            self._poller = None
+
+    async def _poll(self, executor):
+        loop = asyncio.get_running_loop()
+        while self._subscribers:
+            await asyncio.sleep(POLL_INTERVAL)
+            try:
+                events: List[Event] = await loop.run_in_executor(executor, read_since, self._last_id)
+            except Exception as e:
+                print(f"Canlı olay günlüğü okunamadı: {e}")
+                continue
+            if not events:
+                continue
+            self._last_id = events[-1][0]
+
+            changed_users = []
+            for event_id, user_id, kind, payload in events:
+                if user_id in self._subscribers:
+                    self._broadcast(user_id, event_id, format_event(kind, payload, event_id))
+                    if user_id not in changed_users:
+                        changed_users.append(user_id)
+
+            for user_id in changed_users:
+                trends = await loop.run_in_executor(executor, trends_payload, user_id)
+                self._broadcast(user_id, None, format_event('trends', json.dumps(trends, ensure_ascii=False)))
+
+    def _broadcast(self, user_id: str, event_id: Optional[int], frame: bytes):
+        for subscriber in list(self._subscribers.get(user_id, ())):
+            try:
+                subscriber.queue.put_nowait((event_id, frame))
+            except asyncio.QueueFull:
+                subscriber.overflowed = True
+
+    async def stream(self, scope, receive, send, executor):
+        """Tek SSE bağlantısı (ASGI)"""
+        query = {key: values[-1] for key, values in parse_qs(scope.get('query_string', b'').decode()).items()}
+        user_id = query.get('user_id') or 'anonymous'
+        headers = dict(scope.get('headers') or [])
+        last_event_id = parse_last_event_id(headers.get(b'last-event-id', b'').decode() or query.get('last_event_id'))
+
+        if not EVENTS_ENABLED or self.connections >= MAX_CONNECTIONS:
+            await _send_unavailable(send)
+            return
+
+        # Abonelik açılış olaylarından önce: arada gelen olay kaçmaz (id ile tekilleştirilir)
+        subscriber = self.subscribe(user_id)
+        IN_PROGRESS.labels(EVENTS_PATH).inc()
+        disconnect = asyncio.ensure_future(_wait_disconnect(receive))
+        try:
+            await self.ensure_polling(executor)
+            await send({
+                'type': 'http.response.start',
+                'status': 200,
+                'headers': [(k.lower().encode(), v.encode()) for k, v in SSE_HEADERS.items()]
+            })
+            loop = asyncio.get_running_loop()
+            frames = await loop.run_in_executor(executor, resume_events, user_id, last_event_id)
+            sent_id = last_event_id or 0
+            for frame in frames:
+                await send({'type': 'http.response.body', 'body': frame, 'more_body': True})
+            sent_id = max(sent_id, _frame_id(frames))
+
+            while not disconnect.done():
+                get = asyncio.ensure_future(subscriber.queue.get())
+                done, _ = await asyncio.wait({get, disconnect}, timeout=HEARTBEAT_INTERVAL,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if get not in done:
+                    get.cancel()
+                    if disconnect.done():
+                        break
+                    await send({'type': 'http.response.body', 'body': b': keepalive\n\n', 'more_body': True})
+                    continue
+                if subscriber.overflowed:
+                    break
+                event_id, frame = get.result()
+                if event_id is not None:
+                    if event_id <= sent_id:
+                        continue
+                    sent_id = event_id
+                await send({'type': 'http.response.body', 'body': frame, 'more_body': True})
+            if not disconnect.done():
+                await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        except OSError:
+            pass  # istemci bağlantıyı kapattı
+        finally:
+            disconnect.cancel()
+            self.unsubscribe(user_id, subscriber)
+            IN_PROGRESS.labels(EVENTS_PATH).dec()
+
+
+def _frame_id(frames: List[bytes]) -> int:
+    """Gönderilen son olay id'si (id satırı olan son çerçeve)"""
+    for frame in reversed(frames):
+        if frame.startswith(b'id: '):
+            return int(frame[4:frame.index(b'\n')])
+    return 0
+
+
+async def _wait_disconnect(receive):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+
+
+async def _send_unavailable(send):
+    body = json.dumps({'error': 'Canlı olay akışı şu anda kullanılamıyor'}).encode()
+    await send({
+        'type': 'http.response.start',
+        'status': 503,
+        'headers': [(b'content-type', b'application/json'), (b'retry-after', b'5'),
+                    (b'content-length', str(len(body)).encode())]
+    })
+    await send({'type': 'http.response.body', 'body': body})
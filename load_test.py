@@ -0,0 +1,382 @@
+"""
+Yük Testi Aracı (trafik tekrarı)
+Kayıtlı veya sentetik istek karışımlarını (analyze, environment, history,
+trends, report, plots) uygulamaya yağdırır ve throughput, gecikme
+yüzdelikleri ve hata oranlarını JSON rapor olarak verir.
+
+Hedefler:
+    inprocess  - Flask test client (sunucu yok; geçici klasörde veritabanı)
+    sync/async - yerel gunicorn (gunicorn.conf.py) / uvicorn sunucusu başlatılır
+    --url      - çalışan bir sunucu
+
+Harici API'ler (OpenWeatherMap, AirVisual) yerel sahte sunucuya yönlendirilir;
+ağ bağlantısı gerekmez.
+
+Yük modeli:
+    --concurrency N          - kapalı döngü: N istemci, her biri yanıtı bekleyip devam eder
+    --rate R --concurrency N - açık döngü: saniyede R istek planlanır; gecikme planlanan
+                               zamandan ölçülür (sunucu yavaşlarsa kuyruk süresi dahil)
+
+Trafik dosyası (NDJSON, satır başına bir istek; --save-traffic ile üretilebilir):
+    {"route": "analyze", "method": "POST", "path": "/analyze", "json": {...}, "headers": {...}}
+Python 3.9 Uyumlu
+
+Kullanım:
+    python load_test.py --target inprocess --requests 2000 --concurrency 8 --json
+    python load_test.py --target sync --workers 2 --rate 50 --duration 30 --mix analyze=6,history=2,plots=1
+    python load_test.py --url http://localhost:5000 --traffic traffic.ndjson --output report.json
+"""
+
+from typing import Callable, Dict, Iterator, List, Optional
+import argparse
+import itertools
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+
+from env_load_test import APP_DIR, _free_port, start_app, start_stub_server, wait_ready
+
+
+TARGETS = ('inprocess', 'sync', 'async')
+ROUTES = ('analyze', 'environment', 'history', 'trends', 'report', 'plots')
+
+# Varsayılan sentetik karışım (ağırlıklar)
+DEFAULT_MIX = {'analyze': 50, 'environment': 10, 'history': 15, 'trends': 10, 'report': 5, 'plots': 10}
+
+CITIES = ('Istanbul', 'Ankara', 'Izmir', 'Bursa', 'Antalya')
+STUB_API_KEY = 'load-test'
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    """'analyze=6,history=2' → ağırlıklar"""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ROUTES:
+            raise ValueError(f"Bilinmeyen route: {name} (seçenekler: {', '.join(ROUTES)})")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def synthetic_request(route: str, rng: random.Random, users: int) -> Dict:
+    """Route için rastgele girdili istek kaydı"""
+    user_id = f'load-user-{rng.randrange(users)}'
+    inputs = {
+        'sleep_hours': round(rng.uniform(3, 10), 1),
+        'caffeine_mg': rng.randrange(0, 500, 10),
+        'exercise_min': rng.randrange(0, 120, 5),
+        'work_stress': round(rng.uniform(0, 10), 1)
+    }
+    if route == 'analyze':
+        return {'route': route, 'method': 'POST', 'path': '/analyze', 'json': dict(inputs, user_id=user_id)}
+    if route == 'environment':
+        body = dict(inputs, user_id=user_id, city=rng.choice(CITIES))
+        return {'route': route, 'method': 'POST', 'path': '/analyze-with-environment', 'json': body}
+    if route == 'history':
+        return {'route': route, 'method': 'GET', 'path': f'/history?user_id={user_id}&limit=10'}
+    if route == 'trends':
+        return {'route': route, 'method': 'GET', 'path': f'/trends?user_id={user_id}&days=7'}
+    if route == 'report':
+        results = {'stress': round(rng.uniform(0, 100), 1), 'sleep_quality': round(rng.uniform(0, 100), 1),
+                   'active_rules': ['R1', 'R4']}
+        return {'route': route, 'method': 'POST', 'path': '/download-report', 'json': {'inputs': inputs, 'results': results}}
+    return {'route': 'plots', 'method': 'GET', 'path': '/membership-plots'}
+
+
+def synthetic_traffic(mix: Dict[str, int], users: int, seed: int) -> Iterator[Dict]:
+    """Karışım ağırlıklarına göre sonsuz istek akışı (seed ile tekrarlanabilir)"""
+    rng = random.Random(seed)
+    routes = list(mix)
+    weights = [mix[route] for route in routes]
+    while True:
+        yield synthetic_request(rng.choices(routes, weights)[0], rng, users)
+
+
+def load_traffic(path: str) -> List[Dict]:
+    """Kayıtlı trafik (NDJSON); 'route' yoksa yol adı kullanılır"""
+    records = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                record.setdefault('route', record['path'].split('?')[0])
+                records.append(record)
+    if not records:
+        raise ValueError(f'{path} boş')
+    return records
+
+
+class InProcessClient:
+    """Flask test client üzerinden istek (thread başına bir client)"""
+
+    def __init__(self, flask_app):
+        self._app = flask_app
+        self._local = threading.local()
+
+    def send(self, record: Dict) -> int:
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self._app.test_client()
+        response = client.open(record['path'], method=record['method'], json=record.get('json'),
+                               headers=record.get('headers'))
+        response.close()
+        return response.status_code
+
+    def close(self):
+        pass
+
+
+class HttpClient:
+    """Çalışan sunucuya HTTP istekleri (thread başına bağlantı havuzu)"""
+
+    def __init__(self, base_url: str, timeout: float):
+        self._base_url = base_url
+        self._timeout = timeout
+        self._local = threading.local()
+        self._clients: List[httpx.Client] = []
+
+    def send(self, record: Dict) -> int:
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = httpx.Client(base_url=self._base_url, timeout=self._timeout)
+            self._clients.append(client)
+        try:
+            response = client.request(record['method'], record['path'], json=record.get('json'),
+                                      headers=record.get('headers'))
+        except httpx.HTTPError:
+            return 0  # bağlantı hatası / zaman aşımı
+        return response.status_code
+
+    def close(self):
+        for client in self._clients:
+            client.close()
+
+
+def run_load(
+    send: Callable[[Dict], int],
+    traffic: Iterator[Dict],
+    concurrency: int,
+    total: Optional[int],
+    duration: Optional[float],
+    rate: Optional[float] = None
+) -> List[tuple]:
+    """
+    İstekleri concurrency thread ile gönder
+
+    Returns:
+        list of (route, durum kodu, gecikme sn) - durum 0: bağlantı hatası
+    """
+    lock = threading.Lock()
+    counter = itertools.count()
+    samples: List[tuple] = []
+    started = time.perf_counter()
+    deadline = started + duration if duration else None
+
+    def next_request():
+        with lock:
+            index = next(counter)
+            if total is not None and index >= total:
+                return None, None
+            return index, next(traffic)
+
+    def worker():
+        local_samples = []
+        while True:
+            index, record = next_request()
+            if record is None:
+                break
+            if rate:
+                # Açık döngü: istek planlanan zamanında gönderilir, gecikme o zamandan ölçülür
+                scheduled = started + index / rate
+                wait = scheduled - time.perf_counter()
+                if wait > 0:
+                    time.sleep(wait)
+            else:
+                scheduled = time.perf_counter()
+            if deadline and time.perf_counter() >= deadline:
+                break
+            try:
+                status = send(record)
+            except Exception:
+                status = 0
+            local_samples.append((record['route'], status, time.perf_counter() - scheduled))
+        with lock:
+            samples.extend(local_samples)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples
+
+
+def latency_summary(latencies: List[float]) -> Dict:
+    if not latencies:
+        return {'p50': None, 'p90': None, 'p95': None, 'p99': None, 'max': None, 'mean': None}
+    latencies = sorted(latencies)
+
+    def percentile(p: float) -> float:
+        return round(latencies[min(int(len(latencies) * p / 100), len(latencies) - 1)] * 1000, 2)
+
+    return {
+        'p50': percentile(50), 'p90': percentile(90), 'p95': percentile(95), 'p99': percentile(99),
+        'max': round(latencies[-1] * 1000, 2), 'mean': round(sum(latencies) / len(latencies) * 1000, 2)
+    }
+
+
+def build_report(samples: List[tuple], elapsed: float) -> Dict:
+    """Toplam ve route bazında throughput, gecikme ve hata oranı (4xx dahil değil: 5xx ve bağlantı hataları)"""
+    def summarize(items: List[tuple]) -> Dict:
+        errors = sum(1 for _, status, _ in items if status == 0 or status >= 500)
+        return {
+            'requests': len(items),
+            'errors': errors,
+            'error_rate': round(errors / len(items), 4) if items else 0.0,
+            'throughput_rps': round(len(items) / elapsed, 1) if elapsed > 0 else 0.0,
+            'latency_ms': latency_summary([latency for _, _, latency in items])
+        }
+
+    report = summarize(samples)
+    report['elapsed_sec'] = round(elapsed, 2)
+    status_codes: Dict[str, int] = {}
+    for _, status, _ in samples:
+        key = str(status) if status else 'connection_error'
+        status_codes[key] = status_codes.get(key, 0) + 1
+    report['status_codes'] = dict(sorted(status_codes.items()))
+
+    by_route: Dict[str, List[tuple]] = {}
+    for sample in samples:
+        by_route.setdefault(sample[0], []).append(sample)
+    report['routes'] = {route: summarize(items) for route, items in sorted(by_route.items())}
+    return report
+
+
+def _stub_environment(stub_url: str):
+    os.environ.update({
+        'OPENWEATHER_API_KEY': STUB_API_KEY,
+        'AIRVISUAL_API_KEY': STUB_API_KEY,
+        'OPENWEATHER_API_URL': f'{stub_url}/weather',
+        'AIRVISUAL_API_URL': f'{stub_url}/airvisual'
+    })
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Kayıtlı/sentetik trafikle yük testi (JSON rapor)')
+    parser.add_argument('--target', choices=TARGETS, default='inprocess', help='--url verilmezse hedef')
+    parser.add_argument('--url', help='Çalışan sunucu (örn. http://localhost:5000)')
+    parser.add_argument('--workers', type=int, default=2, help='sync/async hedefte sunucu worker sayısı')
+    parser.add_argument('--concurrency', type=int, default=8, help='Eşzamanlı istemci (thread) sayısı')
+    parser.add_argument('--rate', type=float, help='Açık döngü hedef hızı (istek/sn)')
+    parser.add_argument('--requests', type=int, help='Toplam istek (varsayılan 1000; --duration ile sınırsız)')
+    parser.add_argument('--duration', type=float, help='Test süresi (saniye)')
+    parser.add_argument('--mix', help=f"Route ağırlıkları (varsayılan {','.join(f'{k}={v}' for k, v in DEFAULT_MIX.items())})")
+    parser.add_argument('--traffic', help='Kayıtlı trafik dosyası (NDJSON); sırayla ve döngüsel tekrar edilir')
+    parser.add_argument('--save-traffic', help='Üretilen sentetik trafiği NDJSON olarak kaydet ve çık')
+    parser.add_argument('--users', type=int, default=200, help='Sentetik kullanıcı sayısı')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--latency', type=float, default=0.05, help='Sahte harici API gecikmesi (saniye)')
+    parser.add_argument('--timeout', type=float, default=60.0, help='HTTP istemci zaman aşımı (saniye)')
+    parser.add_argument('--json', action='store_true', help='Raporu JSON olarak yazdır')
+    parser.add_argument('--output', help='Raporu JSON dosyasına yaz')
+    args = parser.parse_args(argv)
+
+    try:
+        mix = parse_mix(args.mix) if args.mix else DEFAULT_MIX
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+    total = args.requests if args.requests or args.duration else 1000
+
+    if args.save_traffic:
+        with open(args.save_traffic, 'w', encoding='utf-8') as f:
+            for record in itertools.islice(synthetic_traffic(mix, args.users, args.seed), total or 1000):
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        print(f"💾 {total or 1000} istek kaydedildi: {args.save_traffic}")
+        return 0
+
+    traffic = itertools.cycle(load_traffic(args.traffic)) if args.traffic else synthetic_traffic(mix, args.users, args.seed)
+
+    stub_port = _free_port()
+    stub = start_stub_server(stub_port, args.latency)
+    stub_url = f'http://127.0.0.1:{stub_port}'
+    workdir = tempfile.mkdtemp(prefix='load-test-')
+    server = None
+    original_cwd = os.getcwd()
+    target = args.url or args.target
+    try:
+        if args.url:
+            client = HttpClient(args.url.rstrip('/'), args.timeout)
+        elif args.target == 'inprocess':
+            # Veritabanı ve diğer data/ dosyaları geçici klasörde
+            _stub_environment(stub_url)
+            os.chdir(workdir)
+            sys.path.insert(0, APP_DIR)
+            from app import app as flask_app
+            from warmup import warm_up
+            warm_up(flask_app)  # sunucu hedefleriyle aynı: ilk istekler soğuk başlatmayı ölçmesin
+            client = InProcessClient(flask_app)
+        else:
+            port = _free_port()
+            base_url = f'http://127.0.0.1:{port}'
+            server = start_app(args.target, args.workers, port, stub_url, workdir, production_config=True)
+            wait_ready(base_url, server)
+            client = HttpClient(base_url, args.timeout)
+
+        if not args.json:
+            load = f"{args.rate:g} istek/sn (açık döngü)" if args.rate else f"{args.concurrency} eşzamanlı istemci"
+            limit = f"{args.duration:g} sn" if args.duration else f"{total} istek"
+            print(f"🚀 {target}: {load}, {limit}, trafik: {args.traffic or 'sentetik'}")
+
+        started = time.perf_counter()
+        samples = run_load(client.send, traffic, args.concurrency, total, args.duration, args.rate)
+        elapsed = time.perf_counter() - started
+        client.close()
+    finally:
+        os.chdir(original_cwd)
+        if server is not None:
+            server.terminate()
+            try:
+                server.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                server.kill()
+        stub.terminate()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'target': target,
+        'model': 'open' if args.rate else 'closed',
+        'concurrency': args.concurrency,
+        'rate': args.rate,
+        'traffic': args.traffic or {'synthetic': mix, 'users': args.users, 'seed': args.seed},
+        'stub_latency_sec': args.latency
+    }
+    report.update(build_report(samples, elapsed))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        latency = report['latency_ms']
+        print(f"   ✅ {report['throughput_rps']} istek/sn, p50 {latency['p50']} ms, p95 {latency['p95']} ms, "
+              f"p99 {latency['p99']} ms, hata oranı {report['error_rate']:.2%}")
+        for route, stats in report['routes'].items():
+            print(f"   {route:<28} {stats['requests']:>6} istek  p95 {stats['latency_ms']['p95']:>9} ms  "
+                  f"hata {stats['error_rate']:.2%}")
+        print(f"   durum kodları: {report['status_codes']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+"""
+Prometheus Metrikleri
+İstek içi aşama süreleri (fuzzification, kurallar, defuzzification, kayıt,
+harici API çağrıları, PDF), HTTP istek sayaç/süreleri, önbellek isabetleri,
+harici API varsayılan değer kullanımları ve kuyruk göstergeleri.
+/metrics endpoint'i Prometheus metin formatında yayınlar.
+
+Çok süreçli çalışmada (Gunicorn worker'ları) PROMETHEUS_MULTIPROC_DIR boş bir
+klasörü göstermelidir: her süreç metriklerini orada tutar ve /metrics hangi
+worker'a düşerse düşsün tüm süreçlerin toplamını döndürür.
+Python 3.9 Uyumlu
+"""
+
+from functools import wraps
+from typing import Callable, Dict, Tuple
+import os
+import time
+
+from flask import g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+
+from cache import CACHES
+
+
+MULTIPROCESS = bool(os.getenv('PROMETHEUS_MULTIPROC_DIR'))
+if MULTIPROCESS:
+    os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+# Aşamalar mikro saniyelerden (fuzzify) saniyelere (harici API, PDF) uzanır
+STAGE_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+REQUEST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+STAGE_SECONDS = Histogram(
+    'fuzzy_stage_duration_seconds', 'İstek içi aşama süreleri', ['stage'], buckets=STAGE_BUCKETS
+)
+REQUEST_SECONDS = Histogram(
+    'fuzzy_http_request_duration_seconds', 'HTTP istek süreleri', ['endpoint', 'method'], buckets=REQUEST_BUCKETS
+)
+REQUESTS = Counter('fuzzy_http_requests', 'HTTP istekleri', ['endpoint', 'method', 'status'])
+ERRORS = Counter('fuzzy_http_errors', '5xx yanıtlar', ['endpoint'])
+IN_PROGRESS = Gauge(
+    'fuzzy_http_requests_in_progress', 'İşlenmekte olan istekler', ['endpoint'], multiprocess_mode='livesum'
+)
+QUEUE_DEPTH = Gauge('fuzzy_queue_depth', 'Kuyrukta bekleyen işler', ['queue'], multiprocess_mode='livesum')
+CACHE_LOOKUPS = Counter('fuzzy_cache_lookups', 'Önbellek sorguları', ['cache', 'result'])
+CACHE_REMOVALS = Counter('fuzzy_cache_removals', 'Önbellekten çıkan kayıtlar', ['cache', 'reason'])
+ENV_CACHE_SHARED_HITS = Counter(
+    'fuzzy_environment_cache_shared_hits', 'Bellekte olmayıp kalıcı çevresel önbellekte bulunan kayıtlar', ['source']
+)
+ENV_LOOKUP_SHARED = Counter(
+    'fuzzy_environment_lookup_shared', 'Aynı şehir/kaynak için süren çağrıyı bekleyen çevresel sorgular', ['source']
+)
+ADMISSION_REJECTIONS = Counter(
+    'fuzzy_admission_rejections', 'Kabul kontrolünün 503 ile reddettiği istekler', ['route_class', 'reason']
+)
+IDEMPOTENCY_REQUESTS = Counter(
+    'fuzzy_idempotency_requests', 'Tekrar bastırma sonuçları (new, replay, conflict, mismatch)', ['kind', 'outcome']
+)
+API_FALLBACKS = Counter(
+    'fuzzy_external_api_fallbacks', 'Harici API yerine varsayılan değer kullanımları', ['source', 'reason']
+)
+
+_stage_children: Dict[str, object] = {}
+
+
+class _StageTimer:
+    __slots__ = ('_histogram', '_started')
+
+    def __init__(self, histogram):
+        self._histogram = histogram
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._histogram.observe(time.perf_counter() - self._started)
+        return False
+
+
+def stage(name: str) -> _StageTimer:
+    """Bloğun süresini aşama histogramına yaz: `with stage('apply_rules'): ...`"""
+    histogram = _stage_children.get(name)
+    if histogram is None:
+        histogram = _stage_children[name] = STAGE_SECONDS.labels(name)
+    return _StageTimer(histogram)
+
+
+def timed_stage(name: str) -> Callable:
+    """Fonksiyonun süresini aşama histogramına yazan dekoratör"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def api_fallback(source: str, reason: str):
+    """Harici kaynak yerine varsayılan değer kullanıldı (no_key, status, error, deadline, overloaded)"""
+    API_FALLBACKS.labels(source, reason).inc()
+
+
+# Süreç içi önbellek sayaçlarının son aktarılan değerleri
+_synced_cache_stats: Dict[Tuple[str, str], int] = {}
+
+_CACHE_FIELDS = (
+    ('hits', CACHE_LOOKUPS, 'hit'),
+    ('misses', CACHE_LOOKUPS, 'miss'),
+    ('evictions', CACHE_REMOVALS, 'eviction'),
+    ('expirations', CACHE_REMOVALS, 'expiration'),
+    ('invalidations', CACHE_REMOVALS, 'invalidation')
+)
+
+
+def sync_cache_stats():
+    """
+    Önbellek sayaçlarındaki artışları Prometheus sayaçlarına aktar
+
+    Önbellekler süreç içidir; her worker kendi artışlarını istek sonunda
+    aktarır, böylece /metrics tüm worker'ların toplamını gösterir.
+    """
+    for name, cache in list(CACHES.items()):
+        stats = cache.counters()
+        for field, counter, label in _CACHE_FIELDS:
+            value = stats.get(field, 0)
+            previous = _synced_cache_stats.get((name, field), 0)
+            if value > previous:
+                counter.labels(name, label).inc(value - previous)
+            _synced_cache_stats[(name, field)] = value
+
+
+def instrument_app(app):
+    """
+    Flask uygulamasına istek sayaç/süre/eşzamanlılık kancalarını ekle
+
+    Endpoint etiketi URL kuralıdır (örn. /history), böylece etiket sayısı sınırlı kalır.
+    Akış yanıtlarında süre akış bitene kadar ölçülür.
+    """
+    @app.before_request
+    def _metrics_start():
+        g.metrics_endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        g.metrics_started = time.perf_counter()
+        IN_PROGRESS.labels(g.metrics_endpoint).inc()
+
+    @app.after_request
+    def _metrics_count(response):
+        endpoint = g.get('metrics_endpoint', 'unmatched')
+        REQUESTS.labels(endpoint, request.method, str(response.status_code)).inc()
+        if response.status_code >= 500:
+            ERRORS.labels(endpoint).inc()
+        return response
+
+    @app.teardown_request
+    def _metrics_finish(exc):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return
+        endpoint = g.pop('metrics_endpoint')
+        REQUEST_SECONDS.labels(endpoint, request.method).observe(time.perf_counter() - started)
+        IN_PROGRESS.labels(endpoint).dec()
+        sync_cache_stats()
+
+
+def render() -> Tuple[bytes, str]:
+    """Prometheus metin çıktısı ve içerik tipi"""
+    sync_cache_stats()
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: int):
+    """Kapanan worker'ın canlı gösterge dosyalarını temizle (Gunicorn child_exit kancası)"""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(pid)
@@ -15,7 +15,10 @@ from reportlab.pdfbase.ttfonts import TTFont
 from datetime import datetime
 import io
 
+from metrics import timed_stage
 
+
+@timed_stage('pdf_report')
 def create_pdf_report(inputs: Dict, results: Dict):
     """
     Analiz sonuçlarını PDF raporuna dönüştür
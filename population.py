@@ -0,0 +1,90 @@
+"""
+Popülasyon Yüzdelik Sıralaması
+Tüm kullanıcıların stres, uyku kalitesi ve girdi değerleri için sabit kutulu
+histogramlar (database.HISTOGRAM_BINS) kayıt sırasında güncellenir; bir değerin
+yüzdeliği tablo taraması yapılmadan O(kutu sayısı) sürede hesaplanır.
+Python 3.9 Uyumlu
+
+Kullanım:
+    python population.py --rebuild   # histogramları baştan hesapla
+    python population.py             # özet
+"""
+
+from typing import Dict, List, Optional
+import argparse
+import os
+import sys
+
+import database
+from cache import TTLCache
+
+
+# Shard'lardan okunan toplam histogram kısa süre önbellekte tutulur
+_histogram_cache = TTLCache('population', maxsize=1, ttl=float(os.getenv('POPULATION_CACHE_TTL', '10')))
+
+
+def get_histograms() -> Dict[str, List[int]]:
+    """Tüm shard'ların toplam histogramları (önbellekli)"""
+    histograms = _histogram_cache.get('all')
+    if histograms is None:
+        histograms = database.get_population_histograms()
+        _histogram_cache.set('all', histograms)
+    return histograms
+
+
+def percentile_rank(metric: str, value: float, histograms: Optional[Dict[str, List[int]]] = None) -> Optional[float]:
+    """
+    Değerin popülasyondaki yüzdeliği (0-100)
+
+    Değerin kutusunun yarısı "altında" sayılır (orta nokta yüzdeliği).
+
+    Returns:
+        float - yüzdelik, popülasyon boşsa None
+    """
+    if metric not in database.HISTOGRAM_BINS:
+        raise ValueError(
+            f"Bilinmeyen metrik: {metric} (seçenekler: {', '.join(database.HISTOGRAM_BINS)})"
+        )
+    counts = (histograms or get_histograms())[metric]
+    total = sum(counts)
+    if total == 0:
+        return None
+    bin_ = database.histogram_bin(metric, value)
+    below = sum(counts[:bin_])
+    return round((below + counts[bin_] / 2) / total * 100, 1)
+
+
+def population_percentiles(values: Dict[str, float]) -> Dict[str, Optional[float]]:
+    """Verilen metrik değerlerinin yüzdelikleri (bilinmeyen/boş alanlar atlanır)"""
+    histograms = get_histograms()
+    return {
+        metric: percentile_rank(metric, float(values[metric]), histograms)
+        for metric in database.HISTOGRAM_BINS
+        if values.get(metric) is not None
+    }
+
+
+def population_size() -> int:
+    """Histograma işlenmiş kayıt sayısı"""
+    return sum(get_histograms()['stress_level'])
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Popülasyon histogramları')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='Histogramları analysis_history ve günlük özetlerden yeniden hesapla')
+    args = parser.parse_args(argv)
+
+    if args.rebuild:
+        total = database.rebuild_population_histograms()
+        print(f"✅ Histogramlar yeniden hesaplandı ({total} kayıt)")
+
+    histograms = database.get_population_histograms()
+    for metric, counts in histograms.items():
+        low, high, bins = database.HISTOGRAM_BINS[metric]
+        print(f"📊 {metric}: {sum(counts)} kayıt, {bins} kutu ({low:g}-{high:g})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
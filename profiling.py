@@ -0,0 +1,271 @@
+"""
+İstek Profilleme
+Üretimde yavaş bir route'un nedenini yeniden dağıtım yapmadan görmek için:
+
+- İsteğe bağlı profilleme: X-Profile-Token başlığı PROFILE_ADMIN_TOKEN ile
+  eşleşirse veya PROFILE_SAMPLE_RATE oranında rastgele seçilen isteklerde
+  istek cProfile altında çalışır ve yığınları örneklenir.
+- Yavaş istek kaydı: PROFILE_SLOW_MS'yi aşan istekler için düşük frekanslı
+  yığın örnekleri otomatik saklanır ve slow_requests.log'a yazılır.
+
+Profiller PROFILE_DIR altında sınırlı bir halka tamponda tutulur:
+<id>.json (özet), <id>.prof (pstats), <id>.collapsed.txt (flamegraph için
+katlanmış yığınlar; flamegraph.pl / speedscope ile açılır).
+Python 3.9 Uyumlu
+"""
+
+from collections import Counter
+from typing import Dict, List, Optional
+from datetime import datetime
+import cProfile
+import hmac
+import itertools
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+
+from flask import g, request
+
+
+ADMIN_TOKEN = os.getenv('PROFILE_ADMIN_TOKEN', '')
+SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+SLOW_MS = float(os.getenv('PROFILE_SLOW_MS', '2000'))
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'data/profiles')
+MAX_PROFILES = int(os.getenv('PROFILE_MAX_ENTRIES', '100'))
+SLOW_LOG_MAX_BYTES = int(os.getenv('PROFILE_SLOW_LOG_MAX_BYTES', str(1024 * 1024)))
+
+TOKEN_HEADER = 'X-Profile-Token'
+
+# Yığın örnekleme aralıkları (saniye): istenen profillerde sık, yavaş istek
+# tespitinde seyrek (her istek örneklenir, yalnızca yavaş olanlar saklanır)
+PROFILE_INTERVAL = 0.001
+SLOW_INTERVAL = float(os.getenv('PROFILE_SLOW_INTERVAL_MS', '10')) / 1000
+MAX_STACK_DEPTH = 128
+
+SLOW_LOG = 'slow_requests.log'
+PROFILE_KINDS = {'pstats': '.prof', 'collapsed': '.collapsed.txt', 'summary': '.json'}
+_PROFILE_ID = re.compile(r'^[0-9]{8}-[0-9]{6}-[0-9]+-[0-9]+$')
+
+_sequence = itertools.count(1)
+_write_lock = threading.Lock()
+
+
+class _Target:
+    __slots__ = ('interval', 'next_at', 'samples')
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.next_at = time.perf_counter() + interval
+        self.samples = Counter()
+
+
+class StackSampler:
+    """
+    İstek thread'lerinin yığınlarını arka plan thread'inden örnekler
+
+    Yalnızca izlenen thread varken uyanır; her örnek katlanmış yığın
+    ("dış;...;iç") olarak sayılır.
+    """
+
+    def __init__(self):
+        self._targets: Dict[int, _Target] = {}
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, thread_id: int, interval: float):
+        with self._condition:
+            self._targets[thread_id] = _Target(interval)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def remove(self, thread_id: int) -> Counter:
+        with self._condition:
+            target = self._targets.pop(thread_id, None)
+        return target.samples if target else Counter()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._targets:
+                    self._condition.wait()
+                targets = list(self._targets.items())
+
+            now = time.perf_counter()
+            due = [(thread_id, target) for thread_id, target in targets if target.next_at <= now]
+            if due:
+                frames = sys._current_frames()
+                for thread_id, target in due:
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        target.samples[_collapse(frame)] += 1
+                    target.next_at = now + target.interval
+                del frames
+            time.sleep(max(min(target.next_at for _, target in targets) - time.perf_counter(), 0.0005))
+
+
+def _collapse(frame) -> str:
+    stack = []
+    while frame is not None and len(stack) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(stack))
+
+
+_sampler = StackSampler()
+
+
+def token_valid(token: Optional[str]) -> bool:
+    """Yönetici profilleme token'ı doğru mu (token ayarlı değilse her zaman False)"""
+    return bool(ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, ADMIN_TOKEN)
+
+
+def _new_profile_id() -> str:
+    return f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_sequence)}"
+
+
+def _save_profile(profile_id: str, summary: Dict, profiler: Optional[cProfile.Profile], samples: Counter):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    base = os.path.join(PROFILE_DIR, profile_id)
+    if profiler is not None:
+        profiler.dump_stats(base + PROFILE_KINDS['pstats'])
+    with open(base + PROFILE_KINDS['collapsed'], 'w', encoding='utf-8') as f:
+        for stack, count in samples.most_common():
+            f.write(f'{stack} {count}\n')
+    with open(base + PROFILE_KINDS['summary'], 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False)
+    _trim_profiles()
+
+
+def _trim_profiles():
+    """Halka tampon: en yeni MAX_PROFILES profil kalır (tüm worker'lar aynı klasörü paylaşır)"""
+    ids = sorted(
+        {name[:-len(PROFILE_KINDS['summary'])] for name in os.listdir(PROFILE_DIR) if name.endswith('.json')},
+        key=lambda profile_id: tuple(int(part) for part in profile_id.split('-'))
+    )
+    for profile_id in ids[:-MAX_PROFILES] if len(ids) > MAX_PROFILES else []:
+        for suffix in PROFILE_KINDS.values():
+            try:
+                os.remove(os.path.join(PROFILE_DIR, profile_id + suffix))
+            except FileNotFoundError:
+                pass
+
+
+def _log_slow_request(summary: Dict):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, SLOW_LOG)
+    try:
+        if os.path.getsize(path) > SLOW_LOG_MAX_BYTES:
+            os.replace(path, path + '.1')
+    except FileNotFoundError:
+        pass
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(summary, ensure_ascii=False) + '\n')
+
+
+def list_profiles(limit: int = 50) -> List[Dict]:
+    """Saklanan profillerin özetleri (en yeni önce)"""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    summaries = []
+    for name in os.listdir(PROFILE_DIR):
+        if not name.endswith(PROFILE_KINDS['summary']):
+            continue
+        try:
+            with open(os.path.join(PROFILE_DIR, name), encoding='utf-8') as f:
+                summaries.append(json.load(f))
+        except (OSError, ValueError):
+            continue  # başka bir worker silmiş olabilir
+    summaries.sort(key=lambda s: s['started_at'], reverse=True)
+    return summaries[:limit]
+
+
+def profile_path(profile_id: str, kind: str) -> Optional[str]:
+    """Profil dosyasının yolu; geçersiz id/tür veya dosya yoksa None"""
+    if kind not in PROFILE_KINDS or not _PROFILE_ID.match(profile_id):
+        return None
+    path = os.path.abspath(os.path.join(PROFILE_DIR, profile_id + PROFILE_KINDS[kind]))
+    return path if os.path.exists(path) else None
+
+
+def install_profiling(app):
+    """Flask uygulamasına profilleme kancalarını ekle"""
+
+    @app.before_request
+    def _profile_start():
+        explicit = token_valid(request.headers.get(TOKEN_HEADER))
+        reason = 'requested' if explicit else None
+        if reason is None and SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE:
+            reason = 'sampled'
+        if reason is None and SLOW_MS <= 0:
+            return
+
+        thread_id = threading.get_ident()
+        _sampler.add(thread_id, PROFILE_INTERVAL if reason else SLOW_INTERVAL)
+        profiler = None
+        if reason:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Başka bir profiler etkin (Python 3.12+ tek profiler); yalnızca örnekleme
+                profiler = None
+        g.profile_state = {
+            'id': _new_profile_id(),
+            'reason': reason,
+            'profiler': profiler,
+            'thread_id': thread_id,
+            'started': time.perf_counter(),
+            'started_at': datetime.now().isoformat(),
+            'status': None
+        }
+
+    @app.after_request
+    def _profile_header(response):
+        state = g.get('profile_state')
+        if state is not None:
+            state['status'] = response.status_code
+            if state['reason']:
+                response.headers['X-Profile-Id'] = state['id']
+        return response
+
+    @app.teardown_request
+    def _profile_finish(exc):
+        state = g.pop('profile_state', None)
+        if state is None:
+            return
+        if state['profiler'] is not None:
+            state['profiler'].disable()
+        samples = _sampler.remove(state['thread_id'])
+        duration_ms = (time.perf_counter() - state['started']) * 1000
+
+        slow = SLOW_MS > 0 and duration_ms >= SLOW_MS
+        if not state['reason'] and not slow:
+            return
+
+        summary = {
+            'id': state['id'],
+            'reason': state['reason'] or 'slow',
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.url_rule.rule if request.url_rule else None,
+            'status': state['status'] if exc is None else 500,
+            'duration_ms': round(duration_ms, 1),
+            'started_at': state['started_at'],
+            'pid': os.getpid(),
+            'samples': sum(samples.values()),
+            'pstats': state['profiler'] is not None
+        }
+        try:
+            with _write_lock:
+                _save_profile(state['id'], summary, state['profiler'], samples)
+                if slow:
+                    _log_slow_request(summary)
+        except OSError as e:
+            print(f"Profil kaydedilemedi: {e}")
@@ -0,0 +1,303 @@
+"""
+Shard Düzenini Değiştirme (Resharding)
+Geçmiş kayıtlarını mevcut shard düzeninden yeni shard sayısına taşır.
+Yeni dosyalar önce geçici klasörde oluşturulur, satır sayıları doğrulanır,
+ardından eski dosyalar yedek klasörüne alınıp yenileri yerine konur.
+Python 3.9 Uyumlu
+
+Kullanım (uygulama durdurulmuşken):
+    python reshard.py --to 4
+    HISTORY_SHARDS=4 python app.py
+"""
+
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+
+import database
+import shards
+
+
+DEFAULT_CHUNK_SIZE = 5000
+
+# SQLite rowid üst sınırı
+MAX_ROWID = (1 << 63) - 1
+
+
+def _table_exists(conn: sqlite3.Connection, table: str) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone() is not None
+
+
+def _count_rows(paths: List[str]) -> Dict[str, int]:
+    counts = {table: 0 for table in database.USER_TABLES}
+    for path in paths:
+        conn = sqlite3.connect(path)
+        for table in database.USER_TABLES:
+            if _table_exists(conn, table):
+                counts[table] += conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+        conn.close()
+    return counts
+
+
+def _id_range(index: int, count: int) -> Tuple[int, Optional[int]]:
+    """Hedef shard'ın id aralığı [başlangıç, bitiş); tek dosyalı düzende sınırsız"""
+    if count <= 1:
+        return 0, None
+    return index * shards.SHARD_ID_STRIDE, (index + 1) * shards.SHARD_ID_STRIDE
+
+
+def _assign_sequences(targets: List[sqlite3.Connection], pending: List[int]):
+    """
+    Her hedefin AUTOINCREMENT sayacını kendi aralığındaki en büyük id'ye ayarla
+
+    Aralıktaki id'ler başka hedeflere de düşmüş olabilir (shard sayısı
+    azalırken); sayaç tüm hedeflerdeki en büyük değerden devam eder ki yeni
+    id'ler genel olarak benzersiz kalsın.
+
+    Raises:
+        ValueError - yeniden numaralanacak satırlar aralığa sığmıyor
+    """
+    for index, target in enumerate(targets):
+        start, end = _id_range(index, len(targets))
+        seq = start
+        for other in targets:
+            top = other.execute(
+                'SELECT MAX(id) FROM analysis_history WHERE id >= ? AND id < ?', (start, end)
+            ).fetchone()[0]
+            if top is not None:
+                seq = max(seq, top)
+        if seq + pending[index] >= end:
+            raise ValueError(f'{index}. shard\'ın id aralığı dolu; bu shard sayısına taşınamaz')
+        with target:
+            updated = target.execute(
+                "UPDATE sqlite_sequence SET seq = ? WHERE name = 'analysis_history'", (seq,)
+            ).rowcount
+            if not updated:
+                target.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('analysis_history', ?)", (seq,))
+
+
+def _copy_renumbered(source_paths: List[str], targets: List[sqlite3.Connection], chunk_size: int) -> int:
+    """Hedefin aralığından büyük id'li geçmiş satırlarını yeni id ile kopyala"""
+    renumbered = 0
+    for source_path in source_paths:
+        source = sqlite3.connect(source_path)
+        if not _table_exists(source, 'analysis_history'):
+            source.close()
+            continue
+        cursor = source.execute('SELECT * FROM analysis_history')
+        columns = [d[0] for d in cursor.description]
+        id_index, user_index = columns.index('id'), columns.index('user_id')
+        kept = [i for i in range(len(columns)) if i != id_index]
+        insert = (
+            f"INSERT INTO analysis_history ({', '.join(columns[i] for i in kept)}) "
+            f"VALUES ({', '.join('?' for _ in kept)})"
+        )
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            by_target = {}
+            for row in rows:
+                target = shards.shard_index(row[user_index], len(targets))
+                _, end = _id_range(target, len(targets))
+                if end is not None and row[id_index] >= end:
+                    by_target.setdefault(target, []).append(tuple(row[i] for i in kept))
+            for target, target_rows in by_target.items():
+                with targets[target]:
+                    targets[target].executemany(insert, target_rows)
+                renumbered += len(target_rows)
+        source.close()
+    return renumbered
+
+
+def copy_to_layout(
+    source_paths: List[str],
+    target_paths: List[str],
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Dict:
+    """
+    Kaynak dosyalardaki kullanıcı tablolarını hedef shard'lara user_id'ye göre dağıt
+
+    Kayıt id'leri korunur; yalnızca hedef shard'ın aralığından büyük id'li
+    geçmiş satırları (shard sayısı azalırken) o aralıktan yeni id alır.
+    Aksi halde SQLite sonraki id'leri bu satırların üzerinden verir ve id'ler
+    başka bir shard'ın aralığına taşar.
+
+    Returns:
+        dict - copied (tablo başına kopyalanan satır), renumbered (yeni id alan satır)
+
+    Raises:
+        ValueError - hedef düzenin id aralıkları satırlara yetmiyor
+    """
+    if len(target_paths) * shards.SHARD_ID_STRIDE > MAX_ROWID:
+        raise ValueError(f'{len(target_paths)} shard için id aralığı yetersiz')
+
+    for index, path in enumerate(target_paths):
+        database.init_db(path, index if len(target_paths) > 1 else None)
+
+    targets = [sqlite3.connect(path) for path in target_paths]
+    copied = {table: 0 for table in database.USER_TABLES}
+    # Hedef başına ikinci geçişte yeni id alacak geçmiş satırı sayısı
+    pending = [0] * len(targets)
+
+    try:
+        for source_path in source_paths:
+            source = sqlite3.connect(source_path)
+            for table in database.USER_TABLES:
+                if not _table_exists(source, table):
+                    continue
+
+                cursor = source.execute(f'SELECT * FROM {table}')
+                columns = [d[0] for d in cursor.description]
+                user_index = columns.index('user_id')
+                id_index = columns.index('id') if table == 'analysis_history' else None
+                insert = (
+                    f"INSERT INTO {table} ({', '.join(columns)}) "
+                    f"VALUES ({', '.join('?' for _ in columns)})"
+                )
+
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    by_target = {}
+                    for row in rows:
+                        target = shards.shard_index(row[user_index], len(targets))
+                        if id_index is not None:
+                            _, end = _id_range(target, len(targets))
+                            if end is not None and row[id_index] >= end:
+                                pending[target] += 1
+                                continue
+                        by_target.setdefault(target, []).append(row)
+                    for target, target_rows in by_target.items():
+                        with targets[target]:
+                            targets[target].executemany(insert, target_rows)
+                    copied[table] += len(rows)
+            source.close()
+
+        if len(targets) > 1:
+            _assign_sequences(targets, pending)
+        renumbered = _copy_renumbered(source_paths, targets, chunk_size) if any(pending) else 0
+
+        # Popülasyon histogramı kullanıcıya ait değil; kaynakların toplamı ilk shard'a yazılır
+        histogram = {}
+        for source_path in source_paths:
+            source = sqlite3.connect(source_path)
+            if _table_exists(source, 'population_histogram'):
+                for metric, bin_, count in source.execute(
+                    'SELECT metric, bin, count FROM population_histogram'
+                ):
+                    histogram[(metric, bin_)] = histogram.get((metric, bin_), 0) + count
+            source.close()
+        with targets[0]:
+            targets[0].execute('DELETE FROM population_histogram')
+            targets[0].executemany(
+                'INSERT INTO population_histogram (metric, bin, count) VALUES (?, ?, ?)',
+                [(metric, bin_, count) for (metric, bin_), count in histogram.items()]
+            )
+            for target in targets[1:]:
+                with target:
+                    target.execute('DELETE FROM population_histogram')
+    finally:
+        for conn in targets:
+            conn.close()
+
+    return {'copied': copied, 'renumbered': renumbered}
+
+
+def reshard(
+    target_count: int,
+    source_count: Optional[int] = None,
+    base_path: Optional[str] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Dict:
+    """
+    Shard sayısını değiştir
+
+    Args:
+        target_count: int - yeni shard sayısı
+        source_count: int - mevcut shard sayısı (varsayılan: HISTORY_SHARDS)
+        base_path: str - temel veritabanı yolu (varsayılan: database.DB_PATH)
+
+    Returns:
+        dict - kopyalanan satırlar, yeni dosyalar ve yedek klasörü
+    """
+    source_count = source_count or shards.SHARD_COUNT
+    base_path = base_path or database.DB_PATH
+    if target_count < 1:
+        raise ValueError('Shard sayısı en az 1 olmalı')
+    if target_count == source_count:
+        raise ValueError(f'Zaten {source_count} shard kullanılıyor')
+
+    source_paths = [p for p in shards.shard_paths(base_path, source_count) if os.path.exists(p)]
+    if not source_paths:
+        raise ValueError(f'Kaynak veritabanı bulunamadı: {base_path} ({source_count} shard)')
+
+    base_dir = os.path.dirname(base_path) or '.'
+    staging_dir = os.path.join(base_dir, 'reshard_tmp')
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    os.makedirs(staging_dir)
+
+    staging_paths = shards.shard_paths(
+        os.path.join(staging_dir, os.path.basename(base_path)), target_count
+    )
+    result = copy_to_layout(source_paths, staging_paths, chunk_size)
+
+    # Doğrulama: her tabloda satır sayıları aynı olmalı
+    expected = _count_rows(source_paths)
+    actual = _count_rows(staging_paths)
+    if expected != actual:
+        raise RuntimeError(f'Satır sayıları uyuşmuyor: kaynak={expected}, hedef={actual}')
+
+    # Eski dosyaları yedekle, yenilerini yerine koy
+    backup_dir = os.path.join(base_dir, f"reshard_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+    os.makedirs(backup_dir)
+    for path in source_paths:
+        shutil.move(path, os.path.join(backup_dir, os.path.basename(path)))
+
+    target_paths = shards.shard_paths(base_path, target_count)
+    for staging_path, target_path in zip(staging_paths, target_paths):
+        shutil.move(staging_path, target_path)
+    shutil.rmtree(staging_dir, ignore_errors=True)
+
+    return {
+        'copied': result['copied'],
+        'renumbered': result['renumbered'],
+        'shards': target_paths,
+        'backup_dir': backup_dir
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Geçmiş kayıtlarını yeni shard sayısına taşı')
+    parser.add_argument('--to', type=int, required=True, dest='target', help='Yeni shard sayısı')
+    parser.add_argument('--from', type=int, dest='source',
+                        help=f'Mevcut shard sayısı (varsayılan: HISTORY_SHARDS={shards.SHARD_COUNT})')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    try:
+        report = reshard(args.target, args.source, chunk_size=args.chunk_size)
+    except (ValueError, RuntimeError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+
+    print("✅ Resharding tamamlandı")
+    for table, count in report['copied'].items():
+        print(f"   {table}: {count} satır")
+    if report['renumbered']:
+        print(f"   Yeni id verilen geçmiş kaydı: {report['renumbered']} (eski id başka shard'ın aralığındaydı)")
+    print(f"   Yeni dosyalar: {', '.join(report['shards'])}")
+    print(f"   Eski dosyaların yedeği: {report['backup_dir']}")
+    print(f"\n💡 Uygulamayı HISTORY_SHARDS={args.target} ile yeniden başlatın")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
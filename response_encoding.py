@@ -0,0 +1,147 @@
+"""
+Kompakt Yanıt Kodlamaları
+Servisler arası yüksek hacimli istemciler için /analyze yanıtının içerik
+pazarlığıyla (Accept başlığı) seçilen kompakt biçimleri:
+
+- application/vnd.fuzzy-sleep.compact+json : sabit alanlı JSON dizisi (orjson)
+- application/msgpack                      : aynı dizi MessagePack olarak
+
+Kompakt yanıtlar girdiyi ve kural açıklamalarını geri göndermez; istenirse
+`include` ile (input, descriptions, timestamp) son elemana eklenir.
+Varsayılan application/json yanıtı değişmez.
+Python 3.9 Uyumlu
+"""
+
+from typing import Dict, List, Optional, Set
+from datetime import datetime
+
+import msgpack
+import orjson
+from flask import Response
+
+from fuzzy_model import RULE_DESCRIPTIONS, rules_to_mask
+
+
+JSON_MIMETYPE = 'application/json'
+COMPACT_JSON_MIMETYPE = 'application/vnd.fuzzy-sleep.compact+json'
+MSGPACK_MIMETYPE = 'application/msgpack'
+MSGPACK_MIMETYPES = (MSGPACK_MIMETYPE, 'application/x-msgpack')
+
+# Pazarlıkta ilk eleman varsayılandır (Accept yoksa veya */* ise)
+RESPONSE_MIMETYPES = (JSON_MIMETYPE, COMPACT_JSON_MIMETYPE) + MSGPACK_MIMETYPES
+
+# Kompakt dizinin sabit alan sırası (şema sürümü değişirse COMPACT_VERSION artar)
+COMPACT_VERSION = 1
+COMPACT_FIELDS = ('record_id', 'stress', 'sleep_quality', 'active_rules_mask', 'memberships', 'is_anomaly')
+
+# 'memberships' alanındaki 15 üyelik derecesinin sırası
+MEMBERSHIP_FIELDS = (
+    ('sleep', 'low'), ('sleep', 'medium'), ('sleep', 'high'),
+    ('caffeine', 'low'), ('caffeine', 'medium'), ('caffeine', 'high'),
+    ('exercise', 'low'), ('exercise', 'medium'), ('exercise', 'high'),
+    ('work', 'low'), ('work', 'medium'), ('work', 'high'),
+    ('environmental', 'bad'), ('environmental', 'medium'), ('environmental', 'good')
+)
+
+INCLUDE_OPTIONS = ('input', 'descriptions', 'timestamp')
+
+# Üyelik dereceleri (0-1) kompakt biçimde sabit noktalı tamsayıdır (0-10000);
+# çoğu derece 0 olduğundan MessagePack'te 1 bayta iner
+MEMBERSHIP_SCALE = 10000
+
+
+def negotiate(accept_mimetypes) -> str:
+    """Accept başlığına göre yanıt biçimi (werkzeug MIMEAccept)"""
+    return accept_mimetypes.best_match(RESPONSE_MIMETYPES, default=JSON_MIMETYPE)
+
+
+def is_compact(mimetype: str) -> bool:
+    return mimetype != JSON_MIMETYPE
+
+
+def parse_include(value) -> Set[str]:
+    """
+    `include` parametresini (virgüllü metin veya liste) ayrıştır
+
+    Raises:
+        ValueError - bilinmeyen alan
+    """
+    if not value:
+        return set()
+    items = value.split(',') if isinstance(value, str) else value
+    include = {str(item).strip() for item in items if str(item).strip()}
+    unknown = include - set(INCLUDE_OPTIONS)
+    if unknown:
+        raise ValueError(
+            f"Bilinmeyen include alanı: {', '.join(sorted(unknown))} (seçenekler: {', '.join(INCLUDE_OPTIONS)})"
+        )
+    return include
+
+
+def read_request_data(request) -> Optional[Dict]:
+    """İstek gövdesi: MessagePack (Content-Type ile) veya JSON; geçersizse None"""
+    if request.mimetype in MSGPACK_MIMETYPES:
+        try:
+            data = msgpack.unpackb(request.get_data(), raw=False)
+        except (ValueError, msgpack.UnpackException):
+            return None
+        return data if isinstance(data, dict) else None
+    return request.get_json(force=True, silent=True)
+
+
+def compact_record(
+    result: Dict,
+    inputs: Optional[Dict] = None,
+    include: Optional[Set[str]] = None,
+    timestamp: Optional[str] = None
+) -> List:
+    """
+    Analiz sonucunu sabit alanlı diziye çevir (alan sırası COMPACT_FIELDS)
+
+    İsteğe bağlı alanlar (include, population_percentiles) varsa
+    dizinin sonuna tek bir sözlük olarak eklenir.
+    """
+    memberships = result.get('memberships', {})
+    record = [
+        result.get('record_id'),
+        result.get('stress'),
+        result.get('sleep_quality'),
+        rules_to_mask(result.get('active_rules', [])),
+        [
+            round(memberships.get(variable, {}).get(term, 0.0) * MEMBERSHIP_SCALE)
+            for variable, term in MEMBERSHIP_FIELDS
+        ],
+        bool(result.get('anomaly', {}).get('is_anomaly', False))
+    ]
+
+    include = include or set()
+    extras = {}
+    if 'input' in include:
+        extras['input'] = inputs
+    if 'descriptions' in include:
+        extras['active_rule_descriptions'] = [
+            {'id': r, 'description': RULE_DESCRIPTIONS[r]}
+            for r in result.get('active_rules', [])
+        ]
+    if 'timestamp' in include:
+        extras['timestamp'] = timestamp or datetime.now().isoformat()
+    if 'population_percentiles' in result:
+        extras['population_percentiles'] = result['population_percentiles']
+    if extras:
+        record.append(extras)
+    return record
+
+
+def encode(payload, mimetype: str) -> bytes:
+    """Kompakt yükü seçilen biçimde serileştir"""
+    if mimetype in MSGPACK_MIMETYPES:
+        return msgpack.packb(payload, use_bin_type=True)
+    return orjson.dumps(payload)
+
+
+def compact_response(payload, mimetype: str, status: int = 200) -> Response:
+    """Kompakt yükten Flask yanıtı (şema sürümü başlıkta)"""
+    response = Response(encode(payload, mimetype), status=status, mimetype=mimetype)
+    response.headers['X-Compact-Version'] = str(COMPACT_VERSION)
+    response.vary.add('Accept')
+    return response
@@ -0,0 +1,288 @@
+"""
+Geçmiş Kayıt Saklama Politikası
+Saklama süresini aşan ham kayıtları kullanıcı/gün bazında özetler,
+istenirse sıkıştırılmış arşive taşır ve veritabanı dosyasını küçültür.
+Python 3.9 Uyumlu
+
+Kullanım (örn. günlük cron işi):
+    python retention.py --days 90 --archive
+"""
+
+from typing import Dict, List, Optional
+from datetime import datetime, timedelta
+import argparse
+import gzip
+import os
+import sqlite3
+import sys
+
+import database
+import shards
+from database import AGGREGATE_METRICS, ensure_db
+from fuzzy_model import RULE_BITS
+from export_history import iter_ndjson
+
+
+# Varsayılan ayarlar (environment variable ile değiştirilebilir)
+DEFAULT_RETENTION_DAYS = int(os.getenv('HISTORY_RETENTION_DAYS', '90'))
+DEFAULT_ARCHIVE_DIR = os.getenv('HISTORY_ARCHIVE_DIR', 'data/archive')
+
+
+def retention_cutoff(days: int, now: Optional[datetime] = None) -> str:
+    """
+    Ham kayıtların tutulacağı ilk günü hesapla
+
+    Kesim gün başına yuvarlanır; böylece özetlenen günler her zaman tamdır.
+
+    Returns:
+        str - YYYY-MM-DD (bu tarihten önceki kayıtlar özetlenir)
+    """
+    now = now or datetime.now()
+    return (now - timedelta(days=days)).date().isoformat()
+
+
+def snapshot_max_ids() -> Dict[str, int]:
+    """
+    Her shard'ın o anki en büyük kayıt id'sini al
+
+    Arşiv ve özetleme aynı sınırı kullanır; aradaki sürede eklenen (örn. geriye
+    dönük içe aktarılan) kayıtlar arşivlenmeden silinmez, sonraki çalıştırmaya kalır.
+
+    Returns:
+        dict - shard yolu → MAX(id) (boş shard için 0)
+    """
+    ensure_db()
+    paths = database.get_shard_paths()
+    return dict(zip(paths, shards.map_parallel(_shard_max_id, paths)))
+
+
+def _shard_max_id(db_path: str) -> int:
+    conn = sqlite3.connect(db_path)
+    try:
+        return _max_id(conn.cursor())
+    finally:
+        conn.close()
+
+
+def _max_id(cursor) -> int:
+    return cursor.execute('SELECT COALESCE(MAX(id), 0) FROM analysis_history').fetchone()[0]
+
+
+def archive_raw_rows(cutoff: str, archive_dir: str, max_ids: Dict[str, int]) -> Optional[str]:
+    """
+    Kesim tarihinden eski ham kayıtları gzip'li NDJSON dosyasına yaz
+
+    Args:
+        cutoff: str - bu tarihten önceki kayıtlar arşivlenir
+        archive_dir: str - arşiv dizini
+        max_ids: dict - shard başına arşive girecek en büyük id (snapshot_max_ids)
+
+    Returns:
+        str - arşiv dosyası yolu (kayıt yoksa None)
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(
+        archive_dir,
+        f"history_before_{cutoff}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.ndjson.gz"
+    )
+
+    written = False
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        for part in iter_ndjson(database.iter_history_chunks(end=cutoff, max_ids=max_ids)):
+            f.write(part)
+            written = True
+
+    if not written:
+        os.remove(path)
+        return None
+    return path
+
+
+def compact_history(cutoff: str, max_ids: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+    """
+    Kesim tarihinden eski ham kayıtları günlük özetlere ekle ve sil
+
+    Aynı gün için özet zaten varsa toplamlar birleştirilir (örn. geriye dönük
+    içe aktarılan kayıtlar). Her shard kendi transaction'ında, paralel işlenir.
+
+    Args:
+        cutoff: str - bu tarihten önceki kayıtlar özetlenir
+        max_ids: dict - shard başına özetlenecek en büyük id (arşivle aynı sınır);
+            verilmezse her shard kendi transaction'ı içindeki MAX(id) ile sınırlanır
+
+    Returns:
+        dict - özetlenen satır ve gün sayıları
+    """
+    ensure_db()
+    totals = {'rows_compacted': 0, 'days_upserted': 0}
+    for report in shards.map_parallel(
+        lambda path: _compact_shard(path, cutoff, max_ids.get(path) if max_ids else None),
+        database.get_shard_paths()
+    ):
+        for key, value in report.items():
+            totals[key] += value
+    # Aynı süreçte önbelleğe alınmış geçmiş/trend sonuçları artık eski biçimde
+    database.history_cache.clear()
+    return totals
+
+
+def _compact_shard(db_path: str, cutoff: str, max_id: Optional[int] = None) -> Dict[str, int]:
+    sum_columns = ', '.join(
+        f'{column}_sum, {column}_n' for column, _ in AGGREGATE_METRICS
+    )
+    select_columns = ', '.join(
+        f'COALESCE(SUM({column}), 0), COUNT({column})' for column, _ in AGGREGATE_METRICS
+    )
+    merge_columns = ', '.join(
+        f'{column}_sum = {column}_sum + excluded.{column}_sum, '
+        f'{column}_n = {column}_n + excluded.{column}_n'
+        for column, _ in AGGREGATE_METRICS
+    )
+
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.cursor()
+        cursor.execute('BEGIN')
+        if max_id is None:
+            max_id = _max_id(cursor)
+        bounds = (cutoff, max_id)
+
+        cursor.execute(
+            'SELECT COUNT(*) FROM analysis_history WHERE timestamp < ? AND id <= ?', bounds
+        )
+        row_count = cursor.fetchone()[0]
+
+        cursor.execute(f'''
+            INSERT INTO analysis_daily_aggregate (user_id, date, count, {sum_columns})
+            SELECT user_id, DATE(timestamp), COUNT(*), {select_columns}
+            FROM analysis_history
+            WHERE timestamp < ? AND id <= ?
+            GROUP BY user_id, DATE(timestamp)
+            ON CONFLICT(user_id, date) DO UPDATE SET
+                count = count + excluded.count,
+                {merge_columns}
+        ''', bounds)
+        day_count = cursor.rowcount
+
+        # Kural sayaçları: bit maskesinden kural başına günlük ateşlenme sayısı
+        rule_values = ', '.join(f"('{rule_id}', {bit})" for rule_id, bit in RULE_BITS.items())
+        cursor.execute(f'''
+            WITH rules(rule_id, bit) AS (VALUES {rule_values})
+            INSERT INTO rule_daily_counts (user_id, date, rule_id, count)
+            SELECT h.user_id, DATE(h.timestamp), r.rule_id,
+                   SUM((h.active_rules_mask >> r.bit) & 1) AS fired
+            FROM analysis_history h CROSS JOIN rules r
+            WHERE h.timestamp < ? AND h.id <= ?
+            GROUP BY h.user_id, DATE(h.timestamp), r.rule_id
+            HAVING fired > 0
+            ON CONFLICT(user_id, date, rule_id) DO UPDATE SET
+                count = count + excluded.count
+        ''', bounds)
+
+        # Geçmişi özete dönüşen kullanıcıların önbellekleri tüm worker'larda geçersiz olsun
+        cursor.execute('''
+            INSERT INTO user_data_version (user_id, version)
+            SELECT DISTINCT user_id, 1 FROM analysis_history WHERE timestamp < ? AND id <= ?
+            ON CONFLICT(user_id) DO UPDATE SET version = version + 1
+        ''', bounds)
+
+        cursor.execute('DELETE FROM analysis_history WHERE timestamp < ? AND id <= ?', bounds)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    return {'rows_compacted': row_count, 'days_upserted': max(day_count, 0)}
+
+
+def reclaim_space() -> int:
+    """
+    Silinen sayfaları dosya sistemine geri ver (tüm shard'lar)
+
+    auto_vacuum kapalı oluşturulmuş eski veritabanları bir kez tam VACUUM ile
+    INCREMENTAL moda çevrilir; sonraki çalıştırmalar incremental_vacuum kullanır.
+
+    Returns:
+        int - geri verilen sayfa sayısı
+    """
+    return sum(shards.map_parallel(_reclaim_shard, database.get_shard_paths()))
+
+
+def _reclaim_shard(db_path: str) -> int:
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        cursor = conn.cursor()
+        page_count = cursor.execute('PRAGMA page_count').fetchone()[0]
+
+        if cursor.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+            cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            cursor.execute('VACUUM')
+        else:
+            cursor.execute('PRAGMA incremental_vacuum')
+
+        return max(page_count - cursor.execute('PRAGMA page_count').fetchone()[0], 0)
+    finally:
+        conn.close()
+
+
+def run_retention(
+    days: int = DEFAULT_RETENTION_DAYS,
+    archive_dir: Optional[str] = None,
+    vacuum: bool = True
+) -> Dict:
+    """
+    Saklama işini çalıştır: arşivle → özetle/sil → alanı geri kazan
+
+    Args:
+        days: int - ham kayıtların tutulacağı gün sayısı
+        archive_dir: str - verilirse ham kayıtlar buraya arşivlenir
+        vacuum: bool - işlem sonunda incremental vacuum yapılsın mı
+
+    Returns:
+        dict - işlem özeti
+    """
+    cutoff = retention_cutoff(days)
+    report = {'cutoff': cutoff, 'archive': None}
+
+    # Arşiv ve silme aynı satır kümesini görmeli: arada eklenen kayıtlar sonraki çalıştırmaya kalır
+    max_ids = snapshot_max_ids()
+    if archive_dir:
+        report['archive'] = archive_raw_rows(cutoff, archive_dir, max_ids)
+
+    report.update(compact_history(cutoff, max_ids))
+
+    if vacuum:
+        report['pages_freed'] = reclaim_space()
+
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Geçmiş kayıtlar için saklama politikası')
+    parser.add_argument('--days', type=int, default=DEFAULT_RETENTION_DAYS,
+                        help=f'Ham kayıtların tutulacağı gün sayısı (varsayılan: {DEFAULT_RETENTION_DAYS})')
+    parser.add_argument('--archive', action='store_true',
+                        help='Özetlenen ham kayıtları sıkıştırılmış arşive taşı')
+    parser.add_argument('--archive-dir', default=DEFAULT_ARCHIVE_DIR)
+    parser.add_argument('--no-vacuum', action='store_true', help='Vacuum adımını atla')
+    args = parser.parse_args(argv)
+
+    report = run_retention(
+        days=args.days,
+        archive_dir=args.archive_dir if args.archive else None,
+        vacuum=not args.no_vacuum
+    )
+
+    print(f"🗂️  Kesim tarihi: {report['cutoff']}")
+    print(f"   Özetlenen kayıt: {report['rows_compacted']} ({report['days_upserted']} kullanıcı-gün)")
+    if report['archive']:
+        print(f"   Arşiv: {report['archive']}")
+    if 'pages_freed' in report:
+        print(f"   Geri kazanılan sayfa: {report['pages_freed']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
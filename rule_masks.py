@@ -0,0 +1,120 @@
+"""
+Kural Bit Maskesi Geçişi
+Eski kayıtlarda aktif kurallar JSON metni olarak active_rules sütununda
+saklanıyordu; şema kontrolü (database.init_db) bunları active_rules_mask
+sütununa çevirir ama kaynak sütuna dokunmaz. Bu araç dönüşümü doğrular ve
+ancak her satır doğru dönüştürülmüşse eski sütunu ayrı bir adım olarak
+kaldırır.
+Python 3.9 Uyumlu
+
+Kullanım:
+    python rule_masks.py                         # dönüşümü doğrula (raporla)
+    python rule_masks.py --drop-legacy-column    # doğrulama temizse active_rules sütununu kaldır
+"""
+
+from typing import Dict, List, Optional
+import argparse
+import sqlite3
+import sys
+
+import database
+
+
+def verify_shard(db_path: str, chunk_size: int = 5000) -> Dict:
+    """
+    Shard'daki eski active_rules değerlerini maskeyle karşılaştır
+
+    Returns:
+        dict - legacy_rows (JSON değeri olan), unconverted (maskesiz),
+        mismatched (maske JSON ile uyuşmuyor), invalid (JSON çözülemiyor), sample_ids
+    """
+    report = {'legacy_rows': 0, 'unconverted': 0, 'mismatched': 0, 'invalid': 0, 'sample_ids': []}
+    conn = sqlite3.connect(db_path)
+    try:
+        if not database.has_column(conn.cursor(), 'analysis_history', 'active_rules'):
+            report['dropped'] = True
+            return report
+        last_id = 0
+        while True:
+            rows = conn.execute('''
+                SELECT id, active_rules, active_rules_mask FROM analysis_history
+                WHERE active_rules IS NOT NULL AND id > ?
+                ORDER BY id
+                LIMIT ?
+            ''', (last_id, chunk_size)).fetchall()
+            if not rows:
+                break
+            for record_id, rules, mask in rows:
+                report['legacy_rows'] += 1
+                try:
+                    expected = database.legacy_rules_mask(rules)
+                except ValueError:
+                    problem = 'invalid'
+                else:
+                    if mask is None:
+                        problem = 'unconverted'
+                    elif mask != expected:
+                        problem = 'mismatched'
+                    else:
+                        continue
+                report[problem] += 1
+                if len(report['sample_ids']) < 10:
+                    report['sample_ids'].append(record_id)
+            last_id = rows[-1][0]
+    finally:
+        conn.close()
+    return report
+
+
+def drop_legacy_column(db_path: str):
+    """active_rules sütununu kaldır (SQLite 3.35+; doğrulama çağıranın sorumluluğunda)"""
+    conn = sqlite3.connect(db_path)
+    try:
+        with conn:
+            conn.execute('ALTER TABLE analysis_history DROP COLUMN active_rules')
+    finally:
+        conn.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Eski JSON kural sütununun bit maskesine geçişi')
+    parser.add_argument('--drop-legacy-column', action='store_true',
+                        help='Tüm shard\'larda doğrulama temizse active_rules sütununu kaldır')
+    args = parser.parse_args(argv)
+
+    # Şema kontrolü bekleyen satırları dönüştürür (dönüştürülemeyenleri loglar)
+    database.ensure_db()
+
+    reports = {path: verify_shard(path) for path in database.get_shard_paths()}
+    clean = True
+    for path, report in reports.items():
+        if report.get('dropped'):
+            print(f"✅ {path}: active_rules sütunu zaten kaldırılmış")
+            continue
+        problems = report['unconverted'] + report['mismatched'] + report['invalid']
+        clean = clean and problems == 0
+        icon = '✅' if problems == 0 else '⚠️ '
+        print(f"{icon} {path}: {report['legacy_rows']} eski kayıt, {report['unconverted']} maskesiz, "
+              f"{report['mismatched']} uyuşmayan, {report['invalid']} çözülemeyen")
+        if report['sample_ids']:
+            print(f"   örnek id'ler: {', '.join(str(i) for i in report['sample_ids'])}")
+
+    if not args.drop_legacy_column:
+        return 0 if clean else 1
+    if not clean:
+        print("❌ Sorunlu kayıtlar düzeltilmeden active_rules sütunu kaldırılmaz")
+        return 1
+
+    for path, report in reports.items():
+        if not report.get('dropped'):
+            try:
+                drop_legacy_column(path)
+            except sqlite3.OperationalError as e:
+                print(f"❌ {path}: sütun kaldırılamadı ({e}; SQLite {sqlite3.sqlite_version}, 3.35+ gerekli)")
+                return 1
+            print(f"🗑️  {path}: active_rules sütunu kaldırıldı")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""
+Geçmiş Kayıt Bölümleme (Sharding)
+analysis_history verisi user_id hash'ine göre N adet SQLite dosyasına
+dağıtılır; her dosyanın kendi yazma kilidi olduğundan yazma kapasitesi
+shard sayısıyla ölçeklenir. Bir kullanıcının tüm verisi tek shard'dadır.
+Python 3.9 Uyumlu
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, Optional, TypeVar
+import os
+import threading
+import zlib
+
+
+# Shard sayısı (1 = tek dosya, eski düzen). Değiştirmek için reshard.py kullanın.
+SHARD_COUNT = int(os.getenv('HISTORY_SHARDS', '1'))
+
+# Her shard'ın AUTOINCREMENT aralığı: kayıt id'leri tüm shard'larda benzersiz kalır
+SHARD_ID_STRIDE = 1 << 40
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def shard_paths(base_path: str, count: int) -> List[str]:
+    """
+    Shard dosya yollarını döndür
+
+    Tek shard'da eski dosya adı (data/history.db) korunur; aksi halde
+    data/history_shard_00.db, data/history_shard_01.db, ...
+    """
+    if count <= 1:
+        return [base_path]
+    root, ext = os.path.splitext(base_path)
+    return [f'{root}_shard_{index:02d}{ext}' for index in range(count)]
+
+
+def shard_index(user_id: str, count: int) -> int:
+    """Kullanıcının shard numarası (süreçler arası kararlı hash)"""
+    if count <= 1:
+        return 0
+    return zlib.crc32(str(user_id).encode('utf-8')) % count
+
+
+def map_parallel(fn: Callable[[T], R], items: Iterable[T]) -> List[R]:
+    """
+    fn'i her öğe için paralel çalıştır (shard'lar arası toplama sorguları)
+
+    sqlite3 sorgu sırasında GIL'i bıraktığından thread havuzu yeterlidir.
+    Sonuçlar girdi sırasıyla döner.
+    """
+    items = list(items)
+    if len(items) <= 1:
+        return [fn(item) for item in items]
+
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max(4, SHARD_COUNT),
+                thread_name_prefix='shard-query'
+            )
+    return list(_executor.map(fn, items))
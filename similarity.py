@@ -0,0 +1,280 @@
+"""
+Benzer Profiller (k-En Yakın Komşu)
+Geçmiş kayıtların normalize edilmiş 5 boyutlu girdi vektörleri üzerinde
+bellek içi KD-tree. Yeni kayıtlar küçük bir ek tampona alınır (kaba kuvvet
+ile aranır); tampon büyüdüğünde veya belirli aralıklarla ağaç arka planda
+yeniden kurulur.
+Python 3.9 Uyumlu
+"""
+
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+from sklearn.neighbors import KDTree
+
+import database
+import shards
+from database import INPUT_DEFAULTS, INPUT_FIELDS
+
+
+# Bellekte tutulan en fazla nokta (shard başına en yeni kayıtlar)
+MAX_POINTS = int(os.getenv('SIMILARITY_MAX_POINTS', '1000000'))
+
+# Yeni kayıtların tampona alınma ve ağacın baştan kurulma aralıkları (saniye)
+REFRESH_INTERVAL = float(os.getenv('SIMILARITY_REFRESH_SEC', '30'))
+REBUILD_INTERVAL = float(os.getenv('SIMILARITY_REBUILD_SEC', '3600'))
+
+# Tampon bu boyutu veya ağacın bu oranını aşınca ağaç yeniden kurulur
+MAX_BUFFER = 20000
+MAX_BUFFER_RATIO = 0.1
+
+DEFAULT_K = 20
+MAX_K = 200
+
+# Normalizasyon aralıkları (histogram aralıklarıyla aynı)
+_LOW = np.array([database.HISTOGRAM_BINS[f][0] for f in INPUT_FIELDS])
+_SCALE = np.array([database.HISTOGRAM_BINS[f][1] - database.HISTOGRAM_BINS[f][0] for f in INPUT_FIELDS])
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Girdi vektörlerini [0, 1] aralığına ölçekle (aralık dışı değerler kırpılır)"""
+    return np.clip((vectors - _LOW) / _SCALE, 0.0, 1.0)
+
+
+def _read_shard(path: str, after_id: int, limit: int) -> Tuple[np.ndarray, np.ndarray, List[str], int]:
+    """
+    Shard'dan id'si after_id'den büyük en yeni `limit` kaydı oku
+
+    Returns:
+        (girdiler Nx5, sonuçlar Nx2 [stress, quality], user_id'ler, en büyük id)
+    """
+    columns = ', '.join(f'COALESCE({f}, {INPUT_DEFAULTS[f]})' for f in INPUT_FIELDS)
+    conn = sqlite3.connect(path)
+    try:
+        rows = conn.execute(f'''
+            SELECT id, user_id, {columns}, stress_level, sleep_quality
+            FROM analysis_history
+            WHERE id > ? AND stress_level IS NOT NULL AND sleep_quality IS NOT NULL
+            ORDER BY id DESC
+            LIMIT ?
+        ''', (after_id, limit)).fetchall()
+    finally:
+        conn.close()
+
+    if not rows:
+        return np.empty((0, 5)), np.empty((0, 2)), [], after_id
+    data = np.array([row[2:] for row in rows], dtype=float)
+    return data[:, :5], data[:, 5:], [row[1] for row in rows], rows[0][0]
+
+
+class _Snapshot:
+    """Değişmez ağaç + tampon durumu (sorgular kilitsiz okur)"""
+
+    def __init__(self, tree, points, outcomes, users, buffer_points, buffer_outcomes, buffer_users):
+        self.tree = tree
+        self.points = points
+        self.outcomes = outcomes
+        self.users = users
+        self.buffer_points = buffer_points
+        self.buffer_outcomes = buffer_outcomes
+        self.buffer_users = buffer_users
+
+
+class SimilarProfileIndex:
+    """
+    Benzer profil indeksi
+
+    Ağaç ilk sorguda kurulur. Sonraki sorgularda REFRESH_INTERVAL geçmişse
+    shard'lardaki yeni kayıtlar (id > son görülen id) arka planda tampona
+    eklenir; REBUILD_INTERVAL geçtiğinde veya tampon büyüdüğünde ağaç
+    arka planda baştan kurulur ve atomik olarak değiştirilir.
+    """
+
+    def __init__(self):
+        self._snapshot: Optional[_Snapshot] = None
+        self._last_ids: Dict[str, int] = {}
+        self._built_at = 0.0
+        self._refreshed_at = 0.0
+        self._build_sec = 0.0
+        self._lock = threading.Lock()
+        self._maintenance = threading.Lock()
+
+    def build(self):
+        """Ağacı tüm shard'lardan baştan kur"""
+        with self._maintenance:
+            self._build()
+
+    def _ensure_built(self):
+        with self._maintenance:
+            if self._snapshot is None:
+                self._build()
+
+    def _build(self):
+        started = time.perf_counter()
+        database.ensure_db()
+        paths = database.get_shard_paths()
+        per_shard = max(MAX_POINTS // len(paths), 1)
+        parts = shards.map_parallel(lambda path: _read_shard(path, 0, per_shard), paths)
+
+        points = normalize(np.vstack([p[0] for p in parts]))
+        outcomes = np.vstack([p[1] for p in parts])
+        users = np.array([u for p in parts for u in p[2]], dtype=object)
+        tree = KDTree(points) if len(points) else None
+
+        with self._lock:
+            self._last_ids = {path: part[3] for path, part in zip(paths, parts)}
+            self._snapshot = _Snapshot(
+                tree, points, outcomes, users,
+                np.empty((0, 5)), np.empty((0, 2)), np.empty(0, dtype=object)
+            )
+            self._built_at = self._refreshed_at = time.time()
+            self._build_sec = time.perf_counter() - started
+
+    def refresh(self):
+        """Son kurulumdan sonra eklenen kayıtları tampona al"""
+        with self._maintenance:
+            paths = database.get_shard_paths()
+            with self._lock:
+                last_ids = dict(self._last_ids)
+            parts = shards.map_parallel(
+                lambda path: _read_shard(path, last_ids.get(path, 0), MAX_BUFFER), paths
+            )
+
+            fresh = [part for part in parts if len(part[0])]
+            with self._lock:
+                snapshot = self._snapshot
+                if fresh:
+                    self._snapshot = _Snapshot(
+                        snapshot.tree, snapshot.points, snapshot.outcomes, snapshot.users,
+                        np.vstack([snapshot.buffer_points] + [normalize(p[0]) for p in fresh]),
+                        np.vstack([snapshot.buffer_outcomes] + [p[1] for p in fresh]),
+                        np.concatenate(
+                            [snapshot.buffer_users] + [np.array(p[2], dtype=object) for p in fresh]
+                        )
+                    )
+                for path, part in zip(paths, parts):
+                    self._last_ids[path] = max(self._last_ids.get(path, 0), part[3])
+                self._refreshed_at = time.time()
+
+    def _schedule_maintenance(self):
+        now = time.time()
+        snapshot = self._snapshot
+        buffered = len(snapshot.buffer_points)
+        needs_rebuild = (
+            now - self._built_at > REBUILD_INTERVAL
+            or buffered >= MAX_BUFFER
+            or buffered > max(len(snapshot.points) * MAX_BUFFER_RATIO, 1000)
+        )
+        if needs_rebuild:
+            task = self.build
+        elif now - self._refreshed_at > REFRESH_INTERVAL:
+            task = self.refresh
+        else:
+            return
+        # Aynı anda tek bakım işi; sorgu beklemez
+        if not self._maintenance.locked():
+            threading.Thread(target=task, name='similarity-index', daemon=True).start()
+
+    def query(self, inputs: Dict[str, float], k: int = DEFAULT_K, exclude_user: Optional[str] = None) -> Dict:
+        """
+        En yakın k profilin sonuçlarını topla
+
+        Args:
+            inputs: dict - 5 girdi (eksikler varsayılan değerle doldurulur)
+            k: int - komşu sayısı
+            exclude_user: str - bu kullanıcının kendi kayıtları hariç tutulur
+
+        Returns:
+            dict - komşu sonuçlarının özetleri ve mesafeler
+        """
+        if not 1 <= k <= MAX_K:
+            raise ValueError(f'k 1-{MAX_K} aralığında olmalı')
+
+        if self._snapshot is None:
+            self._ensure_built()
+        else:
+            self._schedule_maintenance()
+        snapshot = self._snapshot
+
+        started = time.perf_counter()
+        vector = np.array([[float(inputs.get(f, INPUT_DEFAULTS[f])) for f in INPUT_FIELDS]])
+        point = normalize(vector)
+
+        candidates = []  # (mesafe, sonuçlar, girdiler)
+        for points, outcomes, users, tree in (
+            (snapshot.points, snapshot.outcomes, snapshot.users, snapshot.tree),
+            (snapshot.buffer_points, snapshot.buffer_outcomes, snapshot.buffer_users, None)
+        ):
+            if not len(points):
+                continue
+            if tree is None:
+                distances = np.sqrt(((points - point) ** 2).sum(axis=1))
+                # Kullanıcının kendi kayıtları sıralamadan önce çıkarılır; k komşu tüm tampondan seçilir
+                if exclude_user is None:
+                    eligible = np.arange(len(points))
+                else:
+                    eligible = np.flatnonzero(users != exclude_user)
+                order = eligible[np.argsort(distances[eligible])[:k]]
+                found = [(distances[i], i) for i in order]
+            else:
+                # Kullanıcının kendi kayıtları çıkarıldıktan sonra k komşu kalana kadar genişlet
+                fetch = k
+                while True:
+                    fetch = min(fetch, len(points))
+                    dist, idx = tree.query(point, k=fetch)
+                    found = [(d, i) for d, i in zip(dist[0], idx[0]) if users[i] != exclude_user][:k]
+                    if len(found) == k or fetch == len(points):
+                        break
+                    fetch *= 4
+            candidates.extend((d, outcomes[i], points[i]) for d, i in found)
+
+        candidates.sort(key=lambda c: c[0])
+        candidates = candidates[:k]
+        query_ms = (time.perf_counter() - started) * 1000
+
+        result = {
+            'k': k,
+            'neighbours': len(candidates),
+            'index': self.stats(),
+            'query_ms': round(query_ms, 3)
+        }
+        if not candidates:
+            result['outcomes'] = None
+            return result
+
+        outcomes = np.array([c[1] for c in candidates])
+        distances = np.array([c[0] for c in candidates])
+        result['mean_distance'] = round(float(distances.mean()), 4)
+        result['outcomes'] = {
+            name: {
+                'mean': round(float(outcomes[:, col].mean()), 2),
+                'median': round(float(np.median(outcomes[:, col])), 2),
+                'p25': round(float(np.percentile(outcomes[:, col], 25)), 2),
+                'p75': round(float(np.percentile(outcomes[:, col], 75)), 2)
+            }
+            for col, name in enumerate(('stress_level', 'sleep_quality'))
+        }
+        # Komşuların girdi ortalamaları (gerçek birimlerde)
+        mean_inputs = np.array([c[2] for c in candidates]).mean(axis=0) * _SCALE + _LOW
+        result['neighbour_inputs'] = {
+            field: round(float(value), 2) for field, value in zip(INPUT_FIELDS, mean_inputs)
+        }
+        return result
+
+    def stats(self) -> Dict:
+        snapshot = self._snapshot
+        return {
+            'size': len(snapshot.points) if snapshot else 0,
+            'buffered': len(snapshot.buffer_points) if snapshot else 0,
+            'built_at': datetime.fromtimestamp(self._built_at).isoformat() if self._built_at else None,
+            'build_sec': round(self._build_sec, 3)
+        }
+
+
+# Süreç başına tek indeks
+similar_profiles = SimilarProfileIndex()
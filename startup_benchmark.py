@@ -0,0 +1,149 @@
+"""
+İlk İstek Gecikmesi Karşılaştırması (soğuk vs ısınmış worker)
+Uygulamayı Gunicorn ile iki şekilde başlatır ve yeni worker'a gelen ilk
+isteklerin gecikmesini ölçer:
+
+- cold: yapılandırmasız `gunicorn app:app` (her worker ilk isteklerde ısınır)
+- warm: gunicorn.conf.py (preload + fork öncesi ısınma + hazırlık kontrolü)
+
+Her turda sunucu geçici bir klasörde sıfırdan başlatılır; sonuçlar turların
+medyanıdır.
+Python 3.9 Uyumlu
+
+Kullanım:
+    python startup_benchmark.py --rounds 3
+"""
+
+from typing import Dict, List, Optional, Tuple
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from env_load_test import APP_DIR, _free_port
+
+
+MODES = ('cold', 'warm')
+
+ANALYZE_INPUTS = {'sleep_hours': 6, 'caffeine_mg': 200, 'exercise_min': 30, 'work_stress': 7}
+
+# Sırayla gönderilen ilk istekler: (etiket, metot, yol, JSON gövde)
+FIRST_REQUESTS: Tuple[Tuple[str, str, str, Optional[Dict]], ...] = (
+    ('analyze', 'POST', '/analyze', ANALYZE_INPUTS),
+    ('membership_plots', 'GET', '/membership-plots', None),
+    ('download_report', 'POST', '/download-report', {
+        'inputs': ANALYZE_INPUTS,
+        'results': {'stress': 55.0, 'sleep_quality': 48.0, 'active_rules': ['R1']}
+    }),
+    ('dashboard', 'GET', '/dashboard', None)
+)
+
+
+def start_server(mode: str, workers: int, port: int, workdir: str) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update({
+        'PYTHONPATH': APP_DIR + os.pathsep + env.get('PYTHONPATH', ''),
+        'WEB_CONCURRENCY': str(workers),
+        'FLASK_DEBUG': '0'
+    })
+    command = [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}', '--log-level', 'warning']
+    if mode == 'warm':
+        command += ['-c', os.path.join(APP_DIR, 'gunicorn.conf.py')]
+    else:
+        command += ['-w', str(workers)]
+    return subprocess.Popen(command + ['app:app'], cwd=workdir, env=env)
+
+
+def wait_listening(base_url: str, process: subprocess.Popen, timeout: float = 120.0):
+    """İlk başarılı /health yanıtına kadar bekle (canlılık; ısınma isteği sayılmaz)"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'Sunucu başlatılamadı (çıkış kodu {process.returncode})')
+        try:
+            if httpx.get(f'{base_url}/health', timeout=5.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.05)
+    raise RuntimeError('Sunucu zamanında hazır olmadı')
+
+
+def run_round(mode: str, workers: int) -> Dict[str, float]:
+    """Sunucuyu başlat, başlatma süresini ve ilk isteklerin gecikmesini (ms) ölç"""
+    workdir = tempfile.mkdtemp(prefix=f'startup-{mode}-')
+    port = _free_port()
+    base_url = f'http://127.0.0.1:{port}'
+    started = time.perf_counter()
+    process = start_server(mode, workers, port, workdir)
+    try:
+        wait_listening(base_url, process)
+        timings = {'startup': (time.perf_counter() - started) * 1000}
+        with httpx.Client(base_url=base_url, timeout=60.0) as client:
+            for label, method, path, body in FIRST_REQUESTS:
+                request_started = time.perf_counter()
+                response = client.request(method, path, json=body)
+                timings[label] = (time.perf_counter() - request_started) * 1000
+                if response.status_code != 200:
+                    raise RuntimeError(f'{path} {response.status_code} döndü')
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return timings
+
+
+def benchmark(mode: str, workers: int, rounds: int) -> Dict:
+    samples: Dict[str, List[float]] = {}
+    for _ in range(rounds):
+        for label, value in run_round(mode, workers).items():
+            samples.setdefault(label, []).append(value)
+    return {
+        'mode': mode,
+        'workers': workers,
+        'rounds': rounds,
+        'median_ms': {label: round(statistics.median(values), 1) for label, values in samples.items()}
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Soğuk vs ısınmış worker ilk istek gecikmesi')
+    parser.add_argument('--mode', choices=MODES + ('both',), default='both')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Worker sayısı (1: tüm ilk istekler aynı yeni worker\'a düşer)')
+    parser.add_argument('--rounds', type=int, default=3, help='Tur sayısı (medyan alınır)')
+    parser.add_argument('--json', action='store_true', help='Sonuçları JSON olarak yazdır')
+    args = parser.parse_args(argv)
+
+    modes = MODES if args.mode == 'both' else (args.mode,)
+    results = []
+    for mode in modes:
+        if not args.json:
+            print(f"🚀 {mode}: {args.workers} worker, {args.rounds} tur")
+        result = benchmark(mode, args.workers, args.rounds)
+        results.append(result)
+        if not args.json:
+            for label, value in result['median_ms'].items():
+                print(f"   {label:<18} {value:>9.1f} ms")
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    elif len(results) == 2:
+        cold, warm = (result['median_ms'] for result in results)
+        first_total = [sum(ms for label, ms in r.items() if label != 'startup') for r in (cold, warm)]
+        print(f"\n📊 İlk istekler toplamı: {first_total[0]:.0f} ms → {first_total[1]:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
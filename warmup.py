@@ -0,0 +1,138 @@
+"""
+Sunucu Isınması ve Hazırlık Kontrolü
+Bir worker'ın ilk isteklerinde ödenen soğuk başlangıç maliyetlerini
+(veritabanı şema kontrolü, defuzzification tabloları, ilk matplotlib
+figürü, reportlab stilleri/fontları, Jinja şablonları) trafik kabul
+edilmeden önce öder.
+
+Gunicorn'da (gunicorn.conf.py, preload_app) ısınma ana süreçte fork'tan
+önce yapılır; üretilen tablolar ve önbellekteki sayfalar worker'lar
+arasında copy-on-write paylaşılır. Isınma thread, thread havuzu veya açık
+bağlantı bırakmaz (fork sonrası geçersiz olurlar).
+Python 3.9 Uyumlu
+
+Kullanım:
+    python warmup.py          # ısınma adımlarını çalıştır, süreleri yazdır
+"""
+
+from typing import Dict, List, Optional, Tuple
+import argparse
+import json
+import sqlite3
+import sys
+import time
+
+from database import ensure_db, get_shard_paths
+from fuzzy_model import analyze, analyze_batch, get_output_mf_table
+from pdf_report import create_pdf_report
+
+
+SAMPLE_INPUTS = {'sleep_hours': 6.5, 'caffeine_mg': 180, 'exercise_min': 30, 'work_stress': 6}
+
+# Önbelleğe alınan (http_cached) ve isteğe göre değişmeyen sayfalar
+CACHED_PAGES = ('/membership-plots', '/rules', '/dashboard', '/api-docs', '/')
+
+# Isınma adımlarının süreleri (saniye); boşsa bu süreçte ısınma yapılmadı
+_warmup_timings: Dict[str, float] = {}
+
+
+def _warm_model():
+    get_output_mf_table()
+    analyze(**SAMPLE_INPUTS, environmental_score=60)
+    analyze_batch([6.5, 8], [180, 50], [30, 60], [6, 3], [60, 80])
+
+
+def _warm_pdf():
+    create_pdf_report(SAMPLE_INPUTS, analyze(**SAMPLE_INPUTS))
+
+
+def _warm_pages(app):
+    """
+    Önbellekli sayfaları üret (ilk matplotlib figürü, Jinja şablonları)
+
+    View fonksiyonları doğrudan çağrılır: istek kancaları (metrikler,
+    profilleme) çalışmaz, ısınma istekleri metriklere sayılmaz.
+    """
+    adapter = app.url_map.bind('localhost')
+    for path in CACHED_PAGES:
+        endpoint, _ = adapter.match(path)
+        with app.test_request_context(path):
+            response = app.make_response(app.view_functions[endpoint]())
+        if response.status_code != 200:
+            raise RuntimeError(f'{path} ısınmada {response.status_code} döndü')
+
+
+def warm_up(app) -> Dict[str, float]:
+    """
+    Soğuk başlangıç maliyetlerini öde
+
+    Args:
+        app: Flask uygulaması
+
+    Returns:
+        dict: adım → süre (saniye)
+
+    Raises:
+        Exception - bir adım başarısızsa (sunucu trafik almadan durmalı)
+    """
+    steps = (
+        ('database', ensure_db),
+        ('model', _warm_model),
+        ('pdf_report', _warm_pdf),
+        ('pages', lambda: _warm_pages(app))
+    )
+    timings = {}
+    for name, step in steps:
+        started = time.perf_counter()
+        step()
+        timings[name] = round(time.perf_counter() - started, 3)
+    _warmup_timings.update(timings)
+    return timings
+
+
+def warmup_timings() -> Dict[str, float]:
+    return dict(_warmup_timings)
+
+
+def readiness() -> Tuple[bool, Dict]:
+    """
+    Trafik kabul edilebilir mi: ısınma yapıldı ve tüm shard'lar sorgulanabiliyor
+
+    Returns:
+        (hazır mı, kontrol ayrıntıları)
+    """
+    checks: Dict = {'warmed_up': bool(_warmup_timings)}
+    failed: List[str] = []
+    for path in get_shard_paths():
+        try:
+            conn = sqlite3.connect(path, timeout=1.0)
+            try:
+                conn.execute('SELECT 1 FROM analysis_history LIMIT 1').fetchall()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            failed.append(f'{path}: {e}')
+    checks['database'] = 'ok' if not failed else failed
+    return checks['warmed_up'] and not failed, checks
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Sunucu ısınma adımlarını çalıştır')
+    parser.add_argument('--json', action='store_true', help='Süreleri JSON olarak yazdır')
+    args = parser.parse_args(argv)
+
+    from app import app
+
+    timings = warm_up(app)
+    ready, checks = readiness()
+    if args.json:
+        print(json.dumps({'timings': timings, 'ready': ready, 'checks': checks}, indent=2))
+    else:
+        for name, seconds in timings.items():
+            print(f"🔥 {name}: {seconds * 1000:.0f} ms")
+        print(f"{'✅ Hazır' if ready else '❌ Hazır değil'}: {checks}")
+    return 0 if ready else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())